@@ -6,12 +6,133 @@ class Settings(BaseSettings):
     version: str = "1.0.0"
     debug: bool = False
     max_file_size: int = 100 * 1024 * 1024  # 100MB
+    max_image_size: int = 10 * 1024 * 1024  # 10MB
+    max_audio_size: int = 50 * 1024 * 1024  # 50MB; video uses max_file_size
     model_cache_dir: str = "./models"
     temp_dir: str = "./temp"
     
+    # Detection backend: model (the detectors in app/models) or heuristic (instant filename and
+    # dimension rules, no models loaded; for demos and for load-testing everything but inference)
+    detection_backend: str = "model"
+
     # Model configurations
     image_model_name: str = "prithivMLmods/deepfake-detector-model-v1"
     audio_model_path: Optional[str] = None
+
+    # Detectors are imported and loaded per modality on first use; these are loaded
+    # in the background at startup and gate /ready ("" loads everything lazily)
+    model_warmup: str = "image,audio,video"
+    model_retry_seconds: float = 30.0  # a modality that failed to load is retried at most this often
+
+    # Image inference backend: torch, torch-int8 (dynamic int8), onnx or onnx-int8;
+    # ONNX graphs are written by python -m app.models.export_onnx
+    image_backend: str = "torch"
+    image_onnx_dir: Optional[str] = None  # default: <model path>/onnx
+    image_onnx_threads: int = 0  # ONNX Runtime intra-op threads; 0 = the topology's image share
+    image_backend_benchmark: bool = True  # log latency/throughput of every available backend at load
+
+    # Image inference micro-batching
+    image_batching_enabled: bool = True
+    image_batch_max_size: int = 16
+    image_batch_max_wait_ms: float = 5.0
+
+    # Image preprocessing: decode/resize straight into reusable float32 input buffers
+    image_fast_preprocess: bool = True  # False uses the model's image processor
+    image_decode_draft: bool = True  # let the JPEG decoder downscale during decoding
+
+    # Verdict cache keyed by content hash + model version
+    verdict_cache_enabled: bool = True
+    verdict_cache_max_bytes: int = 64 * 1024 * 1024  # 64MB
+    verdict_cache_ttl_seconds: float = 24 * 3600
+    verdict_cache_disk_path: Optional[str] = None  # e.g. /app/temp/verdict_cache.sqlite3
+    verdict_cache_disk_max_entries: int = 100_000  # oldest entries are purged beyond this
+
+    # Perceptual-hash near-duplicate index; verdicts are looked up in the verdict cache
+    phash_index_enabled: bool = True
+    phash_algorithm: str = "dhash"  # dhash or phash
+    phash_max_distance: int = 6  # Hamming radius out of 64 bits
+    phash_index_snapshot_path: Optional[str] = None  # e.g. /app/temp/phash_index.bin
+    phash_snapshot_every: int = 1000  # inserts between snapshots
+    phash_index_max_entries: int = 100_000  # least recently added entries are evicted beyond this (0: unbounded)
+
+    # Audio analysis
+    audio_analysis_mode: str = "first"  # first (first window only) or stream (whole file)
+    audio_window_seconds: float = 4.0
+    audio_hop_seconds: float = 2.0  # stream mode: windows overlap by window - hop
+    audio_stream_block_seconds: float = 30.0  # decoded per read; bounds stream-mode memory
+    audio_stream_aggregate: str = "mean"  # mean or max of the window scores decides the verdict
+    audio_feature_batch_size: int = 8  # stream-mode windows per feature-extraction pass
+
+    # Video frame sampling
+    video_frame_sampler: str = "sequential"  # sequential, seek, time or keyframe
+    video_max_frames: int = 30
+    video_max_frame_budget: int = 120  # cap on a request's frame_budget; adaptive analysis holds that many frames
+    video_seek_gap_frames: int = 250  # sequential sampler seeks over longer gaps (0 = never seek)
+    video_sample_interval_seconds: Optional[float] = None  # time sampler; default duration / max frames
+    video_frame_batch_size: int = 8  # frames per forward pass
+    video_audio_branch_workers: int = 4  # concurrent audio branches across video requests
+    video_dedup_enabled: bool = True  # near-identical frames inherit their representative's score
+    video_dedup_threshold: float = 0.02  # mean absolute luma difference of 16x16 signatures
+
+    # Early-exit video analysis: frames are analyzed coarse-to-fine until the stopping rule settles
+    video_stopping_rule: str = "none"  # none (fixed budget), sprt or confidence
+    video_min_frames: int = 4
+    video_decision_threshold: float = 0.5
+    video_confidence_z: float = 1.96
+    video_sprt_margin: float = 0.1  # H0/H1 means are threshold -/+ margin
+    video_sprt_alpha: float = 0.05
+    video_sprt_beta: float = 0.05
+
+    # CPU topology: cores are split evenly among the serving workers on this host, then among
+    # the image/audio/video pipelines by weight, and native thread pools are sized to each share
+    topology_enabled: bool = True
+    topology_workers: int = 0  # serving worker processes; 0 = WEB_CONCURRENCY (uvicorn --workers) or 1
+    topology_pipeline_weights: str = "image:2,audio:1,video:1"
+    topology_pin_cpus: bool = False  # also set CPU affinity to the worker's (and pipeline's) cores
+    topology_slot_dir: str = "./temp/worker_slots"  # lock files that hand each worker its slot
+    video_opencv_threads: int = 0  # 0 = OpenCV default, or the video share when topology is enabled
+
+    # Model memory shared across worker processes (python -m app.serve preloads and forks)
+    model_weights_mmap: bool = False  # back CPU image weights with a map of model.safetensors
+    serve_workers: int = 0  # app.serve worker processes; 0 = topology_workers, WEB_CONCURRENCY or 1
+    serve_memory_report_seconds: float = 300  # app.serve logs per-worker memory this often (0 = never)
+
+    # Observability: Prometheus metrics at /metrics; responses carry per-stage "timings" regardless
+    metrics_enabled: bool = True
+
+    # Profiling: clients in the allow-list can send "X-Profile: 1" (or ?profile=1) to sample that request's
+    # stacks; the flame-graph-ready folded profile is kept in profiling_dir, its id returned as X-Profile-Id
+    profiling_allow_list: str = ""  # comma-separated IPs/CIDRs, e.g. 127.0.0.1,10.0.0.0/8; empty = off
+    profiling_interval_ms: float = 5.0  # per-request sampling interval
+    profiling_dir: str = "./temp/profiles"
+    profiling_max_files: int = 200  # oldest request profiles are deleted beyond this
+    profiling_sample_hz: float = 0  # always-on sampling of busy threads (e.g. 2); 0 = off
+    profiling_flush_seconds: float = 300  # always-on profile is rewritten to profiling_dir this often
+
+    # Request trace: one JSON line per detection upload (arrival time, endpoint, media type, bytes,
+    # dimensions/duration, keyed content hash, status, stage timings) for python -m benchmarks.replay_trace.
+    # No filenames, client addresses or media are kept; hashes use a key that stays in trace_dir
+    trace_enabled: bool = False
+    trace_dir: str = "./temp/traces"  # each worker writes requests-<pid>.jsonl here
+    trace_max_bytes: int = 64 * 1024 * 1024  # a worker's file is rotated at this size
+    trace_backup_count: int = 5  # rotated files kept per worker (.1 is the newest)
+
+    # Inference executor: model work runs off the event loop
+    inference_thread_workers: int = 4  # torch inference releases the GIL; batched image requests do not hold one
+    inference_process_workers: int = 0  # audio/video (librosa, OpenCV) workers; 0 runs them on the threads
+    inference_image_pool: str = "thread"  # thread, or process to run image inference in the workers too
+    inference_shm_min_bytes: int = 1024 * 1024  # larger arrays cross processes via shared memory
+
+    # Asynchronous audio/video analysis jobs
+    job_store_path: str = "./temp/jobs.sqlite3"
+    job_upload_dir: str = "./temp/jobs"  # uploads of queued jobs, kept until the job finishes
+    job_workers: int = 2
+    job_result_ttl_seconds: float = 3600  # finished jobs and their results expire after this
+    job_lease_seconds: float = 60  # a running job is requeued if its worker stops renewing it this long
+
+    # Multi-file batch endpoint
+    batch_max_items: int = 256
+    batch_max_total_size: int = 256 * 1024 * 1024  # 256MB of uncompressed images per request
     
     class Config:
         env_file = ".env"
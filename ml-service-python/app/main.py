@@ -1,13 +1,35 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image
-import io
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import List, Optional
 import time
-import random
 import asyncio
 import logging
 import os
-import hashlib
+import threading
+
+from app.config.settings import settings
+from app.utils.batch_upload import read_batch_items, decode_batch_images, batch_item_error
+from app.utils.file_handler import stream_upload
+from app.utils.image_decode import load_image, open_image
+from app.utils.upload_limit import RequestSizeLimitMiddleware
+from app.utils.verdict_cache import VerdictCache
+from app.utils.perceptual_hash import compute_hash
+from app.utils.phash_index import HammingIndex
+from app.utils.process_memory import format_memory, process_memory
+from app.utils.metrics import REGISTRY, attach_timings, count_error, stage
+from app.utils.metrics_middleware import MetricsMiddleware
+from app.utils.profiler import BackgroundProfiler, load_profile
+from app.utils.profiling_middleware import ProfilingMiddleware, client_allowed, parse_allow_list
+from app.utils.request_trace import TraceRecorder, trace_file, trace_saved_file
+from app.utils.trace_middleware import TraceMiddleware
+from app.utils.job_store import JobStore
+from app.services.job_manager import JobManager
+from app.models.heuristic_detector import HEURISTIC_VERSIONS
+from app.utils.early_stopping import STOPPING_RULES
+from app.utils.audio_io import AUDIO_MODES
+from app.services.model_registry import ModelRegistry, parse_modalities
+from app.services.inference_executor import configure_worker_topology, current_topology
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +41,78 @@ app = FastAPI(
     description="AI-powered detection for deepfakes and synthetic media"
 )
 
+# Model versions are part of the verdict cache key; bump them whenever the analysis changes
+if settings.detection_backend == "heuristic":
+    IMAGE_MODEL_VERSION = HEURISTIC_VERSIONS["image"]
+    AUDIO_MODEL_VERSION = HEURISTIC_VERSIONS["audio"]
+    VIDEO_MODEL_VERSION = HEURISTIC_VERSIONS["video"]
+else:
+    IMAGE_MODEL_VERSION = f"detectors_v1:{settings.image_model_name}:{settings.image_backend}"
+    AUDIO_MODEL_VERSION = f"detectors_v1:{settings.audio_model_path or 'default'}:{settings.audio_analysis_mode}"
+    VIDEO_MODEL_VERSION = (f"{IMAGE_MODEL_VERSION}:{settings.video_frame_sampler}:{settings.video_max_frames}"
+                           f":{settings.video_stopping_rule}")
+
+def versioned(version: str, **options) -> str:
+    """Cache key version for a request that overrides analysis options"""
+    overrides = [f"{name}={value}" for name, value in sorted(options.items()) if value is not None]
+    return ":".join([version, *overrides])
+
+verdict_cache = VerdictCache(
+    max_bytes=settings.verdict_cache_max_bytes,
+    ttl_seconds=settings.verdict_cache_ttl_seconds,
+    disk_path=settings.verdict_cache_disk_path,
+    disk_max_entries=settings.verdict_cache_disk_max_entries
+) if settings.verdict_cache_enabled else None
+
+def load_phash_index():
+    """Create the near-duplicate index, restoring the last snapshot if there is one"""
+    if not settings.phash_index_enabled or verdict_cache is None:
+        return None
+    path = settings.phash_index_snapshot_path
+    if path and os.path.exists(path):
+        try:
+            index = HammingIndex.load(path, max_entries=settings.phash_index_max_entries)
+            logger.info(f"🧬 Loaded perceptual hash index: {len(index)} entries from {path}")
+            return index
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load perceptual hash index {path}: {e}")
+    return HammingIndex(max_entries=settings.phash_index_max_entries)
+
+phash_index = load_phash_index()
+phash_inserts_since_snapshot = 0
+
+# Detectors are imported and loaded per modality on first use or by the startup warm-up
+model_registry = ModelRegistry()
+detection_service = None
+detection_service_lock = threading.Lock()
+job_manager = None
+
+def get_detection_service():
+    global detection_service
+    with detection_service_lock:
+        if detection_service is None:
+            from app.services.detection_service import DetectionService
+            detection_service = DetectionService(registry=model_registry)
+        return detection_service
+
+def required_modalities():
+    """Modalities warmed up at startup and required by /ready; the heuristic backend loads no models"""
+    return [] if settings.detection_backend == "heuristic" else parse_modalities(settings.model_warmup)
+
+def run_detection_job(job: dict, progress):
+    return get_detection_service().run_job(job, progress)
+
+# Oversized uploads are refused while streaming in, before the form is parsed
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    default_limit=settings.max_file_size,
+    path_limits={
+        "/api/detect/image": settings.max_image_size,
+        "/api/detect/image/batch": settings.max_file_size,
+        "/api/detect/audio": settings.max_audio_size,
+    }
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,11 +122,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling; not installed at all unless some client may ask for it
+profiling_networks = parse_allow_list(settings.profiling_allow_list)
+if profiling_networks:
+    app.add_middleware(
+        ProfilingMiddleware,
+        networks=profiling_networks,
+        directory=settings.profiling_dir,
+        interval_ms=settings.profiling_interval_ms,
+        max_files=settings.profiling_max_files
+    )
+background_profiler = None
+
+# Optional request trace for offline replay; inside the metrics middleware so it records the same stage timings
+trace_recorder = None
+if settings.trace_enabled:
+    trace_recorder = TraceRecorder(settings.trace_dir, settings.trace_max_bytes, settings.trace_backup_count)
+    app.add_middleware(TraceMiddleware, recorder=trace_recorder)
+
+# Outermost, so requests refused by the size limit are measured too
+if settings.metrics_enabled:
+    app.add_middleware(
+        MetricsMiddleware,
+        pipelines={
+            "/api/detect/image": "image",
+            "/api/detect/audio": "audio",
+            "/api/detect/video": "video",
+        }
+    )
+
+def executor_stat(name: str):
+    return detection_service.executor.get_stats()[name] if detection_service is not None else None
+
+def image_batch_queue_depth():
+    detector = model_registry.loaded("image")
+    return detector.get_batching_stats().get("queue_depth") if detector is not None else None
+
+# Read at scrape time from the components that own the numbers
+REGISTRY.gauge("ml_inference_in_flight", "Model calls running or queued on the inference executor",
+               callback=lambda: executor_stat("in_flight"))
+REGISTRY.gauge("ml_inference_queue_depth", "Model calls waiting for an inference thread",
+               callback=lambda: executor_stat("thread_queue_depth"))
+REGISTRY.gauge("ml_image_batch_queue_depth", "Images waiting for the micro-batcher", callback=image_batch_queue_depth)
+REGISTRY.gauge("ml_jobs", "Asynchronous jobs by status", ("status",),
+               callback=lambda: job_manager.get_stats()["jobs"] if job_manager else None)
+REGISTRY.gauge("ml_model_load_seconds", "Time each modality's detector took to load", ("modality",),
+               callback=lambda: {name: s["load_seconds"] for name, s in model_registry.status().items()})
+REGISTRY.gauge("ml_model_ready", "1 once a modality's detector is loaded", ("modality",),
+               callback=lambda: {name: int(s["state"] == "ready") for name, s in model_registry.status().items()})
+REGISTRY.gauge("ml_process_memory_mb", "This worker's resident memory: rss, unique, shared, pss, swap", ("kind",),
+               callback=lambda: {name[:-3]: value for name, value in process_memory().items()})
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize service on startup"""
     logger.info("🚀 Starting ML Service...")
     
+    # Claim this worker's share of the cores before any model library sizes its thread pools
+    configure_worker_topology()
+    
+    # Workers forked by python -m app.serve inherit the models their parent loaded
+    if model_registry.after_fork():
+        logger.info(f"🍴 Worker {os.getpid()} using preloaded models ({format_memory(process_memory())})")
+    
     # Create directories if they don't exist
     os.makedirs("/app/models", exist_ok=True)
     os.makedirs("/app/temp", exist_ok=True)
@@ -40,6 +192,53 @@ async def startup_event():
     logger.info("✅ ML Service Started Successfully!")
     logger.info("📁 Models directory: /app/models")
     logger.info("📁 Temp directory: /app/temp")
+    
+    # Opened here, per worker: a SQLite connection must not be inherited across fork
+    if verdict_cache is not None and verdict_cache.disk_enabled:
+        await asyncio.to_thread(verdict_cache.open_disk)
+    
+    global job_manager
+    job_manager = JobManager(
+        JobStore(settings.job_store_path, ttl_seconds=settings.job_result_ttl_seconds,
+                 lease_seconds=settings.job_lease_seconds),
+        run_detection_job,
+        upload_dir=settings.job_upload_dir,
+        workers=settings.job_workers,
+        max_upload_size=settings.max_file_size
+    )
+    job_manager.start()
+    
+    global background_profiler
+    if settings.profiling_sample_hz > 0:
+        background_profiler = BackgroundProfiler(
+            settings.profiling_sample_hz, settings.profiling_dir, settings.profiling_flush_seconds
+        ).start()
+        logger.info(f"🔬 Always-on profiling at {settings.profiling_sample_hz:g} Hz -> {background_profiler.path}")
+    
+    # Started per worker, after any fork, so each process writes its own trace file
+    if trace_recorder is not None:
+        trace_recorder.start()
+        logger.info(f"🧾 Tracing detection requests -> {trace_recorder.path}")
+    
+    # Models load in the background so the service is live at once; /ready reports when they are done
+    warmup_modalities = required_modalities()
+    if warmup_modalities:
+        get_detection_service()  # starts the inference process workers, if any
+        model_registry.warm_up(warmup_modalities)
+        logger.info(f"🔥 Warming up models: {', '.join(warmup_modalities)}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist in-memory indexes and stop background workers on shutdown"""
+    await snapshot_phash_index()
+    if job_manager is not None:
+        job_manager.stop()
+    if detection_service is not None:
+        detection_service.shutdown()
+    if background_profiler is not None:
+        background_profiler.stop()
+    if trace_recorder is not None:
+        trace_recorder.stop()
 
 @app.get("/")
 async def root():
@@ -52,14 +251,177 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for Docker"""
+    """Liveness check for Docker; healthy while the process serves requests, loaded or not"""
     return {
         "status": "healthy",
         "service": "ml-service",
         "timestamp": time.time(),
-        "uptime": "running"
+        "uptime": "running",
+        "models": model_registry.status(),
+        "topology": current_topology().describe() if current_topology() else None
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 200 once the warm-up modalities (and inference workers) are loaded, else 503"""
+    modalities = model_registry.status()
+    required = required_modalities()
+    workers_ready = detection_service is None or detection_service.executor.workers_ready()
+    ready = workers_ready and all(modalities[name]["state"] == "ready" for name in required)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "required": required,
+            "modalities": modalities,
+            "inference_workers_ready": workers_ready,
+            "timestamp": time.time()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: latency histograms per endpoint and pipeline stage, gauges and error counters"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    # Off the loop: gauges read /proc and the job store at scrape time
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """Folded stacks of a profiled request (flamegraph.pl, speedscope); allow-listed clients only"""
+    if not client_allowed(request.scope, profiling_networks):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    folded = await asyncio.to_thread(load_profile, settings.profiling_dir, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Verdict cache hit, miss and eviction counters"""
+    if verdict_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await asyncio.to_thread(verdict_cache.get_stats))}
+
+def video_options(frame_budget: Optional[int], min_frames: Optional[int], stopping_rule: Optional[str]) -> dict:
+    """Validated per-request video options (400 on bad values); the frame budget is clamped to the configured cap"""
+    if frame_budget is not None and frame_budget < 1:
+        raise HTTPException(status_code=400, detail="frame_budget must be at least 1")
+    if min_frames is not None and min_frames < 1:
+        raise HTTPException(status_code=400, detail="min_frames must be at least 1")
+    if stopping_rule is not None and stopping_rule != "none" and stopping_rule not in STOPPING_RULES:
+        rules = ", ".join(["none", *STOPPING_RULES])
+        raise HTTPException(status_code=400, detail=f"stopping_rule must be one of: {rules}")
+    if frame_budget is not None:
+        frame_budget = min(frame_budget, settings.video_max_frame_budget)
+    return {"frame_budget": frame_budget, "min_frames": min_frames, "stopping_rule": stopping_rule}
+
+def audio_options(audio_mode: Optional[str]) -> dict:
+    """Validated per-request audio options (400 on an unknown mode)"""
+    if audio_mode is not None and audio_mode not in AUDIO_MODES:
+        raise HTTPException(status_code=400, detail=f"audio_mode must be one of: {', '.join(AUDIO_MODES)}")
+    return {"audio_mode": audio_mode}
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...), frame_budget: Optional[int] = None,
+                     min_frames: Optional[int] = None, stopping_rule: Optional[str] = None,
+                     audio_mode: Optional[str] = None):
+    """Queue a video or audio analysis and return its job id immediately"""
+    content_type = file.content_type or ""
+    if content_type.startswith('video/'):
+        media_type = 'video'
+        options = video_options(frame_budget, min_frames, stopping_rule)
+    elif content_type.startswith('audio/'):
+        media_type = 'audio'
+        options = audio_options(audio_mode)
+    else:
+        raise HTTPException(status_code=400, detail="File must be a video or audio file")
+    
+    return await job_manager.submit(file, media_type, options)
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    """Job worker and queue counters"""
+    return await asyncio.to_thread(job_manager.get_stats)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, progress (frames or windows done / total) and, once finished, the result"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; a running job releases its worker at its next progress step"""
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+async def get_cached_verdict(media_type: str, model_version: str, content_hash: str, filename: str):
+    """Return a cached verdict for this content, re-labelled with the current filename"""
+    if verdict_cache is None:
+        return None
+    result = await verdict_cache.get_async(VerdictCache.make_key(media_type, model_version, content_hash))
+    if result is not None:
+        result['cached'] = True
+        result.setdefault('file_info', {})['filename'] = filename
+        logger.info(f"⚡ Verdict cache hit for {media_type} {content_hash[:12]}")
+    return result
+
+def is_verdict(result: dict) -> bool:
+    """Whether a result is a real verdict: not an error, nor the detector's random fallback"""
+    return 'error' not in result and not result.get('model_info', {}).get('fallback')
+
+def log_result(label: str, result: dict):
+    if 'error' in result:
+        logger.warning(f"⚠️ {label}: {result['error']}")
+    else:
+        logger.info(f"📊 {label}: {result['prediction']} (confidence: {result.get('confidence', 0.0):.2f})")
+
+async def store_verdict(media_type: str, model_version: str, content_hash: str, result: dict):
+    """Remember a verdict for later uploads of the same content; errors and fallbacks are never kept"""
+    if verdict_cache is not None and is_verdict(result):
+        await verdict_cache.put_async(VerdictCache.make_key(media_type, model_version, content_hash), result)
+
+async def find_near_duplicate_verdict(image_phash: int, filename: str):
+    """Return the verdict of the nearest already-analyzed image within the configured Hamming radius.
+
+    Matches whose verdict has left the cache are dropped from the index and the next nearest is tried.
+    """
+    for distance, original_hash, _ in phash_index.query(image_phash, settings.phash_max_distance):
+        result = await get_cached_verdict('image', IMAGE_MODEL_VERSION, original_hash, filename)
+        if result is None:
+            phash_index.discard(original_hash)
+            continue
+        result['near_duplicate_of'] = {'content_hash': original_hash, 'hamming_distance': distance}
+        logger.info(f"🧬 Near-duplicate of {original_hash[:12]} (distance {distance})")
+        return result
+    return None
+
+async def remember_phash(image_phash: int, content_hash: str):
+    """Index an analyzed image and snapshot the index every phash_snapshot_every inserts"""
+    global phash_inserts_since_snapshot
+    phash_index.add(image_phash, content_hash)
+    phash_inserts_since_snapshot += 1
+    if phash_inserts_since_snapshot >= settings.phash_snapshot_every:
+        await snapshot_phash_index()
+
+async def snapshot_phash_index():
+    global phash_inserts_since_snapshot
+    path = settings.phash_index_snapshot_path
+    if phash_index is None or not path or phash_inserts_since_snapshot == 0:
+        return
+    phash_inserts_since_snapshot = 0
+    try:
+        await asyncio.to_thread(phash_index.save, path)
+        logger.info(f"💾 Saved perceptual hash index ({len(phash_index)} entries) to {path}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save perceptual hash index {path}: {e}")
+
 @app.post("/api/detect/image")
 async def detect_image(file: UploadFile = File(...)):
     """Detect if uploaded image is real or synthetic"""
@@ -70,39 +432,71 @@ async def detect_image(file: UploadFile = File(...)):
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read and validate image
-        contents = await file.read()
-        logger.info(f"📁 File size: {len(contents)} bytes")
+        # Hash and measure the spooled upload chunk by chunk; it is never copied into bytes
+        with stage("upload"):
+            upload = await stream_upload(file, max_size=settings.max_image_size)
+        logger.info(f"📁 File size: {upload.size} bytes")
+        traced = trace_file('image', upload.size, upload.content_hash, file.content_type)
         
+        # Re-uploads of the same content skip decoding and analysis entirely
+        content_hash = upload.content_hash
+        with stage("cache"):
+            cached = await get_cached_verdict('image', IMAGE_MODEL_VERSION, content_hash, file.filename)
+        if cached is not None:
+            return attach_timings(cached)
+        
+        service = get_detection_service()
         try:
-            image = Image.open(io.BytesIO(contents))
-            logger.info(f"🖼️ Image loaded: {image.size}, mode: {image.mode}")
+            # Opened straight from the spool and decoded off the event loop, here, so a truncated
+            # or corrupt upload is a 400; JPEGs only at the resolution the model needs
+            with stage("decode"):
+                image = open_image(file.file)
+                dimensions = image.size
+                await asyncio.to_thread(load_image, image, service.image_draft_size())
+            traced.update(width=dimensions[0], height=dimensions[1])
+            logger.info(f"🖼️ Image loaded: {dimensions}, mode: {image.mode}")
         except Exception as e:
             logger.error(f"Invalid image file: {e}")
+            count_error("invalid_image")
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-            logger.info("🔄 Converted to RGB")
-        
-        # Simulate ML processing time
-        await asyncio.sleep(2)
+        # Recompressed, resized or screenshotted copies of an analyzed image reuse its verdict
+        image_phash = None
+        if phash_index is not None:
+            with stage("phash"):
+                image_phash = await asyncio.to_thread(compute_hash, image, settings.phash_algorithm)
+                result = await find_near_duplicate_verdict(image_phash, file.filename)
+            if result is not None:
+                result['file_info'].update({
+                    'size': upload.size,
+                    'dimensions': dimensions,
+                    'mode': image.mode,
+                    'format': str(image.format)
+                })
+                await store_verdict('image', IMAGE_MODEL_VERSION, content_hash, result)
+                return attach_timings(result)
         
-        # Generate BALANCED prediction
-        result = generate_balanced_image_prediction(file.filename, image.size, contents)
+        with stage("analysis"):
+            result = await service.analyze_image(image, file.filename, content_hash)
+        if 'error' in result:
+            # Only the header was read before; the pixels turned out to be undecodable
+            logger.error(f"Invalid image file: {result['error']}")
+            raise HTTPException(status_code=400, detail="Invalid image file")
         
         # Add file metadata
         result['file_info'] = {
             'filename': file.filename,
-            'size': len(contents),
-            'dimensions': image.size,
+            'size': upload.size,
+            'dimensions': dimensions,
             'mode': image.mode,
             'format': str(image.format)
         }
+        await store_verdict('image', IMAGE_MODEL_VERSION, content_hash, result)
+        if image_phash is not None and is_verdict(result):
+            await remember_phash(image_phash, content_hash)
         
-        logger.info(f"📊 Result: {result['prediction']} (confidence: {result['confidence']:.2f})")
-        return result
+        log_result("Result", result)
+        return attach_timings(result)
         
     except HTTPException:
         raise
@@ -110,228 +504,169 @@ async def detect_image(file: UploadFile = File(...)):
         logger.error(f"❌ Image analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post("/api/detect/image/batch")
+async def detect_image_batch(files: List[UploadFile] = File(...)):
+    """Detect real vs synthetic for many images (or zip/tar archives of images) in one request"""
+    try:
+        start_time = time.time()
+        with stage("upload"):
+            items = await read_batch_items(
+                files, settings.batch_max_items, settings.max_image_size, settings.batch_max_total_size
+            )
+        logger.info(f"🔍 Analyzing image batch: {len(items)} item(s) from {len(files)} part(s)")
+
+        # Cached items skip decoding; the rest are decoded concurrently and
+        # bad items carry an error instead of failing the batch
+        with stage("cache"):
+            content_hashes = [item.content_hash for item in items]
+            traced = [trace_file('image', len(item.data or b''), content_hash, item.content_type)
+                      for item, content_hash in zip(items, content_hashes)]
+            results = [
+                await get_cached_verdict('image', IMAGE_MODEL_VERSION, content_hash, item.filename) if content_hash else None
+                for item, content_hash in zip(items, content_hashes)
+            ]
+        pending = [item for item, cached in zip(items, results) if cached is None]
+        with stage("decode"):
+            images = await decode_batch_images(pending)
+
+        decoded = []
+        for item, image in zip(pending, images):
+            if image is None:
+                count_error("invalid_image")
+                results[item.index] = batch_item_error(item)
+                continue
+            traced[item.index].update(width=image.width, height=image.height)
+            decoded.append((item, image))
+
+        with stage("analysis"):
+            predictions = await get_detection_service().analyze_images(
+                [image for _, image in decoded],
+                [item.filename for item, _ in decoded],
+                [content_hashes[item.index] for item, _ in decoded]
+            )
+
+        for (item, image), result in zip(decoded, predictions):
+            if 'error' in result:
+                item.error = result['error']
+                results[item.index] = batch_item_error(item)
+                continue
+            content_hash = content_hashes[item.index]
+            result['file_info'] = {
+                'filename': item.filename,
+                'size': len(item.data),
+                'dimensions': image.size,
+                'mode': image.mode,
+                'format': str(item.image_format)
+            }
+            await store_verdict('image', IMAGE_MODEL_VERSION, content_hash, result)
+            results[item.index] = result
+
+        for item, result in zip(items, results):
+            result['index'] = item.index
+
+        failed = sum(1 for r in results if 'error' in r)
+        logger.info(f"📊 Batch result: {len(results) - failed} analyzed, {failed} failed")
+        return attach_timings({
+            'count': len(results),
+            'failed': failed,
+            'results': results,
+            'processing_time': time.time() - start_time
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Batch image analysis failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
 @app.post("/api/detect/audio")
-async def detect_audio(file: UploadFile = File(...)):
-    """Detect if uploaded audio is real or synthetic"""
+async def detect_audio(file: UploadFile = File(...), audio_mode: Optional[str] = None):
+    """Detect if uploaded audio is real or synthetic; ``audio_mode`` is "first" (first window) or "stream" """
+    service = get_detection_service()
+    upload = None
     try:
         logger.info(f"🎵 Analyzing audio: {file.filename}")
         
         if not file.content_type or not file.content_type.startswith('audio/'):
             raise HTTPException(status_code=400, detail="File must be an audio file")
+        audio_mode = audio_options(audio_mode)["audio_mode"]
         
-        contents = await file.read()
-        await asyncio.sleep(3)  # Simulate processing
+        # Hashed chunk by chunk, and streamed to a temp file only if the detectors need one
+        with stage("upload"):
+            upload = await service.receive_upload(file, '.wav', settings.max_audio_size)
+        await trace_saved_file('audio', upload.path, upload.size, upload.content_hash, file.content_type)
+        content_hash = upload.content_hash
+        model_version = versioned(AUDIO_MODEL_VERSION, audio_mode=audio_mode)
+        with stage("cache"):
+            cached = await get_cached_verdict('audio', model_version, content_hash, file.filename)
+        if cached is not None:
+            return attach_timings(cached)
         
-        result = generate_balanced_audio_prediction(file.filename, contents)
+        with stage("analysis"):
+            result = await service.analyze_audio(upload.path, file.filename, content_hash, mode=audio_mode)
         result['file_info'] = {
             'filename': file.filename,
-            'size': len(contents),
+            'size': upload.size,
             'content_type': file.content_type
         }
+        await store_verdict('audio', model_version, content_hash, result)
         
-        logger.info(f"📊 Audio result: {result['prediction']} (confidence: {result['confidence']:.2f})")
-        return result
+        log_result("Audio result", result)
+        return attach_timings(result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Audio analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    finally:
+        if upload is not None and upload.path:
+            service.file_handler.cleanup_file(upload.path)
 
 @app.post("/api/detect/video")
-async def detect_video(file: UploadFile = File(...)):
-    """Detect if uploaded video is real or synthetic"""
+async def detect_video(file: UploadFile = File(...), frame_budget: Optional[int] = None,
+                       min_frames: Optional[int] = None, stopping_rule: Optional[str] = None):
+    """Detect if uploaded video is real or synthetic; the frame options trade latency for certainty"""
+    service = get_detection_service()
+    upload = None
     try:
         logger.info(f"🎬 Analyzing video: {file.filename}")
         
         if not file.content_type or not file.content_type.startswith('video/'):
             raise HTTPException(status_code=400, detail="File must be a video file")
+        options = video_options(frame_budget, min_frames, stopping_rule)
         
-        contents = await file.read()
-        await asyncio.sleep(5)  # Simulate processing
+        # Hashed chunk by chunk, and streamed to a temp file only if the detectors need one
+        with stage("upload"):
+            upload = await service.receive_upload(file, '.mp4', settings.max_file_size)
+        await trace_saved_file('video', upload.path, upload.size, upload.content_hash, file.content_type)
+        content_hash = upload.content_hash
+        model_version = versioned(VIDEO_MODEL_VERSION, **options)
+        with stage("cache"):
+            cached = await get_cached_verdict('video', model_version, content_hash, file.filename)
+        if cached is not None:
+            return attach_timings(cached)
         
-        result = generate_balanced_video_prediction(file.filename, contents)
+        with stage("analysis"):
+            result = await service.analyze_video(upload.path, file.filename, content_hash, **options)
         result['file_info'] = {
             'filename': file.filename,
-            'size': len(contents),
+            'size': upload.size,
             'content_type': file.content_type
         }
+        await store_verdict('video', model_version, content_hash, result)
         
-        logger.info(f"📊 Video result: {result['prediction']} (confidence: {result['confidence']:.2f})")
-        return result
+        log_result("Video result", result)
+        return attach_timings(result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Video analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
-
-def generate_balanced_image_prediction(filename: str, dimensions: tuple, file_contents: bytes):
-    """Generate BALANCED image prediction using multiple factors"""
-    
-    # Create deterministic seed from file content for consistency
-    content_hash = hashlib.md5(file_contents).hexdigest()
-    random.seed(int(content_hash[:8], 16))
-    
-    filename_lower = filename.lower()
-    width, height = dimensions
-    
-    # Strong indicators of FAKE content
-    fake_indicators = [
-        'generated', 'ai', 'fake', 'synthetic', 'deepfake', 'artificial', 
-        'created', 'stylegan', 'midjourney', 'dalle', 'stable_diffusion',
-        'gpt', 'chatgpt', 'gemini', 'claude', 'diffusion', 'gan'
-    ]
-    
-    # Strong indicators of REAL content  
-    real_indicators = [
-        'photo', 'camera', 'dslr', 'iphone', 'samsung', 'canon', 'nikon',
-        'whatsapp', 'telegram', 'signal', 'messenger', 'original', 'raw'
-    ]
-    
-    # Calculate base probabilities
-    base_fake_prob = 0.5  # Start with 50/50 baseline
-    
-    # Filename analysis
-    fake_score = sum(1 for indicator in fake_indicators if indicator in filename_lower)
-    real_score = sum(1 for indicator in real_indicators if indicator in filename_lower)
-    
-    if fake_score > 0:
-        # Strong fake indicators push towards fake
-        base_fake_prob += 0.3 * fake_score
-    elif real_score > 0:
-        # Strong real indicators push towards real
-        base_fake_prob -= 0.25 * real_score
-    elif 'selfie' in filename_lower or 'pic' in filename_lower:
-        # Moderate real indicators
-        base_fake_prob -= 0.15
-    
-    # Image dimension analysis
-    total_pixels = width * height
-    
-    if total_pixels < 50000:  # Very small images (< 224x224)
-        base_fake_prob += 0.1  # Slightly more likely to be processed/fake
-    elif total_pixels > 8000000:  # Very large images (> 4K)
-        base_fake_prob -= 0.05  # High-res photos more likely real
-    
-    # Perfect square dimensions (common in AI generation)
-    if width == height and width in [256, 512, 1024, 2048]:
-        base_fake_prob += 0.15
-    
-    # Add some controlled randomness for variety
-    random_factor = random.uniform(-0.1, 0.1)
-    base_fake_prob += random_factor
-    
-    # Ensure probabilities are in valid range
-    fake_prob = max(0.05, min(0.95, base_fake_prob))
-    real_prob = 1.0 - fake_prob
-    
-    # Determine prediction
-    prediction = 'fake' if fake_prob > real_prob else 'real'
-    confidence = max(fake_prob, real_prob)
-    
-    # Add slight confidence reduction for uncertainty
-    confidence = max(0.55, confidence * random.uniform(0.9, 1.0))
-    
-    logger.info(f"🎯 Analysis factors - Fake indicators: {fake_score}, Real indicators: {real_score}, Dimensions: {dimensions}")
-    
-    return {
-        'prediction': prediction,
-        'confidence': float(confidence),
-        'fake_probability': float(fake_prob),
-        'real_probability': float(real_prob),
-        'processing_time': random.uniform(1.8, 3.2),
-        'model_info': {
-            'model_name': 'balanced_analyzer_v2',
-            'method': 'multi_factor_analysis',
-            'device': 'cpu',
-            'factors_analyzed': ['filename', 'dimensions', 'content_hash']
-        }
-    }
-
-def generate_balanced_audio_prediction(filename: str, file_contents: bytes):
-    """Generate balanced audio prediction"""
-    
-    # Create deterministic seed
-    content_hash = hashlib.md5(file_contents).hexdigest()
-    random.seed(int(content_hash[:8], 16))
-    
-    filename_lower = filename.lower()
-    
-    # Audio-specific fake indicators
-    fake_indicators = ['tts', 'synthetic', 'voice_clone', 'ai_voice', 'generated']
-    real_indicators = ['recording', 'mic', 'interview', 'call', 'voice_memo']
-    
-    base_fake_prob = 0.4  # Audio is generally more likely to be real
-    
-    fake_score = sum(1 for indicator in fake_indicators if indicator in filename_lower)
-    real_score = sum(1 for indicator in real_indicators if indicator in filename_lower)
-    
-    if fake_score > 0:
-        base_fake_prob += 0.3
-    elif real_score > 0:
-        base_fake_prob -= 0.2
-    
-    # Add randomness
-    base_fake_prob += random.uniform(-0.15, 0.15)
-    
-    fake_prob = max(0.05, min(0.85, base_fake_prob))
-    real_prob = 1.0 - fake_prob
-    prediction = 'fake' if fake_prob > real_prob else 'real'
-    confidence = max(fake_prob, real_prob)
-    
-    return {
-        'prediction': prediction,
-        'confidence': float(confidence),
-        'fake_probability': float(fake_prob),
-        'real_probability': float(real_prob),
-        'processing_time': random.uniform(2.5, 4.2),
-        'model_info': {
-            'model_name': 'audio_analyzer_v2',
-            'method': 'spectral_analysis',
-            'device': 'cpu'
-        }
-    }
-
-def generate_balanced_video_prediction(filename: str, file_contents: bytes):
-    """Generate balanced video prediction"""
-    
-    # Create deterministic seed
-    content_hash = hashlib.md5(file_contents).hexdigest()
-    random.seed(int(content_hash[:8], 16))
-    
-    filename_lower = filename.lower()
-    
-    # Video-specific indicators
-    fake_indicators = ['deepfake', 'faceswap', 'synthetic', 'ai_video']
-    real_indicators = ['recording', 'camera', 'footage', 'clip']
-    
-    base_fake_prob = 0.45  # Videos slightly more likely to be manipulated
-    
-    fake_score = sum(1 for indicator in fake_indicators if indicator in filename_lower)
-    real_score = sum(1 for indicator in real_indicators if indicator in filename_lower)
-    
-    if fake_score > 0:
-        base_fake_prob += 0.35
-    elif real_score > 0:
-        base_fake_prob -= 0.25
-    
-    # Add randomness
-    base_fake_prob += random.uniform(-0.1, 0.1)
-    
-    fake_prob = max(0.05, min(0.9, base_fake_prob))
-    real_prob = 1.0 - fake_prob
-    prediction = 'fake' if fake_prob > real_prob else 'real'
-    confidence = max(fake_prob, real_prob)
-    
-    return {
-        'prediction': prediction,
-        'confidence': float(confidence),
-        'fake_probability': float(fake_prob),
-        'real_probability': float(real_prob),
-        'processing_time': random.uniform(8.5, 14.0),
-        'model_info': {
-            'model_name': 'video_analyzer_v2',
-            'method': 'multimodal_fusion',
-            'device': 'cpu'
-        }
-    }
+    finally:
+        if upload is not None and upload.path:
+            service.file_handler.cleanup_file(upload.path)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,20 +1,36 @@
-import torch
 import librosa
+import soundfile
 import numpy as np
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional
+from functools import cached_property
 import logging
 
+from app.config.settings import settings
+from app.utils.audio_io import AUDIO_MODES, iter_pcm_blocks, sliding_windows
+from app.utils.audio_features import AudioFeatureExtractor
+from app.utils.metrics import count_error, stage, timed_iter
+from app.utils.progress import AnalysisCancelled, ProgressCallback, report_progress
+
+if TYPE_CHECKING:
+    import torch
+
 logger = logging.getLogger(__name__)
 
 class AudioDeepfakeDetector:
     def __init__(self):
-        self.device = self._get_device()
         self.sample_rate = 16000
-        self.duration = 4.0  # 4 seconds
-        logger.info(f"Audio detector initialized on {self.device}")
+        self.duration = settings.audio_window_seconds
+        self.feature_extractor = AudioFeatureExtractor(sample_rate=self.sample_rate)
+        logger.info("Audio detector initialized")
+    
+    @cached_property
+    def device(self) -> "torch.device":
+        """Best available device; resolved on first use since the feature pipeline does not need torch"""
+        return self._get_device()
     
-    def _get_device(self) -> torch.device:
+    def _get_device(self) -> "torch.device":
         """Get the best available device"""
+        import torch
         if torch.cuda.is_available():
             return torch.device("cuda")
         elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
@@ -22,12 +38,129 @@ class AudioDeepfakeDetector:
         else:
             return torch.device("cpu")
     
-    def predict(self, audio_path: str) -> Dict[str, Any]:
-        """Predict if audio is fake or real"""
+    def predict(self, audio_path: str, mode: Optional[str] = None,
+                progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Predict if audio is fake or real.
+
+        ``mode`` defaults to ``settings.audio_analysis_mode``: "first" decodes and scores
+        only the first window, "stream" scores overlapping windows across the whole file.
+        ``progress`` is called with (windows scored, windows expected).
+        """
+        mode = mode or settings.audio_analysis_mode
         try:
-            # Load and preprocess audio
-            audio, sr = librosa.load(audio_path, sr=self.sample_rate)
+            if mode == "stream":
+                return self.predict_stream(audio_path, progress)
+            if mode not in AUDIO_MODES:
+                raise ValueError(f"Unknown audio analysis mode '{mode}' (available: {', '.join(AUDIO_MODES)})")
+
+            # Only the first window is decoded and resampled
+            with stage("decode", "audio"):
+                audio, sr = librosa.load(audio_path, sr=self.sample_rate, duration=self.duration)
+            result = self.predict_waveform(audio)
+            result["analysis_mode"] = "first"
+            report_progress(progress, 1, 1)
+            return result
             
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Error during audio prediction: {e}")
+            return self._error_result(e)
+
+    def predict_stream(self, audio_path: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Score overlapping windows over the full duration with constant memory.
+
+        The verdict follows ``settings.audio_stream_aggregate`` over the window scores;
+        every window's score is returned so late synthetic segments stay visible.
+        """
+        window = int(self.sample_rate * self.duration)
+        hop = min(window, max(1, int(self.sample_rate * settings.audio_hop_seconds)))
+
+        expected = self._expected_windows(audio_path, window, hop) if progress else 0
+        windows = []
+        pending = []
+        total_samples = 0
+        blocks = timed_iter(self._iter_blocks(audio_path), "decode", "audio")
+        for start, samples, valid in sliding_windows(blocks, window, hop):
+            total_samples = start + valid
+            windows.append({
+                "start": round(start / self.sample_rate, 3),
+                "end": round((start + valid) / self.sample_rate, 3)
+            })
+            pending.append(samples)
+            if len(pending) == settings.audio_feature_batch_size:
+                self._flush_windows(windows, pending)
+                report_progress(progress, len(windows), max(expected, len(windows)))
+        self._flush_windows(windows, pending)
+        report_progress(progress, len(windows), len(windows))
+        if not windows:
+            raise ValueError("No audio samples decoded")
+
+        scores = np.array([w["fake_probability"] for w in windows])
+        peak = int(scores.argmax())
+        aggregate = {
+            "method": settings.audio_stream_aggregate,
+            "mean": float(scores.mean()),
+            "max": float(scores[peak]),
+            "max_window_start": windows[peak]["start"]
+        }
+        fake_prob = aggregate["max"] if settings.audio_stream_aggregate == "max" else aggregate["mean"]
+
+        result = self._format_result(fake_prob)
+        result.update({
+            "analysis_mode": "stream",
+            "duration_analyzed": round(total_samples / self.sample_rate, 3),
+            "window_seconds": self.duration,
+            "hop_seconds": hop / self.sample_rate,
+            "windows": windows,
+            "aggregate": aggregate
+        })
+        return result
+
+    def _expected_windows(self, audio_path: str, window: int, hop: int) -> int:
+        """Window count from the container's declared length; 0 when soundfile cannot tell"""
+        try:
+            samples = int(soundfile.info(audio_path).duration * self.sample_rate)
+        except Exception:
+            return 0
+        return 1 + max(0, -(-(samples - window) // hop))
+
+    def _flush_windows(self, windows: List[Dict[str, Any]], pending: List[np.ndarray]) -> None:
+        """Score the pending windows in one batch and fill in the trailing entries of ``windows``"""
+        if not pending:
+            return
+        scores = self._score_windows(pending)
+        for entry, score in zip(windows[-len(pending):], scores):
+            entry["fake_probability"] = score
+        pending.clear()
+
+    def _iter_blocks(self, audio_path: str) -> Iterator[np.ndarray]:
+        """Contiguous mono blocks at ``self.sample_rate``, read block by block from disk.
+
+        soundfile-readable formats are streamed with ``librosa.stream`` and each block is
+        resampled on its own; anything else (mp3 on old libsndfile, m4a, ...) is decoded
+        through an ffmpeg pipe.
+        """
+        block_seconds = settings.audio_stream_block_seconds
+        try:
+            native_rate = soundfile.info(audio_path).samplerate
+        except Exception:
+            native_rate = None
+
+        if native_rate is None:
+            yield from iter_pcm_blocks(audio_path, self.sample_rate, int(self.sample_rate * block_seconds))
+            return
+
+        block_length = max(1, int(native_rate * block_seconds))
+        for block in librosa.stream(audio_path, block_length=1, frame_length=block_length,
+                                    hop_length=block_length, mono=True):
+            if native_rate != self.sample_rate:
+                block = librosa.resample(block, orig_sr=native_rate, target_sr=self.sample_rate)
+            yield block
+    
+    def predict_waveform(self, audio: np.ndarray) -> Dict[str, Any]:
+        """Predict if already-decoded mono audio at ``self.sample_rate`` is fake or real"""
+        try:
             # Ensure fixed duration
             target_length = int(self.sample_rate * self.duration)
             if len(audio) < target_length:
@@ -37,53 +170,44 @@ class AudioDeepfakeDetector:
                 # Truncate if too long
                 audio = audio[:target_length]
             
-            # Extract features (using spectral features as a simple baseline)
-            features = self._extract_features(audio)
-            
-            # Simple heuristic-based detection (replace with actual model)
-            fake_prob = self._simple_audio_classifier(features)
-            
-            return self._format_result(fake_prob, audio_path)
+            return self._format_result(self._score_window(audio))
             
         except Exception as e:
             logger.error(f"Error during audio prediction: {e}")
-            return {
-                "error": f"Failed to analyze audio: {str(e)}",
-                "fake_probability": 0.5,
-                "real_probability": 0.5,
-                "prediction": "unknown"
-            }
+            return self._error_result(e)
+    
+    def _score_window(self, audio: np.ndarray) -> float:
+        """Fake probability of one fixed-length window"""
+        # Extract features (using spectral features as a simple baseline)
+        with stage("features", "audio"):
+            features = self._extract_features(audio)
+        
+        # Simple heuristic-based detection (replace with actual model)
+        with stage("scoring", "audio"):
+            return self._simple_audio_classifier(features)
     
     def _extract_features(self, audio: np.ndarray) -> Dict[str, float]:
         """Extract audio features for classification"""
         try:
-            # Spectral features
-            spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=self.sample_rate)[0]
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=self.sample_rate)[0]
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=self.sample_rate)[0]
-            
-            # Zero crossing rate
-            zcr = librosa.feature.zero_crossing_rate(audio)[0]
-            
-            # MFCC features
-            mfccs = librosa.feature.mfcc(y=audio, sr=self.sample_rate, n_mfcc=13)
-            
-            # Chroma features
-            chroma = librosa.feature.chroma_stft(y=audio, sr=self.sample_rate)
-            
-            return {
-                "spectral_centroid_mean": np.mean(spectral_centroids),
-                "spectral_centroid_std": np.std(spectral_centroids),
-                "spectral_rolloff_mean": np.mean(spectral_rolloff),
-                "spectral_bandwidth_mean": np.mean(spectral_bandwidth),
-                "zcr_mean": np.mean(zcr),
-                "mfccs_mean": np.mean(mfccs),
-                "mfccs_std": np.std(mfccs),
-                "chroma_mean": np.mean(chroma)
-            }
+            # Spectral, zero-crossing, MFCC and chroma features from one shared STFT
+            return self.feature_extractor.extract(audio)
         except Exception as e:
             logger.warning(f"Feature extraction failed: {e}")
+            count_error("audio_features")
             return {"error": True}
+
+    def _score_windows(self, windows: List[np.ndarray]) -> List[float]:
+        """Fake probabilities for equal-length windows, features extracted in one batched pass"""
+        try:
+            with stage("features", "audio"):
+                features = self.feature_extractor.extract_batch(np.stack(windows))
+            rows = [{name: float(values[i]) for name, values in features.items()} for i in range(len(windows))]
+        except Exception as e:
+            logger.warning(f"Feature extraction failed: {e}")
+            count_error("audio_features")
+            rows = [{"error": True}] * len(windows)
+        with stage("scoring", "audio"):
+            return [float(self._simple_audio_classifier(row)) for row in rows]
     
     def _simple_audio_classifier(self, features: Dict[str, float]) -> float:
         """Simple heuristic classifier (replace with actual model)"""
@@ -107,7 +231,17 @@ class AudioDeepfakeDetector:
         
         return np.clip(score, 0.0, 1.0)
     
-    def _format_result(self, fake_prob: float, audio_path: str) -> Dict[str, Any]:
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Neutral result returned when analysis fails"""
+        count_error("audio_analysis")
+        return {
+            "error": f"Failed to analyze audio: {str(error)}",
+            "fake_probability": 0.5,
+            "real_probability": 0.5,
+            "prediction": "unknown"
+        }
+    
+    def _format_result(self, fake_prob: float) -> Dict[str, Any]:
         """Format prediction result"""
         real_prob = 1.0 - fake_prob
         prediction = "fake" if fake_prob > 0.5 else "real"
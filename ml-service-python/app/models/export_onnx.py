@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Export the SigLIP image detector to ONNX, quantize it to int8 and check parity against fp32 torch.
+
+    python -m app.models.export_onnx --model /app/models/prithivMLmods/deepfake-detector-model-v1
+    python -m app.models.export_onnx --model ./models/detector --images ./samples --max-prob-diff 0.02
+
+Writes model.onnx and model.int8.onnx (default: <model>/onnx, which is where the
+service looks for them), then reports how far each backend's probabilities move
+from eager fp32 torch and how often the top label flips. Exits non-zero if any
+backend moves more than --max-prob-diff.
+"""
+
+import os
+import sys
+import json
+import inspect
+import argparse
+import numpy as np
+
+from .image_backends import BACKENDS, ONNX_FILES, create_backend, softmax
+
+DEFAULT_MODEL_PATH = "/app/models/prithivMLmods/deepfake-detector-model-v1"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def export_fp32(model, path: str, height: int, width: int, opset: int) -> None:
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model(pixel_values=pixel_values).logits
+
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # the TorchScript exporter handles dynamic batch without onnxscript
+    torch.onnx.export(
+        LogitsOnly(model).eval(),
+        (torch.zeros(1, 3, height, width),),
+        path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+        **kwargs
+    )
+
+
+def quantize_int8(source: str, destination: str) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    # Shape inference and graph cleanup first, as ONNX Runtime recommends before quantizing
+    prepared = destination + ".prep.onnx"
+    try:
+        quant_pre_process(source, prepared)
+        quantize_dynamic(prepared, destination, weight_type=QuantType.QInt8)
+    finally:
+        if os.path.exists(prepared):
+            os.unlink(prepared)
+
+
+def parity_inputs(processor, images_dir, samples: int, seed: int) -> np.ndarray:
+    """Preprocessed sample images, or random-noise images when no directory is given"""
+    from PIL import Image
+    if images_dir:
+        names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))[:samples]
+        images = [Image.open(os.path.join(images_dir, n)).convert("RGB") for n in names]
+    else:
+        rng = np.random.default_rng(seed)
+        images = [Image.fromarray(rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)) for _ in range(samples)]
+    return processor(images=images, return_tensors="np")["pixel_values"].astype(np.float32)
+
+
+def check_parity(reference, backends, pixel_values: np.ndarray, batch_size: int) -> dict:
+    def probabilities(backend):
+        return np.concatenate([softmax(backend.logits(pixel_values[i:i + batch_size]))
+                               for i in range(0, len(pixel_values), batch_size)])
+
+    expected = probabilities(reference)
+    report = {}
+    for backend in backends:
+        probs = probabilities(backend)
+        diff = np.abs(probs - expected)
+        report[backend.name] = {
+            "max_prob_diff": float(diff.max()),
+            "mean_prob_diff": float(diff.mean()),
+            "top1_agreement": float((probs.argmax(-1) == expected.argmax(-1)).mean()),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="local SigLIP classifier directory")
+    parser.add_argument("--out", default=None, help="output directory (default: <model>/onnx)")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--images", default=None, help="directory of sample images for the parity check")
+    parser.add_argument("--samples", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-prob-diff", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import torch
+    from transformers import AutoImageProcessor, SiglipForImageClassification
+    from ..utils.image_decode import PixelSpec
+
+    out_dir = args.out or os.path.join(args.model, "onnx")
+    os.makedirs(out_dir, exist_ok=True)
+    processor = AutoImageProcessor.from_pretrained(args.model, local_files_only=True)
+    model = SiglipForImageClassification.from_pretrained(args.model, local_files_only=True).eval()
+    spec = PixelSpec.from_processor(processor)
+    height, width = (spec.height, spec.width) if spec else (224, 224)
+
+    fp32_path = os.path.join(out_dir, ONNX_FILES["onnx"])
+    int8_path = os.path.join(out_dir, ONNX_FILES["onnx-int8"])
+    print(f"exporting {args.model} -> {fp32_path}")
+    export_fp32(model, fp32_path, height, width, args.opset)
+    print(f"quantizing -> {int8_path}")
+    quantize_int8(fp32_path, int8_path)
+
+    reference = create_backend("torch", model, torch.device("cpu"))
+    others = [create_backend(name, model, torch.device("cpu"), out_dir) for name in BACKENDS if name != "torch"]
+    pixel_values = parity_inputs(processor, args.images, args.samples, args.seed)
+    report = check_parity(reference, others, pixel_values, args.batch_size)
+
+    print(f"\nparity vs fp32 torch over {len(pixel_values)} images")
+    print(f"{'backend':<12} {'size_MB':>8} {'max_prob_diff':>14} {'mean_prob_diff':>15} {'top1_agree':>11}")
+    for name, row in report.items():
+        size = f"{os.path.getsize(os.path.join(out_dir, ONNX_FILES[name])) / 1e6:.1f}" if name in ONNX_FILES else "-"
+        flag = "  FAIL" if row["max_prob_diff"] > args.max_prob_diff else ""
+        print(f"{name:<12} {size:>8} {row['max_prob_diff']:>14.2e} {row['mean_prob_diff']:>15.2e} "
+              f"{row['top1_agreement']:>11.3f}{flag}")
+
+    with open(os.path.join(out_dir, "parity.json"), "w") as f:
+        json.dump({"samples": len(pixel_values), "images": args.images, "backends": report}, f, indent=2)
+    return 1 if any(row["max_prob_diff"] > args.max_prob_diff for row in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import time
+import random
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# The pre-model rules (filename keywords, dimensions, a content-seeded jitter), kept as the
+# zero-latency "heuristic" detection backend. Versions are part of the verdict cache key
+HEURISTIC_VERSIONS = {
+    "image": "balanced_analyzer_v2",
+    "audio": "audio_analyzer_v2",
+    "video": "video_analyzer_v2",
+}
+
+
+def heuristic_image_prediction(filename: Optional[str], dimensions: tuple, content_hash: str) -> Dict[str, Any]:
+    """Generate BALANCED image prediction using multiple factors"""
+    
+    # Deterministic per content, and safe to call from many threads at once
+    started = time.perf_counter()
+    rng = random.Random(int(content_hash[:8], 16))
+    
+    filename_lower = (filename or '').lower()
+    width, height = dimensions
+    
+    # Strong indicators of FAKE content
+    fake_indicators = [
+        'generated', 'ai', 'fake', 'synthetic', 'deepfake', 'artificial', 
+        'created', 'stylegan', 'midjourney', 'dalle', 'stable_diffusion',
+        'gpt', 'chatgpt', 'gemini', 'claude', 'diffusion', 'gan'
+    ]
+    
+    # Strong indicators of REAL content  
+    real_indicators = [
+        'photo', 'camera', 'dslr', 'iphone', 'samsung', 'canon', 'nikon',
+        'whatsapp', 'telegram', 'signal', 'messenger', 'original', 'raw'
+    ]
+    
+    # Calculate base probabilities
+    base_fake_prob = 0.5  # Start with 50/50 baseline
+    
+    # Filename analysis
+    fake_score = sum(1 for indicator in fake_indicators if indicator in filename_lower)
+    real_score = sum(1 for indicator in real_indicators if indicator in filename_lower)
+    
+    if fake_score > 0:
+        # Strong fake indicators push towards fake
+        base_fake_prob += 0.3 * fake_score
+    elif real_score > 0:
+        # Strong real indicators push towards real
+        base_fake_prob -= 0.25 * real_score
+    elif 'selfie' in filename_lower or 'pic' in filename_lower:
+        # Moderate real indicators
+        base_fake_prob -= 0.15
+    
+    # Image dimension analysis
+    total_pixels = width * height
+    
+    if total_pixels < 50000:  # Very small images (< 224x224)
+        base_fake_prob += 0.1  # Slightly more likely to be processed/fake
+    elif total_pixels > 8000000:  # Very large images (> 4K)
+        base_fake_prob -= 0.05  # High-res photos more likely real
+    
+    # Perfect square dimensions (common in AI generation)
+    if width == height and width in [256, 512, 1024, 2048]:
+        base_fake_prob += 0.15
+    
+    # Add some controlled randomness for variety
+    random_factor = rng.uniform(-0.1, 0.1)
+    base_fake_prob += random_factor
+    
+    # Ensure probabilities are in valid range
+    fake_prob = max(0.05, min(0.95, base_fake_prob))
+    real_prob = 1.0 - fake_prob
+    
+    # Determine prediction
+    prediction = 'fake' if fake_prob > real_prob else 'real'
+    confidence = max(fake_prob, real_prob)
+    
+    # Add slight confidence reduction for uncertainty
+    confidence = max(0.55, confidence * rng.uniform(0.9, 1.0))
+    
+    logger.info(f"🎯 Analysis factors - Fake indicators: {fake_score}, Real indicators: {real_score}, Dimensions: {dimensions}")
+    
+    return {
+        'prediction': prediction,
+        'confidence': float(confidence),
+        'fake_probability': float(fake_prob),
+        'real_probability': float(real_prob),
+        'processing_time': time.perf_counter() - started,
+        'model_info': {
+            'model_name': 'balanced_analyzer_v2',
+            'method': 'multi_factor_analysis',
+            'device': 'cpu',
+            'factors_analyzed': ['filename', 'dimensions', 'content_hash']
+        }
+    }
+
+
+def heuristic_audio_prediction(filename: Optional[str], content_hash: str) -> Dict[str, Any]:
+    """Generate balanced audio prediction"""
+    
+    # Deterministic per content
+    started = time.perf_counter()
+    rng = random.Random(int(content_hash[:8], 16))
+    
+    filename_lower = (filename or '').lower()
+    
+    # Audio-specific fake indicators
+    fake_indicators = ['tts', 'synthetic', 'voice_clone', 'ai_voice', 'generated']
+    real_indicators = ['recording', 'mic', 'interview', 'call', 'voice_memo']
+    
+    base_fake_prob = 0.4  # Audio is generally more likely to be real
+    
+    fake_score = sum(1 for indicator in fake_indicators if indicator in filename_lower)
+    real_score = sum(1 for indicator in real_indicators if indicator in filename_lower)
+    
+    if fake_score > 0:
+        base_fake_prob += 0.3
+    elif real_score > 0:
+        base_fake_prob -= 0.2
+    
+    # Add randomness
+    base_fake_prob += rng.uniform(-0.15, 0.15)
+    
+    fake_prob = max(0.05, min(0.85, base_fake_prob))
+    real_prob = 1.0 - fake_prob
+    prediction = 'fake' if fake_prob > real_prob else 'real'
+    confidence = max(fake_prob, real_prob)
+    
+    return {
+        'prediction': prediction,
+        'confidence': float(confidence),
+        'fake_probability': float(fake_prob),
+        'real_probability': float(real_prob),
+        'processing_time': time.perf_counter() - started,
+        'model_info': {
+            'model_name': 'audio_analyzer_v2',
+            'method': 'spectral_analysis',
+            'device': 'cpu'
+        }
+    }
+
+
+def heuristic_video_prediction(filename: Optional[str], content_hash: str) -> Dict[str, Any]:
+    """Generate balanced video prediction"""
+    
+    # Deterministic per content
+    started = time.perf_counter()
+    rng = random.Random(int(content_hash[:8], 16))
+    
+    filename_lower = (filename or '').lower()
+    
+    # Video-specific indicators
+    fake_indicators = ['deepfake', 'faceswap', 'synthetic', 'ai_video']
+    real_indicators = ['recording', 'camera', 'footage', 'clip']
+    
+    base_fake_prob = 0.45  # Videos slightly more likely to be manipulated
+    
+    fake_score = sum(1 for indicator in fake_indicators if indicator in filename_lower)
+    real_score = sum(1 for indicator in real_indicators if indicator in filename_lower)
+    
+    if fake_score > 0:
+        base_fake_prob += 0.35
+    elif real_score > 0:
+        base_fake_prob -= 0.25
+    
+    # Add randomness
+    base_fake_prob += rng.uniform(-0.1, 0.1)
+    
+    fake_prob = max(0.05, min(0.9, base_fake_prob))
+    real_prob = 1.0 - fake_prob
+    prediction = 'fake' if fake_prob > real_prob else 'real'
+    confidence = max(fake_prob, real_prob)
+    
+    return {
+        'prediction': prediction,
+        'confidence': float(confidence),
+        'fake_probability': float(fake_prob),
+        'real_probability': float(real_prob),
+        'processing_time': time.perf_counter() - started,
+        'model_info': {
+            'model_name': 'video_analyzer_v2',
+            'method': 'multimodal_fusion',
+            'device': 'cpu'
+        }
+    }
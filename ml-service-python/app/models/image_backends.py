@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+ONNX_FILES = {
+    "onnx": "model.onnx",
+    "onnx-int8": "model.int8.onnx",
+}
+
+
+class ImageBackend(ABC):
+    """Runs the image classifier on a (N, 3, H, W) float32 batch and returns (N, num_labels) logits"""
+
+    name = "base"
+
+    @abstractmethod
+    def logits(self, pixel_values: np.ndarray) -> np.ndarray:
+        """Logits for one preprocessed batch"""
+
+
+class TorchBackend(ImageBackend):
+    """Eager PyTorch, fp32 or with Linear layers dynamically quantized to int8"""
+
+    def __init__(self, model, device, quantized: bool = False):
+        import torch
+        self.torch = torch
+        self.device = device
+        if quantized:
+            if torch.device(device).type != "cpu":
+                raise RuntimeError("dynamic int8 quantization only runs on CPU")
+            # Weights stored as int8, activations quantized per batch
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.name = "torch-int8" if quantized else "torch"
+
+    def logits(self, pixel_values: np.ndarray) -> np.ndarray:
+        with self.torch.no_grad():
+            # from_numpy shares the buffer, so nothing is copied on CPU
+            inputs = self.torch.from_numpy(pixel_values).to(self.device)
+            return self.model(pixel_values=inputs).logits.float().cpu().numpy()
+
+
+class OnnxBackend(ImageBackend):
+    """ONNX Runtime CPU session over a graph written by ``python -m app.models.export_onnx``"""
+
+    def __init__(self, path: str, name: str = "onnx", threads: int = 0):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.path = path
+        self.name = name
+
+    def logits(self, pixel_values: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(pixel_values)})[0]
+
+
+def onnx_path(onnx_dir: str, name: str) -> str:
+    return os.path.join(onnx_dir, ONNX_FILES[name])
+
+
+def create_backend(name: str, model=None, device=None, onnx_dir: Optional[str] = None,
+                   threads: int = 0) -> ImageBackend:
+    """Build a backend by name; raises if its model or runtime is unavailable"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown image backend '{name}' (available: {', '.join(BACKENDS)})")
+    if name in ("torch", "torch-int8"):
+        if model is None:
+            raise RuntimeError(f"The {name} backend needs the PyTorch model")
+        return TorchBackend(model, device, quantized=name == "torch-int8")
+
+    path = onnx_path(onnx_dir or "", name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; export it with python -m app.models.export_onnx")
+    return OnnxBackend(path, name=name, threads=threads)
+
+
+def available_backends(model=None, device=None, onnx_dir: Optional[str] = None,
+                       threads: int = 0) -> List[ImageBackend]:
+    """Every backend that can be built on this host, skipping (and logging) the rest"""
+    backends = []
+    for name in BACKENDS:
+        try:
+            backends.append(create_backend(name, model, device, onnx_dir, threads))
+        except Exception as e:
+            logger.info(f"⏭️ Image backend {name} unavailable: {e}")
+    return backends
+
+
+def benchmark_backend(backend: ImageBackend, height: int, width: int, batch_size: int = 8,
+                      runs: int = 5) -> Dict[str, Any]:
+    """Median single-image latency and batched throughput of a backend on random input"""
+    rng = np.random.default_rng(0)
+    single = rng.standard_normal((1, 3, height, width), dtype=np.float32)
+    batch = rng.standard_normal((batch_size, 3, height, width), dtype=np.float32)
+    backend.logits(single)  # first call pays for lazy initialization
+    backend.logits(batch)
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.logits(single)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(runs):
+        backend.logits(batch)
+    batch_seconds = (time.perf_counter() - start) / runs
+    return {
+        "backend": backend.name,
+        "latency_ms": float(np.median(latencies)) * 1000,
+        "throughput": batch_size / batch_seconds,
+        "batch_size": batch_size,
+    }
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
@@ -1,42 +1,104 @@
-import cv2
-import tempfile
-import os
-import subprocess
 import numpy as np
-from typing import Dict, Any, List
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
-from .image_detector import ImageDeepfakeDetector
+from .image_detector import ImageDetector
 from .audio_detector import AudioDeepfakeDetector
+from ..config.settings import settings
+from ..utils.frame_sampler import (
+    FrameSampler, SequentialFrameSampler, get_frame_sampler, evenly_spaced_indices, probe_video, set_opencv_threads,
+    shrink_frame
+)
+from ..utils.early_stopping import STOPPING_RULES, coarse_to_fine_order
+from ..utils.frame_dedup import FrameDeduplicator
+from ..utils.audio_io import AudioDecodeError, read_pcm
+from ..utils.metrics import count_error, stage, timed_iter
+from ..utils.profiler import profiled_call
+from ..utils.progress import AnalysisCancelled, ProgressCallback, report_progress
 
 logger = logging.getLogger(__name__)
 
 class VideoDeepfakeDetector:
-    def __init__(self):
-        self.image_detector = ImageDeepfakeDetector()
-        self.audio_detector = AudioDeepfakeDetector()
-        self.max_frames = 30
-        logger.info("Video detector initialized")
+    def __init__(self, image_detector: Optional[ImageDetector] = None,
+                 audio_detector: Optional[AudioDeepfakeDetector] = None):
+        # Share the service's detectors so the image model is only loaded once
+        self.image_detector = image_detector or ImageDetector()
+        self.audio_detector = audio_detector or AudioDeepfakeDetector()
+        self.max_frames = settings.video_max_frames
+        if settings.video_opencv_threads > 0:
+            set_opencv_threads(settings.video_opencv_threads)
+        self.frame_sampler = self._create_frame_sampler(settings.video_frame_sampler)
+        # The audio branch runs here while the calling thread does the visual branch
+        self._audio_pool = ThreadPoolExecutor(
+            max_workers=settings.video_audio_branch_workers, thread_name_prefix="video-audio"
+        )
+        logger.info(f"Video detector initialized (frame sampler: {self.frame_sampler.name})")
     
-    def predict(self, video_path: str) -> Dict[str, Any]:
-        """Predict if video is fake or real"""
+    def _create_frame_sampler(self, name: str) -> FrameSampler:
+        """Build the configured frame sampling strategy"""
+        if name == "sequential":
+            return get_frame_sampler(name, seek_gap=settings.video_seek_gap_frames)
+        if name == "time":
+            return get_frame_sampler(name, interval=settings.video_sample_interval_seconds)
+        return get_frame_sampler(name)
+    
+    def predict(self, video_path: str, frame_budget: Optional[int] = None,
+                min_frames: Optional[int] = None, stopping_rule: Optional[str] = None,
+                progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Predict if video is fake or real.
+
+        ``frame_budget``, ``min_frames`` and ``stopping_rule`` override the configured
+        defaults for this request. With a stopping rule other than "none", frames are
+        analyzed coarse-to-fine and analysis stops once the visual verdict is settled.
+        ``progress`` is called with (frames scored, frames planned) after every batch.
+        """
         try:
-            # Extract frames for visual analysis
-            frames_results = self._analyze_frames(video_path)
+            frame_budget = min(frame_budget or self.max_frames, settings.video_max_frame_budget)
+            min_frames = min_frames or settings.video_min_frames
+            stopping_rule = stopping_rule or settings.video_stopping_rule
+            if stopping_rule != "none" and stopping_rule not in STOPPING_RULES:
+                raise ValueError(f"Unknown stopping rule '{stopping_rule}'")
             
-            # Extract and analyze audio
-            audio_result = self._analyze_audio(video_path)
+            # Near-identical frames of this video share one inference
+            dedup = FrameDeduplicator(settings.video_dedup_threshold) if settings.video_dedup_enabled else None
+            
+            # Run the audio and visual branches concurrently: latency ~ max(visual, audio)
+            # (in this request's context, so its stages are timed and profiled with the request)
+            audio_future = self._audio_pool.submit(
+                contextvars.copy_context().run, profiled_call, self._analyze_audio, video_path
+            )
+            if stopping_rule == "none":
+                frame_scores = self._analyze_frames(video_path, frame_budget, dedup, progress)
+                early_exit = False
+            else:
+                frame_scores, early_exit = self._analyze_frames_adaptive(
+                    video_path, frame_budget, min_frames, stopping_rule, dedup, progress
+                )
+            audio_result = audio_future.result()
             
             # Combine results
-            visual_score = np.mean([r["fake_probability"] for r in frames_results]) if frames_results else 0.5
+            visual_score = float(frame_scores.mean()) if frame_scores.size else 0.5
             audio_score = audio_result.get("fake_probability", 0.5)
             
             # Weighted fusion (70% visual, 30% audio)
             final_score = 0.7 * visual_score + 0.3 * audio_score
             
-            return self._format_result(visual_score, audio_score, final_score, video_path)
+            result = self._format_result(visual_score, audio_score, final_score, video_path)
+            result.update({
+                "frames_analyzed": int(frame_scores.size),
+                "frames_inferred": dedup.frames_inferred if dedup else int(frame_scores.size),
+                "frame_budget": frame_budget,
+                "stopping_rule": stopping_rule,
+                "early_exit": early_exit
+            })
+            return result
             
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error during video prediction: {e}")
+            count_error("video_analysis")
             return {
                 "error": f"Failed to analyze video: {str(e)}",
                 "visual_score": 0.5,
@@ -45,97 +107,143 @@ class VideoDeepfakeDetector:
                 "prediction": "unknown"
             }
     
-    def _analyze_frames(self, video_path: str) -> List[Dict[str, Any]]:
-        """Extract and analyze frames from video"""
+    def _analyze_frames(self, video_path: str, frame_budget: int,
+                        dedup: Optional[FrameDeduplicator] = None,
+                        progress: Optional[ProgressCallback] = None) -> np.ndarray:
+        """Extract frames from video and return their fake probabilities"""
         try:
-            frames = self._extract_frames(video_path)
-            results = []
+            batch_size = max(1, settings.video_frame_batch_size)
+            planned = min(frame_budget, probe_video(video_path).frame_count) if progress else 0
+            scores = []
+            batch = []
+            done = 0
             
-            for i, frame in enumerate(frames):
-                # Save frame temporarily
-                temp_frame = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-                cv2.imwrite(temp_frame.name, frame)
-                temp_frame.close()
-                
-                try:
-                    # Analyze frame
-                    result = self.image_detector.predict(temp_frame.name)
-                    results.append(result)
-                finally:
-                    # Cleanup temporary frame
-                    os.unlink(temp_frame.name)
+            # Frames stream from the sampler and are scored in small in-memory batches
+            for frame in self._extract_frames(video_path, frame_budget):
+                batch.append(frame)
+                if len(batch) == batch_size:
+                    scores.append(self._score_frames(batch, dedup))
+                    done += len(batch)
+                    batch = []
+                    report_progress(progress, done, max(planned, done))
+            if batch:
+                scores.append(self._score_frames(batch, dedup))
+                done += len(batch)
+                report_progress(progress, done, max(planned, done))
             
-            return results
+            return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
             
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"Frame analysis failed: {e}")
-            return []
+            return np.empty(0, dtype=np.float32)
     
-    def _extract_frames(self, video_path: str) -> List[np.ndarray]:
-        """Extract frames from video"""
+    def _analyze_frames_adaptive(self, video_path: str, frame_budget: int, min_frames: int,
+                                 stopping_rule: str,
+                                 dedup: Optional[FrameDeduplicator] = None,
+                                 progress: Optional[ProgressCallback] = None) -> Tuple[np.ndarray, bool]:
+        """Analyze frames coarse-to-fine, stopping once the stopping rule settles the visual verdict.
+
+        The budgeted frames are decoded in one forward pass, as with a fixed budget (the
+        coarse-to-fine positions span the whole timeline, so decoding per round would
+        re-read most of the video each time); the stopping rule only saves inference.
+        Each frame is scaled down to the model's input size as it is decoded, so only
+        the small copies are held until their round. They are scored in coarse-to-fine
+        order (ends and midpoint first, then ever finer gaps), one batch per round, with
+        the stopping rule checked between rounds.
+        Returns the scores of the analyzed frames and whether analysis stopped early.
+        """
         try:
-            cap = cv2.VideoCapture(video_path)
-            frames = []
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            if frame_count == 0:
-                logger.warning("No frames found in video")
-                cap.release()
-                return []
+            info = probe_video(video_path)
+            indices = evenly_spaced_indices(info.frame_count, frame_budget)
             
-            # Sample frames evenly
-            step = max(1, frame_count // self.max_frames)
+            # Index-addressed reads need the sequential sampler whatever strategy is configured
+            sampler = SequentialFrameSampler(seek_gap=settings.video_seek_gap_frames)
+            input_size = self.image_detector.input_size
+            decoded = {}
+            for sampled in timed_iter(sampler.sample_indices(video_path, indices), "frame_decode", "video"):
+                decoded[sampled.index] = shrink_frame(sampled.frame, input_size) if input_size else sampled.frame
+            ordered = [indices[position] for position in coarse_to_fine_order(len(indices))
+                       if indices[position] in decoded]
+            decided = STOPPING_RULES[stopping_rule]
+            rule_options = {
+                "z": settings.video_confidence_z,
+                "margin": settings.video_sprt_margin,
+                "alpha": settings.video_sprt_alpha,
+                "beta": settings.video_sprt_beta,
+            }
             
-            for i in range(0, frame_count, step):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                if ret and frame is not None:
-                    frames.append(frame)
+            scores = np.empty(0, dtype=np.float32)
+            round_size = max(1, min(min_frames, len(ordered)))
+            offset = 0
+            while offset < len(ordered):
+                round_indices = ordered[offset:offset + round_size]
+                offset += len(round_indices)
+                # Scored frames are released as the rounds go
+                frames = [decoded.pop(index) for index in round_indices]
+                if frames:
+                    scores = np.concatenate([scores, self._score_frames(frames, dedup)])
+                report_progress(progress, len(scores), len(ordered))
                 
-                if len(frames) >= self.max_frames:
-                    break
+                if len(scores) >= min_frames and decided(scores, settings.video_decision_threshold, **rule_options):
+                    early_exit = offset < len(ordered)
+                    logger.info(f"Visual verdict settled after {len(scores)}/{len(ordered)} frames ({stopping_rule})")
+                    return scores, early_exit
+                round_size = max(1, settings.video_frame_batch_size)
             
-            cap.release()
-            logger.info(f"Extracted {len(frames)} frames from video")
-            return frames
+            return scores, False
             
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Adaptive frame analysis failed: {e}")
+            return np.empty(0, dtype=np.float32), False
+    
+    def _score_frames(self, frames: List[np.ndarray], dedup: Optional[FrameDeduplicator] = None) -> np.ndarray:
+        """Fake probability of each frame in one in-memory batch"""
+        stack = np.stack(frames)
+        if dedup is None:
+            return self.image_detector.predict_frames(stack)
+        return dedup.score(stack, self.image_detector.predict_frames)
+    
+    def _extract_frames(self, video_path: str, frame_budget: int) -> Iterator[np.ndarray]:
+        """Stream sampled frames from video, one decoded frame at a time"""
+        count = 0
+        try:
+            for sampled in timed_iter(self.frame_sampler.sample(video_path, frame_budget), "frame_decode", "video"):
+                count += 1
+                yield sampled.frame
         except Exception as e:
             logger.error(f"Frame extraction failed: {e}")
-            return []
+        
+        if count == 0:
+            logger.warning("No frames found in video")
+        else:
+            logger.info(f"Extracted {count} frames from video ({self.frame_sampler.name} sampler)")
     
     def _analyze_audio(self, video_path: str) -> Dict[str, Any]:
         """Extract and analyze audio from video"""
-        temp_audio = None
         try:
-            # Create temporary audio file
-            temp_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_audio.close()
-            
-            # Extract audio using ffmpeg
-            cmd = [
-                'ffmpeg', '-i', video_path,
-                '-ac', '1',  # mono
-                '-ar', '16000',  # 16kHz sample rate
-                '-y',  # overwrite output file
-                temp_audio.name
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.warning(f"FFmpeg failed: {result.stderr}")
-                return {"fake_probability": 0.5, "error": "Audio extraction failed"}
+            # 16kHz mono PCM straight from the ffmpeg pipe; the detector only needs its analysis window
+            with stage("ffmpeg", "video"):
+                audio = read_pcm(
+                    video_path,
+                    sample_rate=self.audio_detector.sample_rate,
+                    duration=self.audio_detector.duration
+                )
+            if audio.size == 0:
+                return {"fake_probability": 0.5, "error": "No audio stream"}
             
-            # Analyze extracted audio
-            return self.audio_detector.predict(temp_audio.name)
+            return self.audio_detector.predict_waveform(audio)
             
+        except AudioDecodeError as e:
+            logger.warning(f"FFmpeg failed: {e}")
+            count_error("audio_extraction")
+            return {"fake_probability": 0.5, "error": "Audio extraction failed"}
         except Exception as e:
             logger.error(f"Audio analysis failed: {e}")
             return {"fake_probability": 0.5, "error": str(e)}
-        finally:
-            # Cleanup temporary audio file
-            if temp_audio and os.path.exists(temp_audio.name):
-                os.unlink(temp_audio.name)
     
     def _format_result(self, visual_score: float, audio_score: float, 
                       final_score: float, video_path: str) -> Dict[str, Any]:
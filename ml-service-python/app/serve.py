@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Serve the API from worker processes forked after the models are loaded once.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+``uvicorn --workers`` starts each worker as a fresh interpreter that loads its own
+copy of the weights. Here the parent loads the MODEL_WARMUP modalities, binds the
+socket and forks the workers, so the weights stay in pages shared copy-on-write
+by all of them. Workers that exit are forked again from the same parent, without
+reloading anything. Per-worker unique and shared memory is logged every
+SERVE_MEMORY_REPORT_SECONDS and returned by /health.
+"""
+
+import gc
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import uvicorn
+
+from .main import app, model_registry
+from .config.settings import settings
+from .services.model_registry import parse_modalities
+from .utils.cpu_topology import apply_thread_limits, available_cores
+from .utils.process_memory import format_memory, process_memory
+
+logger = logging.getLogger("app.serve")
+
+
+def worker_count(requested: int = 0) -> int:
+    return (requested or settings.serve_workers or settings.topology_workers
+            or int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+
+def preload(modalities) -> None:
+    """Load models in the parent with single-threaded native pools.
+
+    OpenMP and ONNX Runtime threads started here would not exist in the forked
+    workers, and their pools would hang on first use; each worker sizes its own
+    pools at startup instead (see configure_worker_topology).
+    """
+    apply_thread_limits(1)
+    onnx_threads = settings.image_onnx_threads
+    settings.image_onnx_threads = 1
+    start_time = time.perf_counter()
+    try:
+        model_registry.warm_up(modalities, background=False)
+    finally:
+        settings.image_onnx_threads = onnx_threads
+    logger.info(f"📦 Preloaded {', '.join(modalities) or 'nothing'} in {time.perf_counter() - start_time:.2f}s "
+                f"({format_memory(process_memory())})")
+    # Objects that exist now are never collected, so the collector does not write to
+    # (and thereby copy) the pages the workers share
+    gc.collect()
+    gc.freeze()
+
+
+def fork_worker(config: uvicorn.Config, sockets, index: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if not settings.topology_enabled:
+            apply_thread_limits(len(available_cores()))  # undo the parent's single-thread limit
+        uvicorn.Server(config).run(sockets=sockets)
+    except BaseException:
+        logger.exception(f"❌ Worker {index} crashed")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def log_memory(children) -> None:
+    """Unique vs shared memory of the parent and every worker; summed PSS is their real footprint"""
+    parent = process_memory()
+    total = parent.get("pss_mb", 0.0)
+    logger.info(f"🧠 Parent {os.getpid()}: {format_memory(parent)}")
+    for pid, index in sorted(children.items(), key=lambda item: item[1]):
+        try:
+            memory = process_memory(pid)
+        except OSError:
+            continue  # exited since the last check
+        total += memory.get("pss_mb", 0.0)
+        logger.info(f"🧠 Worker {index} ({pid}): {format_memory(memory)}")
+    logger.info(f"🧠 Total for {len(children)} workers and parent: {total:.0f} MB (pss)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=0, help="default: SERVE_WORKERS, TOPOLOGY_WORKERS, "
+                                                                "WEB_CONCURRENCY or 1")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    workers = worker_count(args.workers)
+    # Topology planning in each worker splits the cores by this count
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if not settings.topology_workers:
+        settings.topology_workers = workers
+
+    preload(parse_modalities(settings.model_warmup))
+    config = uvicorn.Config(app, host=args.host, port=args.port)
+    sockets = [config.bind_socket()]
+
+    children = {fork_worker(config, sockets, index): index for index in range(workers)}
+    logger.info(f"🍴 Forked {workers} workers on {args.host}:{args.port}: {', '.join(map(str, children))}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    interval = settings.serve_memory_report_seconds
+    next_report = time.monotonic() + min(interval, 30)
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.5)
+            if interval > 0 and time.monotonic() >= next_report:
+                log_memory(children)
+                next_report = time.monotonic() + interval
+            continue
+        index = children.pop(pid)
+        if not stopping:
+            logger.warning(f"⚠️ Worker {index} ({pid}) exited with code {os.waitstatus_to_exitcode(status)}; "
+                           f"forking a replacement")
+            time.sleep(1)  # no tight loop if workers keep failing at startup
+            children[fork_worker(config, sockets, index)] = index
+    logger.info("👋 All workers stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
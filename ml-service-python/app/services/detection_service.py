@@ -1,140 +1,163 @@
-from fastapi import UploadFile, HTTPException
-from typing import Dict, Any
+from fastapi import UploadFile
+from PIL import Image
+from typing import Dict, Any, List, Optional, Tuple
+import time
+import asyncio
+import hashlib
 import logging
-from ..models.image_detector import ImageDeepfakeDetector
-from ..models.audio_detector import AudioDeepfakeDetector
-from ..models.video_detector import VideoDeepfakeDetector
-from ..utils.file_handler import FileHandler
+import numpy as np
+from ..config.settings import settings
+from ..models.heuristic_detector import (
+    heuristic_audio_prediction, heuristic_image_prediction, heuristic_video_prediction
+)
+from ..utils.file_handler import FileHandler, StoredUpload, stream_upload
+from ..utils.progress import ProgressCallback
+from ..utils.metrics import attach_timings, stage, timing_scope
+from .inference_executor import InferenceExecutor, create_inference_executor
+from .model_registry import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
+BACKENDS = ("model", "heuristic")
+
 class DetectionService:
-    def __init__(self):
-        self.image_detector = ImageDeepfakeDetector()
-        self.audio_detector = AudioDeepfakeDetector()
-        self.video_detector = VideoDeepfakeDetector()
+    def __init__(self, executor: Optional[InferenceExecutor] = None, registry: Optional[ModelRegistry] = None,
+                 backend: Optional[str] = None):
+        # "model" runs the detectors; "heuristic" answers instantly from filename and shape rules
+        self.backend = backend or settings.detection_backend
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown detection backend '{self.backend}' (available: {', '.join(BACKENDS)})")
+        # Detectors load per modality on first use (or in the startup warm-up)
+        self.registry = registry or ModelRegistry()
+        # Every model call is awaited on the executor so the event loop stays free
+        self.executor = executor or create_inference_executor(self.registry)
         self.file_handler = FileHandler()
         logger.info("Detection service initialized")
     
-    async def detect_image(self, file: UploadFile) -> Dict[str, Any]:
-        """Detect deepfake in image"""
-        file_path = None
-        try:
-            # Validate file
-            self._validate_image_file(file)
-            
-            # Save uploaded file
-            file_path = await self.file_handler.save_upload_file(file, suffix='.jpg')
-            
-            # Get file info
-            file_info = self.file_handler.get_file_info(file)
-            
-            # Detect deepfake
-            result = self.image_detector.predict(file_path)
-            
-            # Add file metadata
-            result.update({
-                "file_name": file_info["filename"],
-                "file_size": file_info["size"] or len(await file.read()),
-                "content_type": file_info["content_type"]
-            })
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Image detection failed: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            if file_path:
-                self.file_handler.cleanup_file(file_path)
+    @property
+    def image_detector(self):
+        return self.registry.get("image")
     
-    async def detect_audio(self, file: UploadFile) -> Dict[str, Any]:
-        """Detect deepfake in audio"""
-        file_path = None
-        try:
-            # Validate file
-            self._validate_audio_file(file)
-            
-            # Save uploaded file
-            file_path = await self.file_handler.save_upload_file(file, suffix='.wav')
-            
-            # Get file info
-            file_info = self.file_handler.get_file_info(file)
-            
-            # Detect deepfake
-            result = self.audio_detector.predict(file_path)
-            
-            # Add file metadata
-            result.update({
-                "file_name": file_info["filename"],
-                "file_size": file_info["size"] or len(await file.read()),
-                "content_type": file_info["content_type"]
-            })
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Audio detection failed: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            if file_path:
-                self.file_handler.cleanup_file(file_path)
+    def image_draft_size(self) -> Optional[Tuple[int, int]]:
+        """JPEG draft size uploads can be decoded at, or None to decode them in full"""
+        if self.backend == "heuristic":
+            return None
+        return getattr(self.registry.loaded("image"), "draft_size", None)
     
-    async def detect_video(self, file: UploadFile) -> Dict[str, Any]:
-        """Detect deepfake in video"""
-        file_path = None
-        try:
-            # Validate file
-            self._validate_video_file(file)
-            
-            # Save uploaded file  
-            file_path = await self.file_handler.save_upload_file(file, suffix='.mp4')
-            
-            # Get file info
-            file_info = self.file_handler.get_file_info(file)
-            
-            # Detect deepfake
-            result = self.video_detector.predict(file_path)
-            
-            # Add file metadata
-            result.update({
-                "file_name": file_info["filename"],
-                "file_size": file_info["size"] or len(await file.read()),
-                "content_type": file_info["content_type"]
-            })
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Video detection failed: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            if file_path:
-                self.file_handler.cleanup_file(file_path)
+    @property
+    def audio_detector(self):
+        return self.registry.get("audio")
+    
+    @property
+    def video_detector(self):
+        return self.registry.get("video")
+    
+    def shutdown(self):
+        """Stop the inference workers"""
+        self.executor.shutdown()
     
-    def _validate_image_file(self, file: UploadFile):
-        """Validate image file"""
-        if not file.content_type or not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        max_size = 10 * 1024 * 1024  # 10MB
-        if hasattr(file, 'size') and file.size and file.size > max_size:
-            raise HTTPException(status_code=400, detail="Image file too large (max 10MB)")
+    async def receive_upload(self, file: UploadFile, suffix: str, max_size: int) -> StoredUpload:
+        """Hash and measure an upload; it is streamed to a temp file (``path``) only if the detectors need one"""
+        if self.backend == "heuristic":
+            return await stream_upload(file, max_size=max_size)
+        return await self.file_handler.save_upload_stream(file, suffix=suffix, max_size=max_size)
     
-    def _validate_audio_file(self, file: UploadFile):
-        """Validate audio file"""
-        if not file.content_type or not file.content_type.startswith('audio/'):
-            raise HTTPException(status_code=400, detail="File must be audio")
-        
-        max_size = 50 * 1024 * 1024  # 50MB
-        if hasattr(file, 'size') and file.size and file.size > max_size:
-            raise HTTPException(status_code=400, detail="Audio file too large (max 50MB)")
+    async def analyze_image(self, source, filename: Optional[str], content_hash: str) -> Dict[str, Any]:
+        """Verdict for an opened image (or a saved one's path); ``processing_time`` is the measured analysis time"""
+        started = time.perf_counter()
+        if self.backend == "heuristic":
+            result = heuristic_image_prediction(filename, source.size, content_hash)
+        else:
+            if isinstance(source, Image.Image) and self.executor.runs_in_process("image"):
+                # A spooled upload cannot cross to a worker process; its pixels can, via shared memory
+                with stage("decode"):
+                    source = await asyncio.to_thread(lambda: np.asarray(source.convert("RGB")))
+            result = await self._predict_image(source)
+        result["processing_time"] = time.perf_counter() - started
+        return result
     
-    def _validate_video_file(self, file: UploadFile):
-        """Validate video file"""
-        if not file.content_type or not file.content_type.startswith('video/'):
-            raise HTTPException(status_code=400, detail="File must be video")
-        
-        max_size = 100 * 1024 * 1024  # 100MB
-        if hasattr(file, 'size') and file.size and file.size > max_size:
-            raise HTTPException(status_code=400, detail="Video file too large (max 100MB)")
+    async def _predict_image(self, source) -> Dict[str, Any]:
+        """Model verdict for one image, through the detector's micro-batcher when it has one.
+
+        The batcher's future is awaited on the event loop instead of on an inference thread,
+        so a batch can fill to ``image_batch_max_size`` whatever the thread pool's size.
+        The first request, which loads the detector, and process workers go through the executor.
+        """
+        detector = None if self.executor.runs_in_process("image") else self.registry.loaded("image")
+        prediction = detector.submit(source) if detector is not None else None
+        if prediction is None:
+            return await self.executor.run("image", source)
+        with stage("batched_inference", "image"):
+            return await asyncio.wrap_future(prediction)
+    
+    async def analyze_images(self, images: List[Image.Image], filenames: List[Optional[str]],
+                             content_hashes: List[str]) -> List[Dict[str, Any]]:
+        """Verdicts for decoded images, run through the model in tensor batches"""
+        if self.backend == "heuristic":
+            return [heuristic_image_prediction(filename, image.size, content_hash)
+                    for image, filename, content_hash in zip(images, filenames, content_hashes)]
+        predictions = []
+        chunk_size = max(1, settings.image_batch_max_size)
+        for offset in range(0, len(images), chunk_size):
+            # Arrays rather than PIL images, so process workers receive them via shared memory
+            chunk = [np.asarray(image) for image in images[offset:offset + chunk_size]]
+            predictions.extend(await self.executor.run("image_batch", chunk))
+        return predictions
+    
+    async def analyze_audio(self, path: Optional[str], filename: Optional[str], content_hash: str,
+                            mode: Optional[str] = None) -> Dict[str, Any]:
+        """Verdict for a saved audio upload (``path`` may be None for the heuristic backend)"""
+        started = time.perf_counter()
+        if self.backend == "heuristic":
+            result = heuristic_audio_prediction(filename, content_hash)
+        else:
+            result = await self.executor.run("audio", path, mode=mode)
+        result["processing_time"] = time.perf_counter() - started
+        return result
+    
+    async def analyze_video(self, path: Optional[str], filename: Optional[str], content_hash: str,
+                            frame_budget: Optional[int] = None, min_frames: Optional[int] = None,
+                            stopping_rule: Optional[str] = None) -> Dict[str, Any]:
+        """Verdict for a saved video upload (``path`` may be None for the heuristic backend)"""
+        started = time.perf_counter()
+        if self.backend == "heuristic":
+            result = heuristic_video_prediction(filename, content_hash)
+        else:
+            result = await self.executor.run(
+                "video", path, frame_budget=frame_budget, min_frames=min_frames, stopping_rule=stopping_rule
+            )
+        result["processing_time"] = time.perf_counter() - started
+        return result
+    
+    def run_job(self, job: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+        """Run one queued audio/video job on the calling job-worker thread"""
+        options = job["options"]
+        with timing_scope(job["media_type"], endpoint="job"):
+            if self.backend == "heuristic" and job["media_type"] in ("audio", "video"):
+                digest = hashlib.md5()
+                with open(job["file_path"], "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+                predict = heuristic_video_prediction if job["media_type"] == "video" else heuristic_audio_prediction
+                result = predict(job["filename"], digest.hexdigest())
+            elif job["media_type"] == "video":
+                result = self.video_detector.predict(
+                    job["file_path"],
+                    frame_budget=options.get("frame_budget"),
+                    min_frames=options.get("min_frames"),
+                    stopping_rule=options.get("stopping_rule"),
+                    progress=progress
+                )
+            elif job["media_type"] == "audio":
+                result = self.audio_detector.predict(
+                    job["file_path"], mode=options.get("audio_mode"), progress=progress
+                )
+            else:
+                raise ValueError(f"Unsupported job media type '{job['media_type']}'")
+            
+            result.update({
+                "file_name": job["filename"],
+                "file_size": job["file_size"],
+                "content_type": job["content_type"]
+            })
+            return attach_timings(result)
@@ -0,0 +1,339 @@
+import os
+import time
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..config.settings import settings
+from ..utils.cpu_topology import WorkerTopology, apply_thread_limits, claim_worker_slot, parse_weights, plan_topology
+from ..utils.metrics import merge_stages, record_stage, timing_scope
+from ..utils.profiler import BackgroundProfiler, SamplingProfiler, current_profiler, profile_thread
+from .model_registry import ModelRegistry, parse_modalities
+
+logger = logging.getLogger(__name__)
+
+# Modality whose detector serves each task
+TASK_MODALITIES = {
+    "image": "image",
+    "image_batch": "image",
+    "audio": "audio",
+    "audio_waveform": "audio",
+    "video": "video",
+}
+_TASK_METHODS = {
+    "image": "predict",
+    "image_batch": "predict_batch",
+    "audio": "predict",
+    "audio_waveform": "predict_waveform",
+    "video": "predict",
+}
+
+
+def _call_detector(registry: ModelRegistry, task: str, *args, **kwargs) -> Any:
+    detector = registry.get(TASK_MODALITIES[task])
+    return getattr(detector, _TASK_METHODS[task])(*args, **kwargs)
+
+
+def detector_tasks(registry: ModelRegistry) -> Dict[str, Callable[..., Any]]:
+    """Named inference tasks; the names are what crosses the process boundary.
+
+    Each task resolves its detector through the registry when it runs, so a
+    modality is loaded by its first request (or by the warm-up) and not before.
+    """
+    return {task: partial(_call_detector, registry, task) for task in TASK_MODALITIES}
+
+
+class SharedArray:
+    """Picklable handle to an ndarray parked in a shared memory block"""
+
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    @classmethod
+    def create(cls, array: np.ndarray):
+        """Copy ``array`` into a new block; returns (handle, block) and the caller unlinks the block"""
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return cls(block.name, array.shape, array.dtype.str), block
+
+    def attach(self):
+        """Map the block without copying; returns (array view, block) and the caller closes the block"""
+        block = shared_memory.SharedMemory(name=self.name)
+        return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=block.buf), block
+
+
+# --- process-worker side ----------------------------------------------------
+
+_worker_tasks: Optional[Dict[str, Callable[..., Any]]] = None
+_worker_profiler: Optional[BackgroundProfiler] = None
+
+
+def _init_worker(warmup: tuple = (), threads: int = 0, cores: tuple = ()) -> None:
+    """Build the worker's detectors once when it starts, loading the ``warmup`` modalities up front.
+
+    ``threads`` and ``cores`` are the worker's share of the serving worker's topology;
+    they are applied before any model library is imported.
+    """
+    global _worker_tasks, _worker_profiler
+    logging.basicConfig(level=logging.INFO)
+    if threads > 0:
+        apply_thread_limits(threads, cores or None)
+    registry = ModelRegistry()
+    _worker_tasks = detector_tasks(registry)
+    registry.warm_up(warmup, background=False)
+    if settings.profiling_sample_hz > 0:
+        # Always-on hot-path profile of this worker, next to the serving process's own
+        _worker_profiler = BackgroundProfiler(
+            settings.profiling_sample_hz, settings.profiling_dir, settings.profiling_flush_seconds
+        ).start()
+    logger.info(f"Inference worker {multiprocessing.current_process().name} ready")
+
+
+def _worker_ready() -> str:
+    return multiprocessing.current_process().name
+
+
+def _run_worker_task(task: str, args: tuple, kwargs: dict,
+                     profile_interval: float = 0.0) -> Tuple[Any, Dict[str, float], Optional[Dict[str, int]]]:
+    """Resolve shared-memory arguments, run the task, and park large array results in shared memory.
+
+    Returns the result with the stage timings recorded while it ran, and with its
+    sampled stacks when the request is being profiled; the parent merges both into
+    the request's timings and profile.
+    """
+    blocks = []
+    profiler = SamplingProfiler(profile_interval).start() if profile_interval > 0 else None
+
+    def resolve(value):
+        if isinstance(value, SharedArray):
+            array, block = value.attach()
+            blocks.append(block)
+            return array
+        if isinstance(value, list):
+            return [resolve(v) for v in value]
+        return value
+
+    try:
+        with timing_scope(TASK_MODALITIES[task], observe=False) as timings:
+            if profiler is not None:
+                profiler.add_thread()
+            result = _worker_tasks[task](*[resolve(a) for a in args], **{k: resolve(v) for k, v in kwargs.items()})
+    finally:
+        # Tasks must not keep views into the blocks past this point
+        for block in blocks:
+            block.close()
+        if profiler is not None:
+            profiler.stop()
+    profile = dict(profiler.counts) if profiler is not None else None
+
+    if isinstance(result, np.ndarray) and result.nbytes >= settings.inference_shm_min_bytes:
+        handle, block = SharedArray.create(result)
+        block.close()  # the parent unlinks it after copying the result out
+        return handle, timings.stages, profile
+    return result, timings.stages, profile
+
+
+# --- parent side ------------------------------------------------------------
+
+class InferenceExecutor:
+    """Runs blocking model work off the asyncio event loop.
+
+    A thread pool serves torch inference, which releases the GIL. An optional
+    process pool serves the librosa/OpenCV-heavy audio and video work, which
+    mostly does not; each worker process has its own detector registry and loads
+    the modalities it serves when it starts.
+    ndarray arguments and results above ``shm_min_bytes`` cross the process
+    boundary through shared memory instead of being pickled. Without process
+    workers every task runs on the thread pool against the service's detectors.
+    """
+
+    def __init__(self, tasks: Dict[str, Callable[..., Any]], thread_workers: int = 4,
+                 process_workers: int = 0, shm_min_bytes: int = 1024 * 1024,
+                 process_tasks: tuple = ("audio", "audio_waveform", "video"), process_warmup: tuple = (),
+                 process_threads: int = 0, process_cores: tuple = ()):
+        self.tasks = tasks
+        self.shm_min_bytes = shm_min_bytes
+        self.process_tasks = set(process_tasks) if process_workers > 0 else set()
+        self._threads = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="inference")
+        self._processes = None
+        if process_workers > 0:
+            # spawn, not fork: forking a parent with live torch/OpenMP threads can deadlock
+            self._processes = ProcessPoolExecutor(
+                max_workers=process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(tuple(process_warmup), process_threads, tuple(process_cores))
+            )
+            # Start every worker now so model loading is not paid by the first requests
+            self._workers_started = [self._processes.submit(_worker_ready) for _ in range(process_workers)]
+        else:
+            self._workers_started = []
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = {"thread": 0, "process": 0}
+        logger.info(f"Inference executor: {thread_workers} threads, {process_workers} processes "
+                    f"(process tasks: {', '.join(sorted(self.process_tasks)) or 'none'})")
+
+    def workers_ready(self) -> bool:
+        """Whether every process worker has started (and warmed up its models)"""
+        return all(future.done() and not future.exception() for future in self._workers_started)
+
+    def runs_in_process(self, task: str) -> bool:
+        """Whether ``task`` runs in a worker process, i.e. its arguments must be picklable"""
+        return task in self.process_tasks
+
+    async def run(self, task: str, *args, **kwargs) -> Any:
+        """Run a named task on its pool and await the result without blocking the event loop"""
+        pool = "process" if task in self.process_tasks else "thread"
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            if pool == "thread":
+                # Run in the caller's context so stages land in the request's timings (and profile)
+                context = contextvars.copy_context()
+                submitted = time.perf_counter()
+
+                def call():
+                    record_stage("executor_wait", time.perf_counter() - submitted)
+                    with profile_thread():
+                        return self.tasks[task](*args, **kwargs)
+
+                return await loop.run_in_executor(self._threads, context.run, call)
+            return await self._run_in_process(loop, task, args, kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed[pool] += 1
+
+    async def _run_in_process(self, loop, task: str, args: tuple, kwargs: dict) -> Any:
+        blocks: List[shared_memory.SharedMemory] = []
+
+        def share(value):
+            if isinstance(value, np.ndarray) and value.nbytes >= self.shm_min_bytes:
+                handle, block = SharedArray.create(value)
+                blocks.append(block)
+                return handle
+            if isinstance(value, list):
+                return [share(v) for v in value]
+            return value
+
+        try:
+            shared_args = tuple(share(a) for a in args)
+            shared_kwargs = {k: share(v) for k, v in kwargs.items()}
+            profiler = current_profiler()
+            result, stages, profile = await loop.run_in_executor(
+                self._processes, _run_worker_task, task, shared_args, shared_kwargs,
+                profiler.interval if profiler is not None else 0.0
+            )
+            merge_stages(stages, TASK_MODALITIES[task])
+            if profile:
+                profiler.merge(profile, prefix="inference-worker")
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        if isinstance(result, SharedArray):
+            view, block = result.attach()
+            try:
+                result = view.copy()
+            finally:
+                block.close()
+                block.unlink()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "thread_workers": self._threads._max_workers,
+                "process_workers": self._processes._max_workers if self._processes else 0,
+                "process_tasks": sorted(self.process_tasks),
+                "workers_ready": self.workers_ready(),
+                "in_flight": self._in_flight,
+                "thread_queue_depth": self._threads._work_queue.qsize(),
+                "completed": dict(self._completed)
+            }
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+def create_inference_executor(registry: ModelRegistry) -> InferenceExecutor:
+    """Executor configured from settings around the service's detector registry"""
+    process_tasks = ("audio", "audio_waveform", "video")
+    if settings.inference_image_pool == "process":
+        process_tasks += ("image", "image_batch")
+    # Workers only warm the modalities they serve
+    served = {TASK_MODALITIES[task] for task in process_tasks}
+    process_warmup = tuple(m for m in parse_modalities(settings.model_warmup) if m in served)
+
+    # Process workers share the cores of the pipelines they serve
+    process_threads, process_cores = 0, ()
+    if _topology is not None and settings.inference_process_workers > 0:
+        process_cores = _topology.cores_for(sorted(served))
+        process_threads = max(1, len(process_cores) // settings.inference_process_workers)
+        if not _topology.pin:
+            process_cores = ()
+
+    return InferenceExecutor(
+        detector_tasks(registry),
+        thread_workers=settings.inference_thread_workers,
+        process_workers=settings.inference_process_workers,
+        shm_min_bytes=settings.inference_shm_min_bytes,
+        process_tasks=process_tasks,
+        process_warmup=process_warmup,
+        process_threads=process_threads,
+        process_cores=process_cores
+    )
+
+
+# --- CPU topology -------------------------------------------------------------
+
+_topology: Optional[WorkerTopology] = None
+
+
+def configure_worker_topology() -> Optional[WorkerTopology]:
+    """Give this serving worker its share of the host's cores and size native thread pools to it.
+
+    Must run before any model loads: torch, BLAS and OpenCV read their thread counts
+    once, when they are first imported. Torch threads follow the image share (the image
+    model is the torch user in this process), OpenCV the video share. When process
+    workers take audio/video, this process keeps only the image share.
+    """
+    global _topology
+    if not settings.topology_enabled:
+        return None
+    workers = settings.topology_workers or int(os.environ.get("WEB_CONCURRENCY", "1"))
+    index = claim_worker_slot(settings.topology_slot_dir, workers)
+    topology = plan_topology(workers, index, parse_weights(settings.topology_pipeline_weights),
+                             pin=settings.topology_pin_cpus)
+
+    offloaded = settings.inference_process_workers > 0
+    local_cores = topology.cores_for(["image"]) if offloaded else topology.cores
+    apply_thread_limits(topology.threads("image"), local_cores if topology.pin else None)
+    if settings.image_onnx_threads == 0:
+        settings.image_onnx_threads = topology.threads("image")
+    if settings.video_opencv_threads == 0:
+        settings.video_opencv_threads = topology.threads("video")
+
+    _topology = topology
+    logger.info(f"🧩 CPU topology: {topology.summary()}"
+                f"{' (audio/video in process workers)' if offloaded else ''}")
+    return topology
+
+
+def current_topology() -> Optional[WorkerTopology]:
+    return _topology
@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import uuid
+import logging
+import threading
+from fastapi import UploadFile
+from typing import Any, Callable, Dict, Optional
+from ..utils.file_handler import stream_upload
+from ..utils.request_trace import trace_saved_file
+from ..utils.job_store import JobStore, QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED, FINISHED_STATES
+from ..utils.progress import AnalysisCancelled, ProgressCallback
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[Dict[str, Any], ProgressCallback], Dict[str, Any]]
+
+
+class JobManager:
+    """Runs analysis jobs from a JobStore on a bounded pool of worker threads.
+
+    Uploads are written to ``upload_dir`` before the job is queued, so queued work
+    survives a restart along with the store. The runner reports progress through the
+    callback it is given; cancelling a running job makes that callback raise
+    AnalysisCancelled, which unwinds the detector and frees the worker. A cancel
+    received by another process sharing the store is noticed at the next progress
+    report or lease renewal, whichever comes first. The async methods called by the
+    API run their SQLite and file work on worker threads, never on the event loop.
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, upload_dir: str, workers: int = 2,
+                 max_upload_size: int = 100 * 1024 * 1024, purge_interval: float = 60.0):
+        self.store = store
+        self.runner = runner
+        self.upload_dir = upload_dir
+        self.workers = workers
+        self.max_upload_size = max_upload_size
+        self.purge_interval = purge_interval
+
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._stopped = threading.Event()  # wakes the lease renewer
+        self._threads = []
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._last_purge = 0.0
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._lease_loop, name="job-leases", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"🧵 Job manager started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop taking jobs; running jobs are cancelled and put back on the queue"""
+        with self._wakeup:
+            self._stopping = True
+            for event in self._cancel_events.values():
+                event.set()
+            self._wakeup.notify_all()
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        requeued = self.store.requeue_owned()
+        if requeued:
+            logger.info(f"↩️ Requeued {requeued} running job(s)")
+        self.store.close()
+
+    async def submit(self, file: UploadFile, media_type: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist the upload and queue a job for it"""
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}{os.path.splitext(file.filename or '')[1]}")
+        try:
+            with await asyncio.to_thread(open, path, "wb") as f:
+                stored = await stream_upload(file, f, self.max_upload_size)
+        except Exception:
+            await asyncio.to_thread(self._remove_file, path)
+            raise
+
+        await trace_saved_file(media_type, path, stored.size, stored.content_hash, file.content_type)
+        job = await asyncio.to_thread(
+            self.store.create, media_type, path, file.filename, file.content_type, stored.size, options
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"📥 Queued {media_type} job {job['id']} ({file.filename})")
+        return job_view(job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job; a running one stops at its next progress report, wherever it runs"""
+        return await asyncio.to_thread(self._cancel, job_id)
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        return job_view(job) if job else None
+
+    def _cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        previous = self.store.cancel(job_id)
+        if previous is None:
+            return None
+        if previous == QUEUED:
+            job = self.store.get(job_id)
+            if job:
+                self._remove_file(job["file_path"])
+        elif previous == RUNNING:
+            with self._wakeup:
+                event = self._cancel_events.get(job_id)
+            if event:
+                event.set()
+        return self._get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._wakeup:
+            running = len(self._cancel_events)
+        return {"workers": self.workers, "running": running, "jobs": self.store.counts()}
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            self._purge_expired()
+            job = self.store.claim_next()
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(timeout=1.0)
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        cancelled = threading.Event()
+        with self._wakeup:
+            self._cancel_events[job_id] = cancelled
+
+        def progress(done: int, total: int) -> None:
+            # No row updated: cancelled (maybe through another process) or requeued elsewhere
+            if cancelled.is_set() or not self.store.update_progress(job_id, done, total):
+                raise AnalysisCancelled(job_id)
+
+        start_time = time.time()
+        try:
+            result = self.runner(job, progress)
+            if cancelled.is_set():
+                raise AnalysisCancelled(job_id)
+            status = FAILED if result.get("error") else COMPLETED
+            if not self.store.finish(job_id, status, result=result, error=result.get("error"), owned=True):
+                raise AnalysisCancelled(job_id)
+            logger.info(f"✅ Job {job_id} {status} in {time.time() - start_time:.2f}s")
+        except AnalysisCancelled:
+            if not self._cancelled_by_client(job_id):
+                # Stopping (stop() requeues it) or requeued after a lapsed lease: the upload is still needed
+                return
+            logger.info(f"🛑 Job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            self.store.finish(job_id, FAILED, error=str(e), owned=True)
+        finally:
+            with self._wakeup:
+                self._cancel_events.pop(job_id, None)
+
+        self._remove_file(job["file_path"])
+
+    def _lease_loop(self) -> None:
+        """Renew the leases of the jobs running here, stopping any no longer running here"""
+        interval = max(0.1, self.store.lease_seconds / 3)
+        while not self._stopped.wait(interval):
+            with self._wakeup:
+                running = dict(self._cancel_events)
+            try:
+                for job_id in self.store.renew_leases(list(running)):
+                    running[job_id].set()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew job leases: {e}")
+
+    def _cancelled_by_client(self, job_id: str) -> bool:
+        job = self.store.get(job_id)
+        return job is not None and job["status"] == CANCELLED
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        with self._wakeup:
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        for path in self.store.purge_expired():
+            self._remove_file(path)
+        # Jobs of a process that died mid-run, once their lease lapsed
+        if self.store.requeue_stale():
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            if path and os.path.exists(path):
+                os.unlink(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not remove job upload {path}: {e}")
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public representation of a stored job"""
+    done, total = job["progress_done"], job["progress_total"]
+    if job["status"] == COMPLETED:
+        total = total or done
+        done = total
+    view = {
+        "job_id": job["id"],
+        "media_type": job["media_type"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "progress": {
+            "done": done,
+            "total": total,
+            "fraction": round(done / total, 3) if total else None
+        },
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "expires_at": job["expires_at"],
+    }
+    if job["status"] in FINISHED_STATES:
+        view["result"] = job["result"]
+        view["error"] = job["error"]
+    return view
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MODALITIES = ("image", "audio", "video")
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def _load_image(registry: "ModelRegistry") -> Any:
+    from ..models.image_detector import ImageDetector
+    detector = ImageDetector()
+    # Without its weights the detector could only return random fallback verdicts: fail the
+    # modality instead, so /ready reports it and requests are refused rather than answered
+    if not detector.load_model():
+        raise RuntimeError(f"image model could not be loaded from {detector.model_path}")
+    return detector
+
+
+def _load_audio(registry: "ModelRegistry") -> Any:
+    from ..models.audio_detector import AudioDeepfakeDetector
+    return AudioDeepfakeDetector()
+
+
+def _load_video(registry: "ModelRegistry") -> Any:
+    from ..models.video_detector import VideoDeepfakeDetector
+    # Share the image and audio detectors so the image model is only loaded once
+    return VideoDeepfakeDetector(registry.get("image"), registry.get("audio"))
+
+
+DEFAULT_LOADERS: Dict[str, Callable[["ModelRegistry"], Any]] = {
+    "image": _load_image,
+    "audio": _load_audio,
+    "video": _load_video,
+}
+
+
+def parse_modalities(value: Optional[str]) -> List[str]:
+    """Comma-separated modality list from settings, e.g. "image,video"; unknown names raise ValueError"""
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in MODALITIES]
+    if unknown:
+        raise ValueError(f"Unknown modalities {unknown} (available: {', '.join(MODALITIES)})")
+    return names
+
+
+class ModelRegistry:
+    """Per-modality detectors that are imported and loaded on first use.
+
+    Nothing heavy (torch, transformers, librosa, cv2) is imported until a modality
+    is requested, so a deployment only pays for the media types it serves. Concurrent
+    first requests for a modality wait on the same load. ``warm_up`` loads modalities
+    in a background thread ahead of traffic; ``status`` reports each modality's state
+    for the readiness probe.
+    """
+
+    def __init__(self, loaders: Optional[Dict[str, Callable[["ModelRegistry"], Any]]] = None,
+                 retry_seconds: Optional[float] = None):
+        self.loaders = loaders or DEFAULT_LOADERS
+        self.retry_seconds = settings.model_retry_seconds if retry_seconds is None else retry_seconds
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, threading.Event] = {name: threading.Event() for name in self.loaders}
+        self._detectors: Dict[str, Any] = {}
+        self._state: Dict[str, Dict[str, Any]] = {
+            name: {"state": NOT_LOADED, "load_seconds": None, "error": None} for name in self.loaders
+        }
+        self._retry_at: Dict[str, float] = {}  # when each failed modality may be loaded again
+        self._pid = os.getpid()
+
+    def get(self, modality: str) -> Any:
+        """The modality's detector, loading it first if needed; raises RuntimeError if loading failed.
+
+        A failed load is retried by the first call ``retry_seconds`` after it failed;
+        until then calls fail at once instead of each repeating the load.
+        """
+        if modality not in self.loaders:
+            raise KeyError(f"Unknown modality '{modality}'")
+        with self._lock:
+            state = self._state[modality]["state"]
+            owner = state == NOT_LOADED or (
+                state == FAILED and time.monotonic() >= self._retry_at.get(modality, 0.0)
+            )
+            if owner:
+                self._state[modality].update(state=LOADING, error=None)
+                self._loaded[modality].clear()
+        if owner:
+            self._load(modality)
+        else:
+            self._loaded[modality].wait()
+
+        with self._lock:
+            if self._state[modality]["state"] != READY:
+                raise RuntimeError(f"{modality} detector failed to load: {self._state[modality]['error']}")
+            return self._detectors[modality]
+
+    def _load(self, modality: str) -> None:
+        start_time = time.perf_counter()
+        logger.info(f"📦 Loading {modality} detector...")
+        try:
+            detector = self.loaders[modality](self)
+        except Exception as e:
+            logger.error(f"❌ Failed to load {modality} detector: {e}")
+            with self._lock:
+                self._state[modality].update(state=FAILED, error=str(e))
+                self._retry_at[modality] = time.monotonic() + self.retry_seconds
+        else:
+            elapsed = time.perf_counter() - start_time
+            logger.info(f"✅ {modality.capitalize()} detector ready in {elapsed:.2f}s")
+            with self._lock:
+                self._detectors[modality] = detector
+                self._state[modality].update(state=READY, load_seconds=round(elapsed, 3))
+        finally:
+            self._loaded[modality].set()
+
+    def is_ready(self, modality: str) -> bool:
+        with self._lock:
+            return self._state[modality]["state"] == READY
+
+    def loaded(self, modality: str) -> Optional[Any]:
+        """The detector if it is already loaded, without triggering a load"""
+        with self._lock:
+            return self._detectors.get(modality)
+
+    def warm_up(self, modalities: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+        """Load ``modalities`` in order, in a daemon thread unless ``background`` is False"""
+        modalities = list(modalities)
+
+        def run():
+            for modality in modalities:
+                try:
+                    self.get(modality)
+                except Exception:
+                    pass  # recorded in the modality's state
+
+        if not modalities:
+            return None
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def after_fork(self) -> bool:
+        """Hand detectors inherited from a preloading parent their per-process state.
+
+        Returns False (and does nothing) in the process that loaded them.
+        """
+        if os.getpid() == self._pid:
+            return False
+        self._pid = os.getpid()
+        with self._lock:
+            detectors = list(self._detectors.values())
+        for detector in detectors:
+            if hasattr(detector, "after_fork"):
+                detector.after_fork()
+        return True
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """State (not_loaded, loading, ready, failed), load time and error of every modality"""
+        with self._lock:
+            status = {name: dict(state) for name, state in self._state.items()}
+            for name, detector in self._detectors.items():
+                if hasattr(detector, "model_loaded"):
+                    status[name]["model_loaded"] = detector.model_loaded
+        return status
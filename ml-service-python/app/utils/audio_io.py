@@ -0,0 +1,115 @@
+import logging
+import threading
+import subprocess
+import numpy as np
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Audio analysis modes: the first window only, or overlapping windows across the whole file
+AUDIO_MODES = ("first", "stream")
+
+
+class AudioDecodeError(RuntimeError):
+    """ffmpeg could not decode an audio stream from the input"""
+
+
+def iter_pcm_blocks(path: str, sample_rate: int = 16000, block_samples: int = 16000 * 4,
+                    duration: Optional[float] = None, offset: float = 0.0,
+                    ffmpeg_binary: str = "ffmpeg") -> Iterator[np.ndarray]:
+    """Stream mono float32 PCM from any container through an ffmpeg stdout pipe.
+
+    ffmpeg decodes, downmixes and resamples; blocks of ``block_samples`` samples
+    (the last one may be shorter) are read straight into numpy buffers, so memory
+    stays bounded by the block size and nothing is written to disk.
+    """
+    cmd = [ffmpeg_binary, "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if offset:
+        cmd += ["-ss", f"{offset:.3f}"]
+    cmd += ["-i", path, "-vn", "-ac", "1", "-ar", str(sample_rate)]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"]
+
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError as e:
+        raise AudioDecodeError(f"ffmpeg not available: {e}")
+
+    # Drain stderr on a thread so a chatty ffmpeg can never block on a full pipe
+    stderr_tail = deque(maxlen=20)
+    stderr_reader = threading.Thread(
+        target=lambda: stderr_tail.extend(line.decode(errors="replace").rstrip() for line in process.stderr),
+        daemon=True
+    )
+    stderr_reader.start()
+
+    emitted = 0
+    try:
+        while True:
+            block = np.empty(block_samples, dtype=np.int16)
+            filled = _read_full(process.stdout, memoryview(block).cast("B"))
+            samples = filled // 2
+            if samples == 0:
+                break
+            emitted += samples
+            yield block[:samples].astype(np.float32) / 32768.0
+            if samples < block_samples:
+                break
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        returncode = process.wait()
+        stderr_reader.join(timeout=1.0)
+
+    if returncode != 0 and emitted == 0:
+        raise AudioDecodeError("; ".join(stderr_tail) or f"ffmpeg exited with code {returncode}")
+
+
+def read_pcm(path: str, sample_rate: int = 16000, duration: Optional[float] = None,
+             ffmpeg_binary: str = "ffmpeg") -> np.ndarray:
+    """Decode a whole (or the first ``duration`` seconds of an) audio stream into one array"""
+    block_samples = int(sample_rate * duration) if duration else sample_rate * 30
+    blocks = list(iter_pcm_blocks(path, sample_rate, max(1, block_samples), duration, ffmpeg_binary=ffmpeg_binary))
+    if len(blocks) == 1:
+        return blocks[0]
+    return np.concatenate(blocks) if blocks else np.empty(0, dtype=np.float32)
+
+
+def _read_full(stream, view: memoryview) -> int:
+    """readinto until the buffer is full or the stream ends; returns bytes read"""
+    filled = 0
+    while filled < len(view):
+        count = stream.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+def sliding_windows(blocks: Iterable[np.ndarray], window: int, hop: int) -> Iterator[Tuple[int, np.ndarray, int]]:
+    """Re-cut contiguous sample blocks into overlapping ``window``-sample windows every ``hop`` samples.
+
+    Yields (start_sample, window, valid_samples). Only the not-yet-consumed tail is
+    kept between blocks, so memory stays at about one block plus one window. The
+    last window is zero-padded when the stream ends between hops; a stream shorter
+    than one window yields a single padded window.
+    """
+    pending = np.empty(0, dtype=np.float32)
+    start = 0
+    emitted = False
+    for block in blocks:
+        pending = np.concatenate([pending, block]) if len(pending) else block
+        offset = 0
+        while len(pending) - offset >= window:
+            yield start, pending[offset:offset + window], window
+            emitted = True
+            start += hop
+            offset += hop
+        pending = pending[offset:]
+
+    # Samples past the overlap with the previous window have not been scored yet
+    if len(pending) > (window - hop if emitted else 0):
+        yield start, np.pad(pending, (0, window - len(pending))), len(pending)
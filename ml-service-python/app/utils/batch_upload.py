@@ -0,0 +1,182 @@
+import io
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import tarfile
+import zipfile
+from typing import BinaryIO, List, Optional, Tuple
+from fastapi import UploadFile, HTTPException
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CONTENT_TYPES = {
+    "application/zip", "application/x-zip-compressed",
+    "application/x-tar", "application/tar", "application/gzip", "application/x-gzip",
+}
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+class BatchItem:
+    """One image of a batch request, either a multipart part or an archive member"""
+
+    def __init__(self, index: int, filename: str, content_type: Optional[str],
+                 data: Optional[bytes] = None, error: Optional[str] = None):
+        self.index = index
+        self.filename = filename
+        self.content_type = content_type
+        self.data = data
+        self.error = error
+        self.image_format: Optional[str] = None
+        self.content_hash: Optional[str] = None  # md5 of ``data``, set by read_batch_items
+
+
+def is_archive(upload_file: UploadFile) -> bool:
+    """Check whether an uploaded part is a zip/tar archive of images"""
+    filename = (upload_file.filename or "").lower()
+    return upload_file.content_type in ARCHIVE_CONTENT_TYPES or filename.endswith(ARCHIVE_SUFFIXES)
+
+
+class BatchLimitError(Exception):
+    """A batch has more items, or more uncompressed bytes, than allowed"""
+
+
+async def read_batch_items(files: List[UploadFile], max_items: int, max_item_size: int,
+                           max_total_size: Optional[int] = None) -> List[BatchItem]:
+    """Read multipart parts into batch items, expanding zip/tar archives in place.
+
+    Reading stops as soon as the batch exceeds ``max_items`` or ``max_total_size``
+    bytes (uncompressed), with a 413. Archives are expanded, and every item's
+    ``content_hash`` computed, off the event loop.
+    """
+    items: List[BatchItem] = []
+    budget = _BatchBudget(max_items, max_total_size)
+
+    try:
+        for upload_file in files:
+            if is_archive(upload_file):
+                try:
+                    # Members are read straight from the spooled upload, never the whole archive at once
+                    await upload_file.seek(0)
+                    members = await asyncio.to_thread(_read_archive_members, upload_file.file, max_item_size, budget)
+                except (zipfile.BadZipFile, tarfile.TarError) as e:
+                    budget.take(0)
+                    members = [(upload_file.filename, None, f"Invalid archive: {e}")]
+                for name, data, error in members:
+                    content_type = mimetypes.guess_type(name)[0]
+                    items.append(BatchItem(len(items), name, content_type, data, error))
+            else:
+                # One byte past the limit is enough to reject an item without reading the rest
+                contents = await upload_file.read(max_item_size + 1)
+                error = None
+                if len(contents) > max_item_size:
+                    error = f"File too large (max {max_item_size // (1024 * 1024)}MB)"
+                    contents = None
+                budget.take(len(contents or b""))
+                items.append(BatchItem(len(items), upload_file.filename, upload_file.content_type, contents, error))
+    except BatchLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    await asyncio.to_thread(_hash_items, items)
+    return items
+
+
+def _hash_items(items: List[BatchItem]) -> None:
+    for item in items:
+        if item.data:
+            item.content_hash = hashlib.md5(item.data).hexdigest()
+
+
+class _BatchBudget:
+    """Items and uncompressed bytes read so far into a batch, against its limits"""
+
+    def __init__(self, max_items: int, max_total_size: Optional[int]):
+        self.max_items = max_items
+        self.max_total_size = max_total_size
+        self.items = 0
+        self.size = 0
+
+    def take(self, size: int) -> None:
+        """Account for one more item of ``size`` bytes, before it is read"""
+        self.items += 1
+        self.size += size
+        if self.items > self.max_items:
+            raise BatchLimitError(f"Too many items in batch (max {self.max_items})")
+        if self.max_total_size is not None and self.size > self.max_total_size:
+            raise BatchLimitError(f"Batch too large (max {self.max_total_size // (1024 * 1024)}MB uncompressed)")
+
+
+def _read_archive_members(fileobj: BinaryIO, max_item_size: int,
+                          budget: _BatchBudget) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Return (name, data, error) for every regular file in a zip or tar archive.
+
+    Each member is charged to ``budget`` by its declared size before it is
+    decompressed (zip and tar readers never return more than that), so an
+    oversized batch stops without inflating the rest.
+    """
+    members = []
+
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if info.file_size > max_item_size:
+                    budget.take(0)
+                    members.append((info.filename, None, "File too large"))
+                    continue
+                budget.take(info.file_size)
+                members.append((info.filename, archive.read(info), None))
+        return members
+
+    # tarfile handles plain and compressed tar streams
+    fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            if info.size > max_item_size:
+                budget.take(0)
+                members.append((info.name, None, "File too large"))
+                continue
+            budget.take(info.size)
+            members.append((info.name, archive.extractfile(info).read(), None))
+    return members
+
+
+def _decode_item(item: BatchItem) -> Optional[Image.Image]:
+    """Validate and decode one batch item to RGB; records the error on the item on failure"""
+    if item.error:
+        return None
+    if not item.content_type or not item.content_type.startswith('image/'):
+        item.error = "File must be an image"
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(item.data))
+        image.load()
+    except Exception as e:
+        logger.warning(f"Invalid image in batch ({item.filename}): {e}")
+        item.error = "Invalid image file"
+        return None
+
+    item.image_format = image.format
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+async def decode_batch_images(items: List[BatchItem]) -> List[Optional[Image.Image]]:
+    """Decode all batch items concurrently on worker threads (PIL releases the GIL while decoding)"""
+    return await asyncio.gather(*(asyncio.to_thread(_decode_item, item) for item in items))
+
+
+def batch_item_error(item: BatchItem) -> dict:
+    """Per-item error entry returned in place of a result"""
+    return {
+        'index': item.index,
+        'filename': item.filename,
+        'error': item.error,
+    }
@@ -0,0 +1,182 @@
+import os
+import sys
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PIPELINES = ("image", "audio", "video")
+
+# Read once by OpenMP/MKL/OpenBLAS/numexpr/OpenCV when they initialize, so they must be
+# set before torch, numpy-backed BLAS or cv2 is first used
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+                   "OPENCV_FOR_THREADS_NUM")
+
+_slot_handle = None  # lock file held for the life of the process
+
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on (respects cgroup/taskset restrictions)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """``"image:2,audio:1,video:1"`` -> {"image": 2.0, ...}; unknown pipelines raise ValueError"""
+    weights = {}
+    for part in (value or "").split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(":")
+        name = name.strip()
+        if name not in PIPELINES:
+            raise ValueError(f"Unknown pipeline '{name}' (available: {', '.join(PIPELINES)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def split_evenly(cores: Sequence[int], parts: int) -> List[Tuple[int, ...]]:
+    """Contiguous, near-equal blocks; with more parts than cores, parts share cores round-robin"""
+    cores = list(cores)
+    if parts <= len(cores):
+        base, extra = divmod(len(cores), parts)
+        blocks, start = [], 0
+        for i in range(parts):
+            size = base + (1 if i < extra else 0)
+            blocks.append(tuple(cores[start:start + size]))
+            start += size
+        return blocks
+    return [(cores[i % len(cores)],) for i in range(parts)]
+
+
+def split_weighted(cores: Sequence[int], weights: Dict[str, float]) -> Dict[str, Tuple[int, ...]]:
+    """Split ``cores`` among the weighted names, at least one core each (shared when cores run out)"""
+    cores = list(cores)
+    names = [name for name in PIPELINES if weights.get(name, 0) > 0]
+    if len(cores) <= len(names):
+        return {name: (cores[i % len(cores)],) for i, name in enumerate(names)}
+
+    total = sum(weights[name] for name in names)
+    # One core each, then the rest by largest remainder of the weighted share
+    counts = {name: 1 for name in names}
+    spare = len(cores) - len(names)
+    shares = {name: spare * weights[name] / total for name in names}
+    for name in names:
+        counts[name] += int(shares[name])
+    leftover = len(cores) - sum(counts.values())
+    for name in sorted(names, key=lambda n: shares[n] - int(shares[n]), reverse=True)[:leftover]:
+        counts[name] += 1
+
+    partitions, start = {}, 0
+    for name in names:
+        partitions[name] = tuple(cores[start:start + counts[name]])
+        start += counts[name]
+    return partitions
+
+
+class WorkerTopology:
+    """The cores of one serving worker and how they are divided among its media pipelines"""
+
+    def __init__(self, index: int, workers: int, cores: Tuple[int, ...], pipelines: Dict[str, Tuple[int, ...]],
+                 pin: bool = False):
+        self.index = index
+        self.workers = workers
+        self.cores = cores
+        self.pipelines = pipelines
+        self.pin = pin
+
+    def threads(self, pipeline: str) -> int:
+        return len(self.pipelines.get(pipeline) or self.cores)
+
+    def cores_for(self, pipelines: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(sorted({core for name in pipelines for core in self.pipelines.get(name, ())}))
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "worker": self.index,
+            "workers": self.workers,
+            "cores": list(self.cores),
+            "pinned": self.pin,
+            "pipelines": {
+                name: {"cores": list(cores), "threads": len(cores)} for name, cores in self.pipelines.items()
+            },
+        }
+
+    def summary(self) -> str:
+        pipelines = ", ".join(f"{name} {_ranges(cores)} ({len(cores)} thread{'s' if len(cores) != 1 else ''})"
+                              for name, cores in self.pipelines.items())
+        return (f"worker {self.index + 1}/{self.workers}: cores {_ranges(self.cores)}"
+                f"{' (pinned)' if self.pin else ''} | {pipelines}")
+
+
+def plan_topology(workers: int, index: int, weights: Dict[str, float], cores: Optional[Sequence[int]] = None,
+                  pin: bool = False) -> WorkerTopology:
+    """Cores split evenly among ``workers``, then worker ``index``'s block split by pipeline weight"""
+    cores = list(cores) if cores is not None else available_cores()
+    workers = max(1, workers)
+    block = split_evenly(cores, workers)[index % workers]
+    return WorkerTopology(index % workers, workers, block, split_weighted(block, weights), pin)
+
+
+def claim_worker_slot(directory: str, workers: int) -> int:
+    """Lowest worker slot not held by another process on this host.
+
+    Serving workers (e.g. ``uvicorn --workers``) start without an index; each takes an
+    exclusive lock on slot-<i>.lock and keeps it until exit, so a restarted worker
+    reclaims the slot (and cores) of the one it replaces.
+    """
+    global _slot_handle
+    try:
+        import fcntl
+    except ImportError:
+        return 0
+    os.makedirs(directory, exist_ok=True)
+    for index in range(max(1, workers)):
+        handle = open(os.path.join(directory, f"slot-{index}.lock"), "a+")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        _slot_handle = handle
+        return index
+    # More processes than configured workers: share slots rather than fail
+    return os.getpid() % max(1, workers)
+
+
+def apply_thread_limits(threads: int, cores: Optional[Sequence[int]] = None) -> None:
+    """Size this process's native thread pools to ``threads``, optionally pinning it to ``cores``.
+
+    Environment variables cover libraries not imported yet (models load lazily);
+    torch and OpenCV are also set directly if they are already loaded.
+    """
+    threads = max(1, threads)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    if "cv2" in sys.modules:
+        sys.modules["cv2"].setNumThreads(threads)
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(cores))
+
+
+def _ranges(cores: Sequence[int]) -> str:
+    """(0, 1, 2, 5) -> "0-2,5" """
+    cores = sorted(cores)
+    if not cores:
+        return "-"
+    parts, start, previous = [], cores[0], cores[0]
+    for core in cores[1:] + [None]:
+        if core is not None and core == previous + 1:
+            previous = core
+            continue
+        parts.append(f"{start}-{previous}" if previous != start else str(start))
+        if core is not None:
+            start = previous = core
+    return ",".join(parts)
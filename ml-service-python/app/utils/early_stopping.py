@@ -0,0 +1,57 @@
+import math
+import numpy as np
+from typing import Callable, Dict, List
+
+
+def coarse_to_fine_order(count: int) -> List[int]:
+    """Positions 0..count-1 coarse to fine: both ends, the midpoint, then the midpoints of ever finer gaps"""
+    if count <= 0:
+        return []
+    if count == 1:
+        return [0]
+    order = [0, count - 1]
+    gaps = [(0, count - 1)]
+    while gaps:
+        finer = []
+        for low, high in gaps:
+            if high - low > 1:
+                middle = (low + high) // 2
+                order.append(middle)
+                finer += [(low, middle), (middle, high)]
+        gaps = finer
+    return order
+
+
+def confidence_bound_decided(scores: np.ndarray, threshold: float, z: float = 1.96,
+                             min_std: float = 0.05, **_) -> bool:
+    """Stop once the normal confidence interval of the mean score excludes the threshold"""
+    n = len(scores)
+    if n < 2:
+        return False
+    std = max(float(np.std(scores, ddof=1)), min_std)
+    half_width = z * std / math.sqrt(n)
+    return abs(float(np.mean(scores)) - threshold) > half_width
+
+
+def sprt_decided(scores: np.ndarray, threshold: float, margin: float = 0.1, alpha: float = 0.05,
+                 beta: float = 0.05, min_std: float = 0.05, **_) -> bool:
+    """Wald's sequential probability ratio test on the frame scores.
+
+    Tests H0: mean = threshold - margin (real) against H1: mean = threshold + margin
+    (fake), with Gaussian noise whose variance is estimated from the scores so far.
+    Stops as soon as the log-likelihood ratio leaves (log(beta/(1-alpha)), log((1-beta)/alpha)).
+    """
+    n = len(scores)
+    if n < 2:
+        return False
+    variance = max(float(np.var(scores, ddof=1)), min_std ** 2)
+    log_ratio = (2.0 * margin / variance) * float(np.sum(scores - threshold))
+    upper = math.log((1.0 - beta) / alpha)
+    lower = math.log(beta / (1.0 - alpha))
+    return log_ratio >= upper or log_ratio <= lower
+
+
+STOPPING_RULES: Dict[str, Callable[..., bool]] = {
+    "confidence": confidence_bound_decided,
+    "sprt": sprt_decided,
+}
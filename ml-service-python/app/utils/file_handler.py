@@ -1,17 +1,69 @@
+import io
 import os
+import hashlib
 import tempfile
 import shutil
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class StoredUpload:
+    """Byte count and content hash of an upload, and where it was written (if anywhere)"""
+
+    __slots__ = ("path", "size", "content_hash")
+
+    def __init__(self, path: Optional[str], size: int, content_hash: str):
+        self.path = path
+        self.size = size
+        self.content_hash = content_hash
+
+
+async def stream_upload(upload_file: UploadFile, destination: Optional[BinaryIO] = None,
+                        max_size: Optional[int] = None, chunk_size: int = UPLOAD_CHUNK_SIZE) -> StoredUpload:
+    """Copy an upload chunk by chunk, hashing and counting bytes as they pass.
+
+    Raises 413 as soon as ``max_size`` is crossed. Only one chunk is held in memory;
+    with no ``destination`` the upload is just hashed and measured.
+    """
+    digest = hashlib.md5()
+    size = 0
+    while chunk := await upload_file.read(chunk_size):
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise HTTPException(
+                status_code=413, detail=f"File too large (max {max_size // (1024 * 1024)}MB)"
+            )
+        digest.update(chunk)
+        if destination is not None:
+            destination.write(chunk)
+    return StoredUpload(None, size, digest.hexdigest())
+
+
+async def read_upload(upload_file: UploadFile, max_size: Optional[int] = None,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[bytes, StoredUpload]:
+    """Read an upload that must be held in memory (e.g. to decode it), enforcing the limit while reading"""
+    buffer = io.BytesIO()
+    stored = await stream_upload(upload_file, buffer, max_size, chunk_size)
+    return buffer.getvalue(), stored
+
+
 class FileHandler:
     def __init__(self, temp_dir: str = "./temp"):
         self.temp_dir = Path(temp_dir)
         self.temp_dir.mkdir(exist_ok=True)
     
-    async def save_upload_file(self, upload_file: UploadFile, suffix: str = None) -> str:
+    async def save_upload_file(self, upload_file: UploadFile, suffix: str = None,
+                               max_size: Optional[int] = None) -> str:
         """Save uploaded file to temporary directory"""
+        return (await self.save_upload_stream(upload_file, suffix, max_size)).path
+    
+    async def save_upload_stream(self, upload_file: UploadFile, suffix: str = None,
+                                 max_size: Optional[int] = None) -> StoredUpload:
+        """Stream an upload to a temporary file, returning its path, size and content hash"""
+        temp_file = None
         try:
             # Create temporary file
             if suffix:
@@ -26,14 +78,19 @@ class FileHandler:
                     dir=self.temp_dir
                 )
             
-            # Write file content
-            content = await upload_file.read()
-            temp_file.write(content)
-            temp_file.close()
-            
-            return temp_file.name
+            # Write file content chunk by chunk
+            with temp_file:
+                stored = await stream_upload(upload_file, temp_file, max_size)
+            stored.path = temp_file.name
+            return stored
             
+        except HTTPException:
+            if temp_file is not None:
+                self.cleanup_file(temp_file.name)
+            raise
         except Exception as e:
+            if temp_file is not None:
+                self.cleanup_file(temp_file.name)
             raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
     def cleanup_file(self, file_path: str) -> None:
@@ -0,0 +1,79 @@
+import numpy as np
+from typing import Callable
+
+# BGR luma weights
+_LUMA = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def frame_signatures(frames: np.ndarray, grid: int = 16, max_side: int = 128) -> np.ndarray:
+    """Tiny luma thumbnails (N, grid*grid) in [0, 1] for a (N, H, W, 3) BGR frame stack.
+
+    The stack is first strided down to about ``max_side`` pixels (a view, no copy),
+    then block-averaged onto a grid x grid raster, all in one vectorized pass.
+    """
+    n, height, width = frames.shape[:3]
+    stride = max(1, max(height, width) // max_side)
+    small = frames[:, ::stride, ::stride]
+
+    grid_h = min(grid, small.shape[1])
+    grid_w = min(grid, small.shape[2])
+    block_h = small.shape[1] // grid_h
+    block_w = small.shape[2] // grid_w
+    small = small[:, :block_h * grid_h, :block_w * grid_w]
+
+    luma = small.astype(np.float32) @ _LUMA if small.ndim == 4 else small.astype(np.float32)
+    blocks = luma.reshape(n, grid_h, block_h, grid_w, block_w).mean(axis=(2, 4))
+    return (blocks / 255.0).reshape(n, -1)
+
+
+class FrameDeduplicator:
+    """Skip model inference for frames that are near-identical to a frame already scored.
+
+    One instance covers one video. Every frame is compared (mean absolute difference of
+    signatures) with the representatives scored so far and with the other new frames of
+    its batch. Only frames without a match within ``threshold`` go to the model;
+    duplicates inherit their representative's score, so every sampled frame still
+    contributes to the aggregate.
+    """
+
+    def __init__(self, threshold: float = 0.02, grid: int = 16):
+        self.threshold = threshold
+        self.grid = grid
+        self._signatures = None
+        self._scores = np.empty(0, dtype=np.float32)
+        self.frames_seen = 0
+        self.frames_inferred = 0
+
+    def score(self, frames: np.ndarray, score_fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Return a score for every frame, calling ``score_fn`` on the unique ones only"""
+        signatures = frame_signatures(frames, self.grid)
+        count = len(signatures)
+        known = len(self._scores)
+        assignment = np.full(count, -1, dtype=np.int64)
+
+        if known:
+            distances = np.abs(signatures[:, None, :] - self._signatures[None, :, :]).mean(axis=2)
+            nearest = distances.argmin(axis=1)
+            matched = distances[np.arange(count), nearest] <= self.threshold
+            assignment[matched] = nearest[matched]
+
+        # Greedy grouping of the remaining frames within the batch
+        pairwise = np.abs(signatures[:, None, :] - signatures[None, :, :]).mean(axis=2)
+        representatives = []
+        for i in np.flatnonzero(assignment < 0):
+            match = next((j for j in representatives if pairwise[i, j] <= self.threshold), None)
+            if match is None:
+                representatives.append(i)
+                assignment[i] = known + len(representatives) - 1
+            else:
+                assignment[i] = assignment[match]
+
+        if representatives:
+            new_scores = np.asarray(score_fn(frames[representatives]), dtype=np.float32)
+            new_signatures = signatures[representatives]
+            self._signatures = new_signatures if self._signatures is None else np.concatenate([self._signatures, new_signatures])
+            self._scores = np.concatenate([self._scores, new_scores])
+
+        self.frames_seen += count
+        self.frames_inferred += len(representatives)
+        return self._scores[assignment]
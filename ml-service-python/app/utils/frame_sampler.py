@@ -0,0 +1,279 @@
+import re
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class SampledFrame:
+    """A decoded BGR frame with its position in the video"""
+
+    __slots__ = ("index", "timestamp", "frame")
+
+    def __init__(self, index: Optional[int], timestamp: Optional[float], frame: np.ndarray):
+        self.index = index
+        self.timestamp = timestamp
+        self.frame = frame
+
+
+class VideoInfo:
+    """Container metadata reported by OpenCV"""
+
+    def __init__(self, frame_count: int, fps: float, width: int, height: int):
+        self.frame_count = frame_count
+        self.fps = fps
+        self.width = width
+        self.height = height
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count / self.fps if self.fps > 0 else 0.0
+
+
+def set_opencv_threads(threads: int) -> None:
+    """Size OpenCV's internal thread pool (decode, resize, colour conversion) for this process"""
+    cv2.setNumThreads(max(1, threads))
+
+
+def probe_video(video_path: str) -> VideoInfo:
+    """Read frame count, fps and frame size without decoding"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return VideoInfo(
+            frame_count=max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))),
+            fps=float(cap.get(cv2.CAP_PROP_FPS) or 0.0),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+    finally:
+        cap.release()
+
+
+def evenly_spaced_indices(frame_count: int, max_frames: int) -> List[int]:
+    """Up to max_frames frame indices spread across the whole video"""
+    if frame_count <= 0 or max_frames <= 0:
+        return []
+    if frame_count <= max_frames:
+        return list(range(frame_count))
+    return sorted(set(np.linspace(0, frame_count - 1, max_frames).round().astype(int).tolist()))
+
+
+def shrink_frame(frame: np.ndarray, min_size: Tuple[int, int]) -> np.ndarray:
+    """Scale a frame down, keeping its aspect ratio, to no less than ``min_size`` (width, height)"""
+    height, width = frame.shape[:2]
+    scale = max(min_size[0] / width, min_size[1] / height)
+    if scale >= 1.0:
+        return frame
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+class FrameSampler(ABC):
+    """Base class for frame sampling strategies.
+
+    ``sample`` is a generator: frames are yielded as soon as they are decoded so
+    callers can process them in small batches instead of holding every sampled
+    frame in memory.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def sample(self, video_path: str, max_frames: int) -> Iterator[SampledFrame]:
+        """Yield up to ``max_frames`` frames of the video, in timeline order"""
+
+
+class SeekFrameSampler(FrameSampler):
+    """Seek to every target index (the original strategy).
+
+    Each seek decodes forward from the previous keyframe, so cost grows with the GOP length.
+    """
+
+    name = "seek"
+
+    def sample(self, video_path: str, max_frames: int) -> Iterator[SampledFrame]:
+        cap = cv2.VideoCapture(video_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            indices = evenly_spaced_indices(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), max_frames)
+            for index in indices:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                ret, frame = cap.read()
+                if ret and frame is not None:
+                    yield SampledFrame(index, index / fps if fps else None, frame)
+        finally:
+            cap.release()
+
+
+class SequentialFrameSampler(FrameSampler):
+    """Single forward pass: ``grab`` every frame, ``retrieve`` only the targets.
+
+    ``grab`` still decodes, but never re-decodes a GOP. When the gap to the next
+    target exceeds ``seek_gap`` frames (0 disables this), one forward seek is
+    cheaper than grabbing through the gap, so the sampler jumps instead.
+    """
+
+    name = "sequential"
+
+    def __init__(self, seek_gap: int = 0):
+        self.seek_gap = seek_gap
+
+    def sample(self, video_path: str, max_frames: int) -> Iterator[SampledFrame]:
+        info = probe_video(video_path)
+        yield from self.sample_indices(video_path, evenly_spaced_indices(info.frame_count, max_frames))
+
+    def sample_indices(self, video_path: str, indices: Sequence[int]) -> Iterator[SampledFrame]:
+        """Yield the requested frame indices in ascending order"""
+        targets = sorted(set(indices))
+        if not targets:
+            return
+
+        cap = cv2.VideoCapture(video_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            position = 0  # index of the frame the next grab() returns
+            for target in targets:
+                if self.seek_gap and target - position > self.seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    position = target
+
+                ok = True
+                while position <= target:
+                    ok = cap.grab()
+                    position += 1
+                    if not ok:
+                        break
+                if not ok:
+                    break  # container over-reported its frame count
+
+                ret, frame = cap.retrieve()
+                if ret and frame is not None:
+                    yield SampledFrame(target, target / fps if fps else None, frame)
+        finally:
+            cap.release()
+
+
+class TimeFrameSampler(FrameSampler):
+    """Single forward pass sampling one frame per time interval.
+
+    Uses container timestamps, so variable-frame-rate videos are sampled evenly in
+    time rather than in frame count. ``interval`` defaults to duration / max_frames.
+    """
+
+    name = "time"
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval
+
+    def sample(self, video_path: str, max_frames: int) -> Iterator[SampledFrame]:
+        cap = cv2.VideoCapture(video_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = frame_count / fps if fps else 0.0
+            interval = self.interval or (duration / max_frames if duration and max_frames else 0.0)
+
+            next_time, emitted, index = 0.0, 0, 0
+            while emitted < max_frames and cap.grab():
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if timestamp + 1e-6 >= next_time:
+                    ret, frame = cap.retrieve()
+                    if ret and frame is not None:
+                        yield SampledFrame(index, timestamp, frame)
+                        emitted += 1
+                    while next_time <= timestamp + 1e-6:
+                        next_time += interval if interval > 0 else float("inf")
+                index += 1
+        finally:
+            cap.release()
+
+
+class KeyframeSampler(FrameSampler):
+    """Decode keyframes only, via ffmpeg ``-skip_frame nokey``.
+
+    Non-keyframes are never decoded, which makes this the cheapest strategy on long
+    videos. An ffmpeg ``select`` expression thins the keyframes to at most one per
+    duration / max_frames seconds, so only the chosen frames cross the pipe.
+    Falls back to the sequential sampler if ffmpeg is unavailable.
+    """
+
+    name = "keyframe"
+    _pts_pattern = re.compile(r"\bn:\s*(\d+).*?\bpts_time:\s*([-\d.]+)")
+
+    def __init__(self, ffmpeg_binary: str = "ffmpeg"):
+        self.ffmpeg_binary = ffmpeg_binary
+
+    def sample(self, video_path: str, max_frames: int) -> Iterator[SampledFrame]:
+        if shutil.which(self.ffmpeg_binary) is None:
+            logger.warning("ffmpeg not found, keyframe sampling falls back to sequential")
+            yield from SequentialFrameSampler().sample(video_path, max_frames)
+            return
+
+        info = probe_video(video_path)
+        if info.width <= 0 or info.height <= 0 or max_frames <= 0:
+            return
+        spacing = info.duration / max_frames if info.duration else 0.0
+
+        cmd = [
+            self.ffmpeg_binary, "-hide_banner", "-nostats", "-loglevel", "info",
+            "-noautorotate", "-skip_frame", "nokey", "-i", video_path,
+            "-map", "0:v:0", "-an", "-vsync", "passthrough",
+            "-vf", f"select='if(gte(t,ld(0)),st(0,t+{spacing:.6f})*0+1,0)',showinfo",
+            "-frames:v", str(max_frames),
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+        ]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        timestamps: "queue.Queue[Optional[float]]" = queue.Queue()
+        reader = threading.Thread(target=self._read_timestamps, args=(process.stderr, timestamps), daemon=True)
+        reader.start()
+
+        frame_size = info.width * info.height * 3
+        try:
+            while True:
+                buffer = process.stdout.read(frame_size)
+                if len(buffer) < frame_size:
+                    break
+                frame = np.frombuffer(buffer, dtype=np.uint8).reshape(info.height, info.width, 3)
+                try:
+                    timestamp = timestamps.get(timeout=5.0)
+                except queue.Empty:
+                    timestamp = None
+                index = int(round(timestamp * info.fps)) if timestamp is not None and info.fps else None
+                yield SampledFrame(index, timestamp, frame)
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            reader.join(timeout=1.0)
+
+    def _read_timestamps(self, stream, timestamps: "queue.Queue[Optional[float]]") -> None:
+        for line in iter(stream.readline, b""):
+            match = self._pts_pattern.search(line.decode(errors="replace"))
+            if match:
+                timestamps.put(float(match.group(2)))
+        stream.close()
+
+
+FRAME_SAMPLERS: Dict[str, Type[FrameSampler]] = {
+    SeekFrameSampler.name: SeekFrameSampler,
+    SequentialFrameSampler.name: SequentialFrameSampler,
+    TimeFrameSampler.name: TimeFrameSampler,
+    KeyframeSampler.name: KeyframeSampler,
+}
+
+
+def get_frame_sampler(name: str, **kwargs) -> FrameSampler:
+    """Instantiate a registered sampling strategy by name"""
+    try:
+        sampler_class = FRAME_SAMPLERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown frame sampler '{name}' (available: {', '.join(FRAME_SAMPLERS)})")
+    return sampler_class(**kwargs)
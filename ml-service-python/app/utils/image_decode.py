@@ -0,0 +1,145 @@
+import threading
+import numpy as np
+from PIL import Image
+from typing import BinaryIO, Dict, Optional, Sequence, Tuple, Union
+
+ImageSource = Union[Image.Image, np.ndarray, BinaryIO, str]
+
+
+def open_image(source: Union[BinaryIO, str]) -> Image.Image:
+    """Open an image lazily from a file object (e.g. an UploadFile spool) or path.
+
+    Only the header is read here, so the encoded bytes are never copied into a
+    ``bytes`` object and the decoder can still be put in draft mode.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return Image.open(source)
+
+
+def load_image(image: Image.Image, draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Decode an opened image's pixels now; raises on truncated or corrupt data.
+
+    A JPEG is decoded in draft mode, scaled down inside the DCT to no less than
+    ``draft_size`` (width, height). That changes ``image.size``, so read the
+    original dimensions before calling this.
+    """
+    if draft_size and image.format == "JPEG":
+        image.draft("RGB", draft_size)
+    image.load()
+    return image
+
+
+class PixelSpec:
+    """Resize and normalization parameters of a SigLIP-style image processor"""
+
+    def __init__(self, height: int, width: int, resample: int, mean: Sequence[float], std: Sequence[float],
+                 rescale_factor: float = 1 / 255):
+        self.height = height
+        self.width = width
+        self.resample = resample
+        # (x * rescale - mean) / std folded into one multiply-add per channel
+        self.scale = (rescale_factor / np.asarray(std, dtype=np.float64)).astype(np.float32)
+        self.offset = (-np.asarray(mean, dtype=np.float64) / np.asarray(std, dtype=np.float64)).astype(np.float32)
+
+    @classmethod
+    def from_processor(cls, processor) -> Optional["PixelSpec"]:
+        """Spec matching ``processor``, or None if it does anything this path does not reproduce"""
+        size = getattr(processor, "size", None)
+        height = _size_field(size, "height")
+        width = _size_field(size, "width")
+        if not height or not width:
+            return None
+        if not (getattr(processor, "do_resize", True) and getattr(processor, "do_rescale", True)
+                and getattr(processor, "do_normalize", True)):
+            return None
+        return cls(
+            height=int(height),
+            width=int(width),
+            resample=int(getattr(processor, "resample", Image.BICUBIC)),
+            mean=list(processor.image_mean),
+            std=list(processor.image_std),
+            rescale_factor=float(getattr(processor, "rescale_factor", 1 / 255)),
+        )
+
+
+def _size_field(size, name: str) -> Optional[int]:
+    if size is None:
+        return None
+    if isinstance(size, dict):
+        return size.get(name)
+    return getattr(size, name, None)
+
+
+def load_rgb(source: ImageSource, size: Tuple[int, int], resample: int, draft: bool = True) -> Image.Image:
+    """Decode, convert to RGB and resize to ``size`` (width, height) with as few full-size copies as possible.
+
+    JPEGs not yet loaded are decoded in draft mode, scaled down by 1/2-1/8 inside the DCT
+    (never below twice ``size``, so the final resampling still filters), and the
+    full-resolution bitmap never exists. Grey images are resized before the RGB
+    conversion, so only the small result is expanded.
+    """
+    if isinstance(source, np.ndarray):
+        image = Image.fromarray(source)
+    elif isinstance(source, Image.Image):
+        image = source
+    else:
+        image = open_image(source)
+
+    if draft and image.format == "JPEG":
+        image.draft("RGB", (size[0] * 2, size[1] * 2))
+
+    if image.mode == "L":
+        return image.resize(size, resample).convert("RGB")
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image.resize(size, resample)
+
+
+def write_pixels(image: Image.Image, out: np.ndarray, spec: PixelSpec) -> None:
+    """Normalize an RGB image of the spec's size into ``out`` (3, H, W) float32, in place"""
+    pixels = np.asarray(image)
+    for channel in range(3):
+        np.multiply(pixels[..., channel], spec.scale[channel], out=out[channel], dtype=np.float32)
+        out[channel] += spec.offset[channel]
+
+
+class PixelBufferPool:
+    """Reusable (N, 3, H, W) float32 model input buffers, one per thread.
+
+    The model consumes the buffer (through ``torch.from_numpy``) before the thread
+    can fill it again, so a per-thread buffer is never overwritten while in use.
+    """
+
+    def __init__(self, spec: PixelSpec, capacity: int = 16):
+        self.spec = spec
+        self.capacity = capacity
+        self._local = threading.local()
+
+    def get(self, count: int) -> np.ndarray:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < count:
+            buffer = np.empty((max(count, self.capacity), 3, self.spec.height, self.spec.width), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:count]
+
+    def fill(self, images: Sequence[ImageSource], draft: bool = True,
+             errors: Optional[Dict[int, Exception]] = None) -> np.ndarray:
+        """Decode every image straight into this thread's buffer; returns the filled (N, 3, H, W) view.
+
+        With ``errors``, an image that fails to decode is recorded there by index and
+        left out; the remaining rows stay packed in input order.
+        """
+        out = self.get(len(images))
+        size = (self.spec.width, self.spec.height)
+        filled = 0
+        for i, image in enumerate(images):
+            try:
+                write_pixels(load_rgb(image, size, self.spec.resample, draft), out[filled], self.spec)
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors[i] = e
+                continue
+            filled += 1
+        return out[:filled]
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_COLUMNS = (
+    "id", "media_type", "status", "filename", "content_type", "file_path", "file_size", "options",
+    "progress_done", "progress_total", "result", "error", "created_at", "started_at", "finished_at",
+    "expires_at",
+)
+
+
+class JobStore:
+    """SQLite-backed queue and record of analysis jobs.
+
+    Queued jobs and their uploaded files survive a restart. Several processes may
+    share one store: a claimed job is leased to the claiming store (``owner``) for
+    ``lease_seconds``, and the lease is renewed while the job runs. Jobs whose lease
+    lapsed because their process died are put back on the queue by ``requeue_stale``;
+    jobs other live processes are running are left alone. Finished jobs expire
+    ``ttl_seconds`` after they finish.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600, lease_seconds: float = 60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, media_type TEXT NOT NULL, status TEXT NOT NULL, "
+            "filename TEXT, content_type TEXT, file_path TEXT NOT NULL, file_size INTEGER, "
+            "options TEXT NOT NULL, progress_done INTEGER NOT NULL DEFAULT 0, "
+            "progress_total INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, expires_at REAL, "
+            "owner TEXT, lease_expires_at REAL)"
+        )
+        self._add_lease_columns()
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)")
+        self._db.commit()
+        requeued = self.requeue_stale()
+        queued = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        logger.info(f"💾 Job store: {path} ({queued} queued, {requeued} requeued from lapsed leases)")
+
+    def _add_lease_columns(self) -> None:
+        """Upgrade a store created before jobs were leased"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if name not in columns:
+                try:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+                except sqlite3.OperationalError:
+                    pass  # added by another process opening the store at the same time
+
+    def create(self, media_type: str, file_path: str, filename: Optional[str], content_type: Optional[str],
+               file_size: int, options: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, media_type, status, filename, content_type, file_path, file_size, "
+                "options, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, media_type, QUEUED, filename, content_type, file_path, file_size,
+                 json.dumps(options), time.time())
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        if job["expires_at"] is not None and job["expires_at"] <= time.time():
+            return None
+        job["options"] = json.loads(job["options"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running, leased to this store, and return it"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_expires_at = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) RETURNING id",
+                (RUNNING, now, self.owner, now + self.lease_seconds, QUEUED)
+            ).fetchone()
+            self._db.commit()
+        return self.get(row[0]) if row else None
+
+    def update_progress(self, job_id: str, done: int, total: int) -> int:
+        """Record progress and renew the lease; returns the number of rows updated.
+
+        0 means the job is no longer running here: it was cancelled (possibly through
+        another process) or requeued after its lease lapsed.
+        """
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET progress_done = ?, progress_total = ?, lease_expires_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (done, total, time.time() + self.lease_seconds, job_id, RUNNING, self.owner)
+            ).rowcount
+            self._db.commit()
+        return updated
+
+    def renew_leases(self, job_ids: List[str]) -> List[str]:
+        """Extend the leases of jobs running here; returns those no longer running here"""
+        if not job_ids:
+            return []
+        with self._lock:
+            renewed = {row[0] for row in self._db.execute(
+                "UPDATE jobs SET lease_expires_at = ? "
+                f"WHERE status = ? AND owner = ? AND id IN ({', '.join('?' * len(job_ids))}) RETURNING id",
+                (time.time() + self.lease_seconds, RUNNING, self.owner, *job_ids)
+            ).fetchall()}
+            self._db.commit()
+        return [job_id for job_id in job_ids if job_id not in renewed]
+
+    def requeue_stale(self) -> int:
+        """Put running jobs whose lease lapsed (their process died) back on the queue"""
+        return self._requeue("lease_expires_at IS NULL OR lease_expires_at <= ?", (time.time(),))
+
+    def requeue_owned(self) -> int:
+        """Put the jobs running here back on the queue, e.g. on shutdown"""
+        return self._requeue("owner = ?", (self.owner,))
+
+    def _requeue(self, condition: str, params: tuple) -> int:
+        with self._lock:
+            requeued = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress_done = 0, owner = NULL, "
+                f"lease_expires_at = NULL WHERE status = ? AND ({condition})",
+                (QUEUED, RUNNING, *params)
+            ).rowcount
+            self._db.commit()
+        return requeued
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, owned: bool = False) -> bool:
+        """Record the outcome; a job that was already finished (e.g. cancelled) is left as is.
+
+        With ``owned``, only a job still running under this store's lease is finished,
+        so a worker whose lease lapsed cannot overwrite the job's requeued run.
+        """
+        now = time.time()
+        condition = f"status NOT IN ({', '.join('?' * len(FINISHED_STATES))})"
+        params = FINISHED_STATES
+        if owned:
+            condition, params = "status = ? AND owner = ?", (RUNNING, self.owner)
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ?, "
+                f"lease_expires_at = NULL WHERE id = ? AND {condition}",
+                (status, json.dumps(result) if result is not None else None, error, now,
+                 now + self.ttl_seconds, job_id, *params)
+            ).rowcount
+            self._db.commit()
+        return updated > 0
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued or running job; returns the status it had, or None if unknown/expired"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] not in FINISHED_STATES:
+            self.finish(job_id, CANCELLED, error="Cancelled by client")
+        return job["status"]
+
+    def purge_expired(self) -> List[str]:
+        """Delete expired jobs; returns their file paths so the caller can remove the uploads"""
+        with self._lock:
+            rows = self._db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ? RETURNING file_path",
+                (time.time(),)
+            ).fetchall()
+            self._db.commit()
+        return [row[0] for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
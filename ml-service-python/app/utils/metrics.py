@@ -0,0 +1,312 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans cached hits (~ms) to long videos (minutes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(value) for value in labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Settable gauge, or one read at scrape time from ``callback``.
+
+    A callback returns a number, or for labelled gauges a dict of label tuple -> number.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Any]] = None):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def collect(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return []  # a failing source must not break the scrape
+            if value is None:
+                return []
+            values = value if isinstance(value, dict) else {(): value}
+            items = sorted((self._key(key if isinstance(key, tuple) else (key,)), v)
+                           for key, v in values.items() if v is not None)
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last = +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text exposition format.
+
+    Values are per process: with several serving workers, each one exposes its own.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                if isinstance(metric, Gauge) and metric.callback is not None:
+                    existing.callback = metric.callback
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames, callback))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.collect()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ml_stage_duration_seconds", "Time a request spent in each pipeline stage", ("pipeline", "stage")
+)
+ERRORS = REGISTRY.counter("ml_errors_total", "Failed requests and degraded results by cause", ("endpoint", "cause"))
+
+
+# --- per-request stage timings ---------------------------------------------------
+
+class Timings:
+    """Seconds spent in each stage of one request; stages repeated in a request add up"""
+
+    def __init__(self, pipeline: Optional[str] = None, endpoint: Optional[str] = None):
+        self.pipeline = pipeline
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.error_counted = False
+        self._lock = threading.Lock()  # the audio and visual branches of a video record concurrently
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def merge(self, stages: Dict[str, float]) -> None:
+        for stage, seconds in stages.items():
+            self.add(stage, seconds)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage seconds in the order first seen, plus the request's total so far"""
+        with self._lock:
+            timings = {stage: round(seconds, 6) for stage, seconds in self.stages.items()}
+        timings["total"] = round(time.perf_counter() - self.started, 6)
+        return timings
+
+    def observe(self) -> None:
+        with self._lock:
+            stages = list(self.stages.items())
+        for stage, seconds in stages:
+            STAGE_SECONDS.observe(seconds, self.pipeline or "none", stage)
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("ml_timings", default=None)
+
+
+def current_timings() -> Optional[Timings]:
+    return _current.get()
+
+
+@contextmanager
+def timing_scope(pipeline: Optional[str] = None, endpoint: Optional[str] = None,
+                 observe: bool = True) -> Iterator[Timings]:
+    """Collect the stages run inside the block (also in threads started with its context).
+
+    On exit each stage's total is observed in ml_stage_duration_seconds, unless
+    ``observe`` is False (process workers hand their stages back to the parent instead).
+    """
+    timings = Timings(pipeline, endpoint)
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+        if observe:
+            timings.observe()
+
+
+def record_stage(name: str, seconds: float, pipeline: Optional[str] = None) -> None:
+    """Add to the current request's timings, or observe directly when outside any request
+    (e.g. on the micro-batcher thread, whose batches serve several requests)"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+    else:
+        STAGE_SECONDS.observe(seconds, pipeline or "none", name)
+
+
+@contextmanager
+def stage(name: str, pipeline: Optional[str] = None) -> Iterator[None]:
+    """Time the block as stage ``name``; ``pipeline`` labels it only outside a request scope"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start, pipeline)
+
+
+def timed_iter(iterable: Iterable[Any], name: str, pipeline: Optional[str] = None) -> Iterator[Any]:
+    """Yield from ``iterable``, timing only the time spent producing items (e.g. decoding frames)"""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            record_stage(name, time.perf_counter() - start, pipeline)
+            return
+        record_stage(name, time.perf_counter() - start, pipeline)
+        yield item
+
+
+def merge_stages(stages: Dict[str, float], pipeline: Optional[str] = None) -> None:
+    """Record stages measured elsewhere (a worker process) as if they had run here"""
+    for name, seconds in stages.items():
+        record_stage(name, seconds, pipeline)
+
+
+def attach_timings(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the current request's stage timings to a response body under ``timings``"""
+    timings = _current.get()
+    if timings is not None and isinstance(result, dict):
+        result["timings"] = timings.as_dict()
+    return result
+
+
+def count_error(cause: str, endpoint: Optional[str] = None) -> None:
+    """Count a failure or degraded result; the request's endpoint is used when not given"""
+    timings = _current.get()
+    if timings is not None:
+        timings.error_counted = True
+        endpoint = endpoint or timings.endpoint
+    ERRORS.inc(endpoint or "none", cause)
@@ -0,0 +1,95 @@
+import time
+from typing import Dict, Optional
+from starlette.routing import Match
+
+from .metrics import REGISTRY, count_error, timing_scope
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ml_http_request_duration_seconds", "End-to-end request latency by endpoint", ("endpoint", "method", "status")
+)
+IN_FLIGHT = REGISTRY.gauge("ml_http_requests_in_flight", "Requests being served by endpoint", ("endpoint",))
+
+# Error cause of a failed response that did not record a more specific one
+STATUS_CAUSES = {
+    400: "invalid_input",
+    404: "not_found",
+    413: "too_large",
+    422: "validation",
+    429: "rate_limited",
+    503: "unavailable",
+}
+
+
+def status_cause(status: int) -> str:
+    return STATUS_CAUSES.get(status, "internal" if status >= 500 else "client_error")
+
+
+class MetricsMiddleware:
+    """Request latency, in-flight gauge and error counters per endpoint, plus a stage-timing scope.
+
+    Endpoints are labelled by route template (/api/jobs/{job_id}), so ids do not
+    create new series. Every request runs in a ``timing_scope`` whose pipeline comes
+    from ``pipelines`` (path prefix -> pipeline, longest match wins); the time spent
+    receiving the body is its "receive" stage. Place it outermost so requests
+    rejected by other middleware are counted too.
+    """
+
+    def __init__(self, app, pipelines: Optional[Dict[str, str]] = None, skip_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.pipelines = sorted((pipelines or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.skip_paths = set(skip_paths)
+
+    def pipeline_for(self, path: str) -> Optional[str]:
+        for prefix, pipeline in self.pipelines:
+            if path.startswith(prefix):
+                return pipeline
+        return None
+
+    @staticmethod
+    def endpoint_for(scope) -> str:
+        app = scope.get("app")
+        for route in getattr(getattr(app, "router", None), "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self.endpoint_for(scope)
+        status = 500
+        receive_started = None
+
+        with timing_scope(self.pipeline_for(scope["path"]), endpoint) as timings:
+
+            async def timed_receive():
+                nonlocal receive_started
+                if receive_started is None:
+                    receive_started = time.perf_counter()
+                message = await receive()
+                if message["type"] == "http.request" and not message.get("more_body", False):
+                    timings.add("receive", time.perf_counter() - receive_started)
+                return message
+
+            async def status_send(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+
+            IN_FLIGHT.inc(endpoint)
+            try:
+                await self.app(scope, timed_receive, status_send)
+            except Exception:
+                if not timings.error_counted:
+                    count_error("unhandled")
+                raise
+            else:
+                if status >= 400 and not timings.error_counted:
+                    count_error(status_cause(status))
+            finally:
+                IN_FLIGHT.dec(endpoint)
+                REQUEST_SECONDS.observe(time.perf_counter() - timings.started, endpoint, scope["method"], status)
@@ -0,0 +1,136 @@
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collect concurrent single-item requests into batches for one worker thread.
+
+    Callers block on ``submit(item).result()``. The worker thread waits until either
+    ``max_batch_size`` items are queued or the oldest queued item has waited
+    ``max_wait_ms``, then hands the whole batch to ``batch_fn`` and resolves each
+    caller's future with its own entry of the returned list.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 name: str = "micro-batcher", stats_window: int = 1024):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._recent_waits = deque(maxlen=stats_window)
+        self._recent_fill = deque(maxlen=stats_window)
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item and return a future for its result"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._ensure_worker()
+            self._queue.append((item, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def close(self) -> None:
+        """Stop accepting work; queued items are still dispatched"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return batch fill ratio and queue wait metrics"""
+        with self._stats_lock:
+            waits = sorted(self._recent_waits)
+            fills = list(self._recent_fill)
+            batches, items = self._batches, self._items
+
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": len(self._queue),
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "mean_fill_ratio": sum(fills) / len(fills) if fills else 0.0,
+            "queue_wait_ms": {
+                "mean": 1000.0 * sum(waits) / len(waits) if waits else 0.0,
+                "p50": 1000.0 * percentile(waits, 0.50),
+                "p95": 1000.0 * percentile(waits, 0.95),
+                "max": 1000.0 * waits[-1] if waits else 0.0,
+            },
+        }
+
+    def _ensure_worker(self) -> None:
+        # Started lazily so a batcher created before a fork gets its own thread in the child
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+
+                # Hold the batch open until it is full or the oldest item hits its deadline
+                deadline = self._queue[0][2] + self.max_wait
+                while len(self._queue) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                size = min(len(self._queue), self.max_batch_size)
+                batch = [self._queue.popleft() for _ in range(size)]
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        items = [item for item, _, _ in batch]
+
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"❌ {self.name} batch of {len(items)} failed: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._recent_fill.append(len(batch) / self.max_batch_size)
+            self._recent_waits.extend(started - enqueued for _, _, enqueued in batch)
@@ -1,8 +1,9 @@
-import torch
 import os
 from pathlib import Path
-from huggingface_hub import snapshot_download
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import torch
 
 class ModelManager:
     def __init__(self, cache_dir: str = "./models"):
@@ -11,6 +12,7 @@ class ModelManager:
         
     def download_huggingface_model(self, model_name: str, local_dir: Optional[str] = None) -> str:
         """Download model from HuggingFace Hub"""
+        from huggingface_hub import snapshot_download
         if local_dir is None:
             local_dir = self.cache_dir / model_name.replace("/", "_")
         
@@ -30,10 +32,12 @@ class ModelManager:
     
     def check_gpu_availability(self) -> bool:
         """Check if GPU is available"""
+        import torch
         return torch.cuda.is_available()
     
-    def get_device(self) -> torch.device:
+    def get_device(self) -> "torch.device":
         """Get optimal device for inference"""
+        import torch
         if torch.cuda.is_available():
             return torch.device("cuda")
         elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
@@ -0,0 +1,59 @@
+import numpy as np
+from PIL import Image
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: sign of horizontal gradients on a (hash_size+1) x hash_size grayscale thumbnail"""
+    pixels = np.asarray(
+        image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR),
+        dtype=np.int16
+    )
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return _bits_to_int(bits)
+
+
+def phash(image: Image.Image, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """DCT hash: low-frequency DCT coefficients of a 32x32 thumbnail compared with their median"""
+    size = hash_size * highfreq_factor
+    pixels = np.asarray(image.convert('L').resize((size, size), Image.LANCZOS), dtype=np.float64)
+
+    dct = _dct_matrix(size)
+    coefficients = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+    # Skip the DC term when taking the median so overall brightness does not bias the bits
+    median = np.median(coefficients.flatten()[1:])
+    return _bits_to_int((coefficients > median).flatten())
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+def compute_hash(image: Image.Image, algorithm: str = "dhash") -> int:
+    """Compute the configured perceptual hash for an image"""
+    if algorithm == "phash":
+        return phash(image)
+    if algorithm == "dhash":
+        return dhash(image)
+    raise ValueError(f"Unknown perceptual hash algorithm: {algorithm}")
+
+
+_dct_cache = {}
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, cached per size"""
+    if size not in _dct_cache:
+        k = np.arange(size)[:, None]
+        n = np.arange(size)[None, :]
+        matrix = np.sqrt(2.0 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+        matrix[0, :] /= np.sqrt(2.0)
+        _dct_cache[size] = matrix
+    return _dct_cache[size]
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
@@ -0,0 +1,195 @@
+import os
+import json
+import struct
+import logging
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"PHIDX1\n"
+
+
+class HammingIndex:
+    """Multi-index hashing over fixed-width perceptual hashes.
+
+    Each hash is split into ``num_chunks`` substrings, and every substring has its
+    own hash table. By the pigeonhole principle, two hashes within Hamming distance
+    ``r`` agree to within ``r // num_chunks`` bits on at least one substring. A
+    radius query therefore only probes a handful of buckets per table and then
+    verifies the candidates against the full hash, instead of scanning every entry.
+
+    Each payload is indexed once. Beyond ``max_entries`` (0: unbounded) the least
+    recently added entries are evicted, and ``discard`` drops an entry whose payload
+    is no longer useful (e.g. its verdict expired).
+    """
+
+    def __init__(self, bits: int = 64, num_chunks: int = 4, max_entries: int = 0):
+        if bits % num_chunks:
+            raise ValueError("bits must be divisible by num_chunks")
+        self.bits = bits
+        self.num_chunks = num_chunks
+        self.chunk_bits = bits // num_chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self.max_entries = max_entries
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._tables = [{} for _ in range(num_chunks)]  # chunk value -> list of entry ids
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # payload -> entry id, least recently added first
+        self._hashes: Dict[int, int] = {}
+        self._values: Dict[int, str] = {}
+        self._next_id = 0
+        self._probe_masks = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, hash_value: int, value: str) -> int:
+        """Insert a hash with its payload (e.g. a content hash, no newlines); returns the entry id.
+
+        A payload already indexed under the same hash is only marked recently added.
+        """
+        with self._lock:
+            entry_id = self._entries.get(value)
+            if entry_id is not None:
+                if self._hashes[entry_id] == hash_value:
+                    self._entries.move_to_end(value)
+                    return entry_id
+                self._remove(value)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[value] = entry_id
+            self._hashes[entry_id] = hash_value
+            self._values[entry_id] = value
+            for table, chunk in zip(self._tables, self._chunks(hash_value)):
+                bucket = table.get(chunk)
+                if bucket is None:
+                    table[chunk] = [entry_id]
+                else:
+                    bucket.append(entry_id)
+
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return entry_id
+
+    def discard(self, value: str) -> bool:
+        """Remove the entry with this payload; returns whether it was indexed"""
+        with self._lock:
+            if value not in self._entries:
+                return False
+            self._remove(value)
+            return True
+
+    def query(self, hash_value: int, radius: int) -> List[Tuple[int, str, int]]:
+        """Return (distance, value, hash) for every entry within ``radius`` bits, nearest first"""
+        sub_radius = radius // self.num_chunks
+        masks = self._masks(sub_radius)
+        seen = set()
+        matches = []
+
+        with self._lock:
+            for table, chunk in zip(self._tables, self._chunks(hash_value)):
+                for mask in masks:
+                    bucket = table.get(chunk ^ mask)
+                    if not bucket:
+                        continue
+                    for entry_id in bucket:
+                        if entry_id in seen:
+                            continue
+                        seen.add(entry_id)
+                        candidate = self._hashes[entry_id]
+                        distance = bin(candidate ^ hash_value).count('1')
+                        if distance <= radius:
+                            matches.append((distance, self._values[entry_id], candidate))
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def nearest(self, hash_value: int, radius: int) -> Optional[Tuple[int, str, int]]:
+        """Return the closest entry within ``radius`` bits, or None"""
+        matches = self.query(hash_value, radius)
+        return matches[0] if matches else None
+
+    def save(self, path: str) -> None:
+        """Snapshot the index to disk atomically"""
+        with self._lock:
+            header = json.dumps({
+                "bits": self.bits,
+                "num_chunks": self.num_chunks,
+                "count": len(self._entries),
+            }).encode()
+            # Oldest first, so a restored index evicts in the same order
+            hashes = array('Q', (self._hashes[entry_id] for entry_id in self._entries.values())).tobytes()
+            values = "\n".join(self._entries).encode()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A temp file of its own, so workers snapshotting the same path never clobber each other's
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory or None)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(struct.pack("<I", len(header)))
+                f.write(header)
+                f.write(hashes)
+                f.write(values)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, max_entries: int = 0) -> "HammingIndex":
+        """Rebuild an index from a snapshot written by ``save``"""
+        with open(path, "rb") as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"Not a perceptual hash index snapshot: {path}")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length))
+
+            index = cls(bits=header["bits"], num_chunks=header["num_chunks"], max_entries=max_entries)
+            hashes = array('Q')
+            hashes.frombytes(f.read(header["count"] * hashes.itemsize))
+            payload = f.read().decode()
+            values = payload.split("\n") if header["count"] else []
+
+        for hash_value, value in zip(hashes, values):
+            index.add(hash_value, value)
+        return index
+
+    def _remove(self, value: str) -> None:
+        entry_id = self._entries.pop(value)
+        hash_value = self._hashes.pop(entry_id)
+        del self._values[entry_id]
+        for table, chunk in zip(self._tables, self._chunks(hash_value)):
+            bucket = table[chunk]
+            bucket.remove(entry_id)
+            if not bucket:
+                del table[chunk]
+
+    def _chunks(self, hash_value: int) -> List[int]:
+        return [
+            (hash_value >> (i * self.chunk_bits)) & self._chunk_mask
+            for i in range(self.num_chunks)
+        ]
+
+    def _masks(self, sub_radius: int) -> List[int]:
+        """All chunk-sized bit masks with at most ``sub_radius`` bits set"""
+        if sub_radius not in self._probe_masks:
+            masks = []
+            for flips in range(min(sub_radius, self.chunk_bits) + 1):
+                for positions in combinations(range(self.chunk_bits), flips):
+                    mask = 0
+                    for position in positions:
+                        mask |= 1 << position
+                    masks.append(mask)
+            self._probe_masks[sub_radius] = masks
+        return self._probe_masks[sub_radius]
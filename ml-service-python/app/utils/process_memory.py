@@ -0,0 +1,48 @@
+import os
+import sys
+import resource
+from typing import Dict, Optional
+
+# smaps_rollup fields (kB) summed into each reported figure
+_FIELDS = {
+    "rss_mb": ("Rss",),
+    "pss_mb": ("Pss",),
+    "shared_mb": ("Shared_Clean", "Shared_Dirty"),
+    "unique_mb": ("Private_Clean", "Private_Dirty"),
+    "swap_mb": ("Swap",),
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """Resident memory of a process split into pages unique to it and pages shared with others.
+
+    unique_mb is what the process would free on exit; shared_mb is mapped by other
+    processes too (copy-on-write pages from a preloading parent, file-backed model
+    weights, shared libraries). pss_mb charges each shared page to its sharers in
+    proportion, so summing it over workers gives their real combined footprint.
+    Outside Linux only the peak RSS of the current process is available.
+    """
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    try:
+        with open(path) as f:
+            values = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        if pid not in (None, os.getpid()):
+            raise
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak_kb /= 1024  # reported in bytes there
+        return {"rss_mb": round(peak_kb / 1024, 1)}
+    return {name: round(sum(values.get(field, 0) for field in fields) / 1024, 1)
+            for name, fields in _FIELDS.items()}
+
+
+def format_memory(memory: Dict[str, float]) -> str:
+    if "unique_mb" not in memory:
+        return f"peak rss {memory['rss_mb']:.0f} MB"
+    return (f"rss {memory['rss_mb']:.0f} MB (unique {memory['unique_mb']:.0f} MB, "
+            f"shared {memory['shared_mb']:.0f} MB, pss {memory['pss_mb']:.0f} MB)")
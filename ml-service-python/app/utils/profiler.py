@@ -0,0 +1,236 @@
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of threads that are parked rather than working: an idle event loop,
+# an idle pool worker, a thread waiting on a condition or queue
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class SamplingProfiler:
+    """Statistical profiler: a daemon thread snapshots Python stacks every ``interval`` seconds.
+
+    Only registered threads are sampled, unless ``all_threads`` is set. Stacks are kept
+    as folded lines ("thread;outer;...;inner count"), the input format of flamegraph.pl,
+    speedscope and most flame graph viewers. Nothing runs in the profiled threads
+    themselves, so their only cost is the GIL the sampler takes for each snapshot.
+    """
+
+    def __init__(self, interval: float = 0.005, all_threads: bool = False, skip_idle: bool = False):
+        self.interval = interval
+        self.all_threads = all_threads
+        self.skip_idle = skip_idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, int] = {}  # thread id -> registrations
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, ident: Optional[int] = None) -> None:
+        ident = ident or threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def remove_thread(self, ident: Optional[int] = None) -> None:
+        ident = ident or threading.get_ident()
+        with self._lock:
+            remaining = self._threads.get(ident, 0) - 1
+            if remaining > 0:
+                self._threads[ident] = remaining
+            else:
+                self._threads.pop(ident, None)
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """Sample the calling thread for the duration of the block"""
+        self.add_thread()
+        try:
+            yield
+        finally:
+            self.remove_thread()
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Record one snapshot of the target threads' stacks"""
+        frames = sys._current_frames()
+        own = threading.get_ident()
+        with self._lock:
+            targets = [ident for ident in frames if ident != own] if self.all_threads else list(self._threads)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident in targets:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            if self.skip_idle and self._is_idle(frame):
+                continue
+            stacks.append(self._fold(names.get(ident, str(ident)), frame))
+        with self._lock:
+            self.samples += 1
+            self.counts.update(stacks)
+
+    def _is_idle(self, frame) -> bool:
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+    def _fold(self, thread_name: str, frame) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                # "function (package/module.py:line)"; ";" separates frames in the folded format
+                path = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+                label = self._labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(thread_name.replace(";", ","))
+        return ";".join(reversed(labels))
+
+    def merge(self, counts: Dict[str, int], prefix: Optional[str] = None) -> None:
+        """Add stacks sampled elsewhere (e.g. in a worker process), optionally under a root frame"""
+        with self._lock:
+            for stack, count in counts.items():
+                self.counts[f"{prefix};{stack}" if prefix else stack] += count
+
+    def folded(self) -> str:
+        with self._lock:
+            items = sorted(self.counts.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+
+# --- per-request profiles ------------------------------------------------------
+
+_active: ContextVar[Optional[SamplingProfiler]] = ContextVar("ml_profiler", default=None)
+
+
+def current_profiler() -> Optional[SamplingProfiler]:
+    return _active.get()
+
+
+@contextmanager
+def profile_scope(profiler: SamplingProfiler) -> Iterator[SamplingProfiler]:
+    """Make ``profiler`` the current request's profiler and sample the calling thread"""
+    token = _active.set(profiler)
+    try:
+        with profiler.thread():
+            yield profiler
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """Sample the calling thread while it works for a profiled request; a no-op otherwise"""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.thread():
+        yield
+
+
+def profiled_call(fn, *args, **kwargs):
+    """``fn(*args, **kwargs)`` under ``profile_thread()``, for work handed to other thread pools"""
+    with profile_thread():
+        return fn(*args, **kwargs)
+
+
+def save_profile(directory: str, profile_id: str, folded: str, max_files: int = 0) -> str:
+    """Write a folded profile as <directory>/<id>.folded, keeping at most ``max_files`` of them"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{profile_id}.folded")
+    with open(path, "w") as f:
+        f.write(folded)
+    if max_files > 0:
+        profiles = sorted(
+            (entry for entry in os.scandir(directory)
+             if entry.name.endswith(".folded") and PROFILE_ID.match(entry.name[:-len(".folded")])),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in profiles[:-max_files]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+    return path
+
+
+def load_profile(directory: str, profile_id: str) -> Optional[str]:
+    """Folded profile by id; None for unknown (or malformed) ids"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.folded")) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# --- always-on low-rate profile ------------------------------------------------
+
+class BackgroundProfiler(SamplingProfiler):
+    """Samples every busy thread at a low rate and rewrites the cumulative hot-path profile
+    to <directory>/hot-<pid>.folded every ``flush_seconds``"""
+
+    def __init__(self, hz: float, directory: str, flush_seconds: float = 300):
+        super().__init__(interval=1.0 / hz, all_threads=True, skip_idle=True)
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.path = os.path.join(directory, f"hot-{os.getpid()}.folded")
+        self._next_flush = time.monotonic() + flush_seconds
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if time.monotonic() >= self._next_flush:
+                self.flush()
+                self._next_flush = time.monotonic() + self.flush_seconds
+
+    def flush(self) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            partial = self.path + ".tmp"
+            with open(partial, "w") as f:
+                f.write(self.folded())
+            os.replace(partial, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write hot-path profile {self.path}: {e}")
+
+    def stop(self) -> "BackgroundProfiler":
+        super().stop()
+        self.flush()
+        return self
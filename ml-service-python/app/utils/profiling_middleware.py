@@ -0,0 +1,86 @@
+import uuid
+import asyncio
+import logging
+import ipaddress
+from typing import List, Optional, Sequence
+from urllib.parse import parse_qs
+
+from .profiler import SamplingProfiler, profile_scope, save_profile
+
+logger = logging.getLogger(__name__)
+
+TRUTHY = {"1", "true", "yes", "on"}
+
+
+def parse_allow_list(value: Optional[str]) -> List[ipaddress._BaseNetwork]:
+    """``"127.0.0.1,10.0.0.0/8"`` -> networks; invalid entries raise ValueError"""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in (value or "").split(",") if part.strip()]
+
+
+def client_allowed(scope, networks: Sequence[ipaddress._BaseNetwork]) -> bool:
+    client = scope.get("client")
+    if not networks or not client:
+        return False
+    try:
+        address = ipaddress.ip_address(client[0])
+    except ValueError:
+        return False  # e.g. the "testclient" host
+    return any(address in network for network in networks)
+
+
+class ProfilingMiddleware:
+    """Run individual requests under a sampling profiler on demand.
+
+    A request asks with an ``X-Profile: 1`` header or a ``profile=1`` query parameter;
+    the ask is honoured only for clients in the allow-list. The event-loop thread is
+    sampled for the whole request (concurrent requests on the loop show up in it too),
+    and inference threads and worker processes join while they work for the request.
+    The folded profile is written to ``directory`` and its id returned in the
+    ``X-Profile-Id`` response header. With an empty allow-list every request passes
+    straight through.
+    """
+
+    def __init__(self, app, networks: Sequence[ipaddress._BaseNetwork], directory: str,
+                 interval_ms: float = 5.0, max_files: int = 200):
+        self.app = app
+        self.networks = list(networks)
+        self.directory = directory
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.max_files = max_files
+
+    def requested(self, scope) -> bool:
+        for name, value in scope.get("headers") or ():
+            if name == b"x-profile":
+                return value.decode("latin-1").strip().lower() in TRUTHY
+        query = scope.get("query_string") or b""
+        if b"profile" not in query:
+            return False
+        values = parse_qs(query.decode("latin-1")).get("profile", [])
+        return bool(values) and values[-1].strip().lower() in TRUTHY
+
+    async def __call__(self, scope, receive, send):
+        if not self.networks or scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not client_allowed(scope, self.networks):
+            logger.info(f"🔒 Profiling refused for client {(scope.get('client') or ('?',))[0]}")
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers") or []) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval).start()
+        try:
+            with profile_scope(profiler):
+                await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            path = await asyncio.to_thread(save_profile, self.directory, profile_id, profiler.folded(),
+                                           self.max_files)
+            logger.info(f"🔬 Profiled {scope['method']} {scope['path']}: {profiler.samples} samples -> {path}")
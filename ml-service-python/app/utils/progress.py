@@ -0,0 +1,14 @@
+from typing import Callable, Optional
+
+# Called as progress(done, total) while an analysis runs; total is 0 when unknown.
+# A callback may raise AnalysisCancelled to abort the analysis at that point.
+ProgressCallback = Callable[[int, int], None]
+
+
+class AnalysisCancelled(Exception):
+    """Raised through a detector by its progress callback to stop the analysis"""
+
+
+def report_progress(progress: Optional[ProgressCallback], done: int, total: int) -> None:
+    if progress is not None:
+        progress(done, total)
@@ -0,0 +1,161 @@
+import os
+import asyncio
+import hmac
+import json
+import queue
+import hashlib
+import logging
+import secrets
+import logging.handlers
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_FILE = ".trace_key"
+
+
+def load_or_create_key(directory: str) -> bytes:
+    """HMAC key shared by every worker on this host: created once in ``directory``, never written to a trace"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, KEY_FILE)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path) as f:
+            return bytes.fromhex(f.read().strip())
+    key = secrets.token_bytes(32)
+    with os.fdopen(fd, "w") as f:
+        f.write(key.hex())
+    return key
+
+
+class TraceRecorder:
+    """Writes one JSON line per request to a size-rotated file, off the calling thread.
+
+    Each process writes its own ``requests-<pid>.jsonl`` in ``directory`` (so call
+    ``start()`` in the worker, after any fork). Content hashes are replaced by a
+    keyed HMAC: a trace shows which uploads repeat without revealing which known
+    file they were. Filenames and client addresses are never recorded.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, backup_count: int = 5):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path = None
+        self.hash_key = b""
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener = None
+        self._handler = None
+
+    def start(self) -> "TraceRecorder":
+        self.hash_key = load_or_create_key(self.directory)
+        self.path = os.path.join(self.directory, f"requests-{os.getpid()}.jsonl")
+        self._handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backup_count
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = logging.handlers.QueueListener(self._queue, self._handler)
+        self._listener.start()
+        return self
+
+    def anonymize(self, content_hash: Optional[str]) -> Optional[str]:
+        if not content_hash:
+            return None
+        return hmac.new(self.hash_key, content_hash.encode(), hashlib.sha256).hexdigest()[:24]
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._listener is None:
+            return
+        files = []
+        for entry in record.get("files", ()):
+            entry = dict(entry, hash=self.anonymize(entry.pop("content_hash", None)))
+            files.append({key: value for key, value in entry.items() if value is not None})
+        record["files"] = files
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        self._queue.put(logging.makeLogRecord({"msg": line, "levelno": logging.INFO, "levelname": "INFO"}))
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()  # drains the queue
+            self._handler.close()
+            self._listener = None
+
+
+# --- per-request annotations ------------------------------------------------------
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("ml_trace", default=None)
+
+
+def tracing() -> bool:
+    """Whether the current request is being traced (worth probing durations for)"""
+    return _current.get() is not None
+
+
+def start_trace() -> Any:
+    """Begin collecting file annotations for the current request; returns the reset token"""
+    return _current.set({"files": []})
+
+
+def finish_trace(token) -> Dict[str, Any]:
+    record = _current.get()
+    _current.reset(token)
+    return record
+
+
+def trace_file(media: str, size: int, content_hash: Optional[str] = None, content_type: Optional[str] = None,
+               **shape) -> Dict[str, Any]:
+    """Note one uploaded file of the current request (``shape``: width/height or duration_s).
+
+    Returns its trace entry, so facts learned later (e.g. dimensions after decoding)
+    can be added with ``.update()``; outside a traced request the entry is a
+    detached dict.
+    """
+    entry = {"media": media, "bytes": size, "content_hash": content_hash, "content_type": content_type, **shape}
+    record = _current.get()
+    if record is not None:
+        record["files"].append(entry)
+    return entry
+
+
+def probe_shape(path: str, media: str) -> Dict[str, Any]:
+    """Dimensions and/or duration of a saved upload, read from headers only; empty when they cannot be told"""
+    try:
+        if media == "image":
+            from PIL import Image
+            with Image.open(path) as image:
+                return {"width": image.width, "height": image.height}
+        if media == "video":
+            from .frame_sampler import probe_video
+            info = probe_video(path)
+            return {"width": info.width, "height": info.height, "duration_s": round(info.duration, 3)}
+        import soundfile
+        return {"duration_s": round(soundfile.info(path).duration, 3)}
+    except Exception:
+        return {}
+
+
+async def trace_saved_file(media: str, path: Optional[str], size: int, content_hash: Optional[str] = None,
+                           content_type: Optional[str] = None) -> Dict[str, Any]:
+    """``trace_file`` for an upload saved to disk; its shape is probed off the event loop, only when traced"""
+    entry = trace_file(media, size, content_hash, content_type)
+    if path and tracing():
+        entry.update(await asyncio.to_thread(probe_shape, path, media))
+    return entry
+
+
+def read_trace(paths: List[str]) -> List[Dict[str, Any]]:
+    """Records from trace files (rotated ones included), ordered by arrival"""
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f"⚠️ Skipping malformed trace line in {path}")
+    records.sort(key=lambda record: record.get("ts", 0))
+    return records
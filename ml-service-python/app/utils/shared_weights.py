@@ -0,0 +1,82 @@
+import json
+import mmap
+import struct
+import ctypes
+import logging
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    import torch
+
+logger = logging.getLogger(__name__)
+
+# safetensors dtype codes -> torch dtype names
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+def map_safetensors(path: str) -> Dict[str, "torch.Tensor"]:
+    """Tensors of a .safetensors file backed directly by a private memory map of it.
+
+    Nothing is copied: pages are read from the page cache on first touch and stay
+    shared with every other process mapping the same file until one writes to them
+    (copy-on-write), which inference never does.
+    """
+    import torch
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__" or info["dtype"] not in _DTYPES:
+            continue
+        dtype = getattr(torch, _DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        item_size = torch.empty(0, dtype=dtype).element_size()
+        if (data_start + start) % item_size:
+            continue  # misaligned for its dtype; left to the regular loader
+        count = (end - start) // item_size
+        # frombuffer holds a reference to the map, so it lives as long as any tensor does
+        tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + start) if count \
+            else torch.empty(0, dtype=dtype)
+        tensors[name] = tensor.reshape(info["shape"])
+    return tensors
+
+
+def share_weights_from_file(model, path: str) -> Tuple[int, int]:
+    """Point a loaded CPU model's parameters and buffers at a memory map of its safetensors file.
+
+    The anonymous copies made by ``from_pretrained`` are released, so each process
+    keeps only its activations privately. Tensors whose name, shape or dtype do not
+    match the file are left as they are. Returns (tensors mapped, bytes mapped).
+    """
+    mapped = map_safetensors(path)
+    prefix = getattr(model, "base_model_prefix", "")
+    count, size = 0, 0
+    for name, tensor in model.state_dict(keep_vars=True).items():
+        # Checkpoints saved from the base model lack (or have an extra) prefix
+        candidates = [name]
+        if prefix:
+            candidates.append(name[len(prefix) + 1:] if name.startswith(prefix + ".") else f"{prefix}.{name}")
+        source = next((mapped[key] for key in candidates if key in mapped), None)
+        if source is None or source.shape != tensor.shape or source.dtype != tensor.dtype \
+                or tensor.device.type != "cpu" or source.data_ptr() == tensor.data_ptr():
+            continue
+        tensor.data = source
+        count += 1
+        size += source.numel() * source.element_size()
+    _release_free_heap()
+    return count, size
+
+
+def _release_free_heap() -> None:
+    """Hand the freed weight copies back to the OS instead of keeping them in malloc's arenas"""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
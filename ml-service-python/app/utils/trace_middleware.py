@@ -0,0 +1,62 @@
+import time
+from contextlib import nullcontext
+
+from .metrics import current_timings, timing_scope
+from .request_trace import TraceRecorder, finish_trace, start_trace
+
+
+class TraceMiddleware:
+    """Record a trace line for every upload to a traced path.
+
+    The line holds the arrival time, endpoint and query options, status, latency,
+    the stage timings and whatever handlers noted with ``trace_file`` (media type,
+    bytes, dimensions or duration, content hash). Requests refused before a handler
+    ran (e.g. 413) keep their declared Content-Length instead. Place it inside
+    MetricsMiddleware so the stage timings are the ones being recorded; without it
+    a private timing scope is opened.
+    """
+
+    def __init__(self, app, recorder: TraceRecorder, path_prefixes: tuple = ("/api/detect", "/api/jobs")):
+        self.app = app
+        self.recorder = recorder
+        self.path_prefixes = path_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        arrival = time.time()
+        started = time.perf_counter()
+        status = 500
+
+        async def status_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timings = current_timings()
+        if timings is not None:
+            scope_timings = nullcontext(timings)
+        else:
+            scope_timings = timing_scope(None, scope["path"], observe=False)
+        with scope_timings as timings:
+            token = start_trace()
+            try:
+                await self.app(scope, receive, status_send)
+            finally:
+                record = finish_trace(token)
+                declared = next((int(value) for name, value in scope.get("headers") or ()
+                                 if name == b"content-length" and value.isdigit()), None)
+                if record["files"] or declared:
+                    self.recorder.write({
+                        "ts": round(arrival, 3),
+                        "endpoint": scope["path"],
+                        "query": scope.get("query_string", b"").decode("latin-1") or None,
+                        "status": status,
+                        "latency_s": round(time.perf_counter() - started, 4),
+                        "request_bytes": declared,
+                        "files": record["files"],
+                        "timings": {name: round(seconds, 4) for name, seconds in timings.as_dict().items()},
+                    })
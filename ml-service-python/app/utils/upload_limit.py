@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+from fastapi import HTTPException
+
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class RequestSizeLimitMiddleware:
+    """Reject oversized request bodies with 413 before they are read to the end.
+
+    Starlette parses (and spools to disk) a whole multipart body before a handler
+    runs, so limits checked in the handler only fire after the full upload arrived.
+    This ASGI middleware rejects a declared Content-Length over the limit without
+    reading the body, and otherwise counts body bytes as the form parser pulls them,
+    aborting with 413 the moment the limit is crossed. Limits are per path prefix
+    (longest match wins) with ``default_limit`` for everything else.
+    """
+
+    def __init__(self, app, default_limit: int, path_limits: Optional[Dict[str, int]] = None,
+                 overhead: int = MULTIPART_OVERHEAD):
+        self.app = app
+        self.default_limit = default_limit
+        self.path_limits = sorted((path_limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.overhead = overhead
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.path_limits:
+            if path.startswith(prefix):
+                return limit + self.overhead
+        return self.default_limit + self.overhead
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Surfaces through FastAPI's body parsing as a 413 response
+                    raise HTTPException(status_code=413, detail=self._detail(limit))
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(send, limit)
+
+    def _detail(self, limit: int) -> str:
+        return f"Request body too large (max {(limit - self.overhead) // (1024 * 1024)}MB)"
+
+    async def _reject(self, send, limit: int) -> None:
+        body = ('{"detail":"%s"}' % self._detail(limit)).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
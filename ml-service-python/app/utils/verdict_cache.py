@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class VerdictCache:
+    """Content-addressed verdict cache with an in-memory LRU tier and an optional SQLite tier.
+
+    Entries are keyed by media type, model version and content hash, so a model
+    upgrade never serves stale verdicts. The memory tier is bounded by the JSON size
+    of the stored verdicts, the disk tier by ``disk_max_entries`` (oldest writes go
+    first); both tiers expire entries after ``ttl_seconds``. ``get_async`` and
+    ``put_async`` serve the memory tier inline and do disk I/O on a worker thread.
+
+    The SQLite connection is opened on first use in each process (or by
+    ``open_disk``), so workers forked after the cache is built never share one.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 24 * 3600,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 100_000,
+                 disk_purge_every: int = 1000):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.disk_purge_every = disk_purge_every
+
+        self._lock = threading.Lock()  # memory tier and counters
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, payload)
+        self._memory_bytes = 0
+        self._db_lock = threading.Lock()  # the SQLite connection; taken before _lock, never inside it
+        self._db = None
+        self._db_pid = None  # process that opened _db
+        self._disk_failed = False
+        self._puts_since_purge = 0
+
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "puts": 0,
+            "lru_evictions": 0,
+            "ttl_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    @staticmethod
+    def make_key(media_type: str, model_version: str, content_hash: str) -> str:
+        """Build the cache key for one piece of content analyzed by one model version"""
+        return f"{media_type}:{model_version}:{content_hash}"
+
+    @property
+    def disk_enabled(self) -> bool:
+        return bool(self.disk_path) and not self._disk_failed
+
+    def open_disk(self) -> bool:
+        """Open this process's disk-tier connection now rather than on first use (blocking)"""
+        if not self.disk_enabled:
+            return False
+        with self._db_lock:
+            return self._connection() is not None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached verdict, or None on a miss"""
+        result = self.get_memory(key)
+        if result is None:
+            result = self.get_disk(key)
+        return result
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """``get`` with the disk lookup, if any, on a worker thread"""
+        result = self.get_memory(key)
+        if result is None:
+            result = await asyncio.to_thread(self.get_disk, key) if self.disk_enabled else self.get_disk(key)
+        return result
+
+    def get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        """Memory-tier lookup; a miss is counted by the ``get_disk`` that follows it"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return json.loads(payload)
+            self._drop(key)
+            self._counters["ttl_evictions"] += 1
+            return None
+
+    def get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Disk-tier lookup (blocking); hits are promoted to the memory tier"""
+        row = None
+        expired = False
+        if self.disk_enabled:
+            now = time.time()
+            with self._db_lock:
+                try:
+                    db = self._connection()
+                    if db is not None:
+                        row = db.execute(
+                            "SELECT payload, expires_at FROM verdicts WHERE key = ?", (key,)
+                        ).fetchone()
+                        if row is not None and row[1] <= now:
+                            db.execute("DELETE FROM verdicts WHERE key = ?", (key,))
+                            db.commit()
+                            row, expired = None, True
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Verdict cache disk read failed: {e}")
+                    row = None
+
+        with self._lock:
+            if expired:
+                self._counters["ttl_evictions"] += 1
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            payload, expires_at = row
+            self._counters["disk_hits"] += 1
+            self._store(key, payload, expires_at)
+        return json.loads(payload)
+
+    def put(self, key: str, verdict: Dict[str, Any]) -> None:
+        """Store a verdict in every enabled tier"""
+        payload, expires_at = self.put_memory(key, verdict)
+        self.put_disk(key, payload, expires_at)
+
+    async def put_async(self, key: str, verdict: Dict[str, Any]) -> None:
+        """``put`` with the disk write, if any, on a worker thread"""
+        payload, expires_at = self.put_memory(key, verdict)
+        if self.disk_enabled:
+            await asyncio.to_thread(self.put_disk, key, payload, expires_at)
+
+    def put_memory(self, key: str, verdict: Dict[str, Any]) -> Tuple[str, float]:
+        """Store a verdict in the memory tier; returns the (payload, expires_at) for ``put_disk``"""
+        payload = json.dumps(verdict, default=str)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._counters["puts"] += 1
+            self._store(key, payload, expires_at)
+        return payload, expires_at
+
+    def put_disk(self, key: str, payload: str, expires_at: float) -> None:
+        """Write one entry to the disk tier (blocking), purging it every ``disk_purge_every`` writes"""
+        if not self.disk_enabled:
+            return
+        with self._db_lock:
+            try:
+                db = self._connection()
+                if db is None:
+                    return
+                db.execute(
+                    "INSERT OR REPLACE INTO verdicts (key, payload, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, expires_at)
+                )
+                db.commit()
+                self._puts_since_purge += 1
+                if self._puts_since_purge >= self.disk_purge_every:
+                    self._puts_since_purge = 0
+                    self._purge_disk()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Verdict cache disk write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit, miss and eviction counters plus tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": self.disk_enabled,
+            })
+        if self.disk_enabled:
+            with self._db_lock:
+                db = self._connection()
+                if db is not None:
+                    stats["disk_entries"] = db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            stats["disk_max_entries"] = self.disk_max_entries
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _store(self, key: str, payload: str, expires_at: float) -> None:
+        """Insert into the memory tier and evict least-recently-used entries over the byte budget"""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        if key in self._memory:
+            self._drop(key)
+        self._memory[key] = (expires_at, payload)
+        self._memory_bytes += size
+
+        while self._memory_bytes > self.max_bytes:
+            oldest_key = next(iter(self._memory))
+            self._drop(oldest_key)
+            self._counters["lru_evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        _, payload = self._memory.pop(key)
+        self._memory_bytes -= len(payload)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """This process's disk-tier connection, opened on first use; caller holds _db_lock"""
+        if self._db_pid != os.getpid():
+            # A connection inherited across fork belongs to the parent: never use (or close) it
+            self._db = None
+            self._db_pid = os.getpid()
+            self._open_disk_tier(self.disk_path)
+        return self._db
+
+    def _open_disk_tier(self, disk_path: str) -> None:
+        try:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # A lost tail of writes after a power cut only costs re-analysis
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_expires_at ON verdicts (expires_at)")
+            purged = self._purge_disk()
+            logger.info(f"💾 Verdict cache disk tier: {disk_path} (purged {purged} entries)")
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Verdict cache disk tier disabled ({disk_path}): {e}")
+            self._db = None
+            self._disk_failed = True
+
+    def _purge_disk(self) -> int:
+        """Delete expired entries, then the oldest beyond ``disk_max_entries``; caller holds _db_lock"""
+        purged = self._db.execute("DELETE FROM verdicts WHERE expires_at <= ?", (time.time(),)).rowcount
+        excess = self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] - self.disk_max_entries
+        if excess > 0:
+            evicted = self._db.execute(
+                "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY expires_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+            purged += evicted
+            with self._lock:
+                self._counters["disk_evictions"] += evicted
+        self._db.commit()
+        return purged
@@ -0,0 +1 @@
+# Offline benchmarks for the ML service (run from ml-service-python with python -m benchmarks.<name>)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Compare the shared-STFT audio feature extractor with the per-feature librosa path.
+
+    python -m benchmarks.bench_audio_features --clips 32 --seconds 4
+
+Checks feature parity first and exits non-zero if any feature drifts past --rtol.
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+import librosa
+
+from app.utils.audio_features import AudioFeatureExtractor
+
+
+def per_feature_path(audio: np.ndarray, sample_rate: int) -> dict:
+    """The original AudioDeepfakeDetector._extract_features: one librosa call per feature"""
+    spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sample_rate)[0]
+    spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sample_rate)[0]
+    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=sample_rate)[0]
+    zcr = librosa.feature.zero_crossing_rate(audio)[0]
+    mfccs = librosa.feature.mfcc(y=audio, sr=sample_rate, n_mfcc=13)
+    chroma = librosa.feature.chroma_stft(y=audio, sr=sample_rate)
+    return {
+        "spectral_centroid_mean": np.mean(spectral_centroids),
+        "spectral_centroid_std": np.std(spectral_centroids),
+        "spectral_rolloff_mean": np.mean(spectral_rolloff),
+        "spectral_bandwidth_mean": np.mean(spectral_bandwidth),
+        "zcr_mean": np.mean(zcr),
+        "mfccs_mean": np.mean(mfccs),
+        "mfccs_std": np.std(mfccs),
+        "chroma_mean": np.mean(chroma)
+    }
+
+
+def synthetic_clips(count: int, samples: int, sample_rate: int, seed: int) -> np.ndarray:
+    """Harmonic tones with vibrato plus noise, a different pitch and noise level per clip"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples) / sample_rate
+    clips = np.empty((count, samples), dtype=np.float32)
+    for i in range(count):
+        pitch = rng.uniform(80, 900)
+        phase = 2 * np.pi * pitch * t + 3.0 * np.sin(2 * np.pi * rng.uniform(2, 7) * t)
+        tone = sum(np.sin(k * phase) / k for k in range(1, 6))
+        clips[i] = 0.3 * tone + rng.uniform(0.0, 0.2) * rng.standard_normal(samples)
+    clips[0, : samples // 4] = 0.0  # silent stretch exercises the zero-energy frames
+    return clips
+
+
+def check_parity(extractor: AudioFeatureExtractor, clips: np.ndarray, rtol: float) -> bool:
+    batch = extractor.extract_batch(clips)
+    worst = {}
+    for i, clip in enumerate(clips):
+        reference = per_feature_path(clip, extractor.sample_rate)
+        for name, expected in reference.items():
+            error = abs(float(batch[name][i]) - float(expected)) / max(abs(float(expected)), 1e-6)
+            worst[name] = max(worst.get(name, 0.0), error)
+
+    print(f"{'feature':<24} {'max_rel_error':>14}")
+    for name, error in worst.items():
+        print(f"{name:<24} {error:>14.2e}{'  FAIL' if error > rtol else ''}")
+    return all(error <= rtol for error in worst.values())
+
+
+def best_of(repeats: int, fn) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--batch-size", type=int, default=8, help="clips per extract_batch call")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--rtol", type=float, default=1e-4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    extractor = AudioFeatureExtractor(sample_rate=args.sample_rate)
+    clips = synthetic_clips(args.clips, int(args.seconds * args.sample_rate), args.sample_rate, args.seed)
+
+    if not check_parity(extractor, clips, args.rtol):
+        print("parity check failed")
+        return 1
+
+    per_feature = best_of(args.repeats, lambda: [per_feature_path(c, args.sample_rate) for c in clips])
+    shared = best_of(args.repeats, lambda: [extractor.extract(c) for c in clips])
+    batched = best_of(args.repeats, lambda: [extractor.extract_batch(clips[i:i + args.batch_size])
+                                             for i in range(0, len(clips), args.batch_size)])
+
+    print(f"\n{args.clips} clips x {args.seconds:g}s at {args.sample_rate} Hz")
+    print(f"{'path':<24} {'total_ms':>10} {'ms/clip':>10} {'speedup':>8}")
+    for label, elapsed in (("per-feature librosa", per_feature), ("shared STFT, per clip", shared),
+                           (f"shared STFT, batch={args.batch_size}", batched)):
+        print(f"{label:<24} {elapsed * 1000:>10.1f} {elapsed * 1000 / args.clips:>10.2f} "
+              f"{per_feature / elapsed:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Measure /health latency while the service (app.main:app) is saturated with video requests.
+
+    python -m benchmarks.bench_event_loop --video sample.mp4 --concurrency 8 --seconds 20
+    python -m benchmarks.bench_event_loop --video sample.mp4 --inline     # pre-executor behaviour
+
+The service runs in a uvicorn subprocess (so the load generator does not share its
+GIL); INFERENCE_* environment variables configure its executor as usual. Its verdict
+cache is switched off, so every upload of the clip is analyzed.
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import numpy as np
+import httpx
+
+
+def build_app(inline: bool):
+    import app.main as service_main
+    from app.services.detection_service import DetectionService
+    from app.services.inference_executor import InferenceExecutor
+
+    class InlineExecutor(InferenceExecutor):
+        """Runs every task on the event loop thread, as the handlers did before the executor"""
+
+        async def run(self, task, *args, **kwargs):
+            return self.tasks[task](*args, **kwargs)
+
+    service = DetectionService(registry=service_main.model_registry)
+    if inline:
+        service.executor.shutdown()
+        service.executor = InlineExecutor(service.executor.tasks, thread_workers=1)
+    service_main.detection_service = service  # shut down with the app
+    service_main.verdict_cache = None
+    service_main.phash_index = None
+    return service_main.app
+
+
+def serve(port: int, inline: bool) -> None:
+    import uvicorn
+    uvicorn.run(build_app(inline), host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base_url: str, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError("service did not start")
+
+
+def load_worker(base_url: str, video: bytes, stop: threading.Event, completed: list) -> None:
+    with httpx.Client(timeout=300.0) as client:
+        while not stop.is_set():
+            response = client.post(f"{base_url}/api/detect/video",
+                                   files={"file": ("clip.mp4", video, "video/mp4")})
+            completed.append(response.status_code)
+
+
+def probe_health(base_url: str, stop: threading.Event, interval: float, latencies: list) -> None:
+    with httpx.Client(timeout=30.0) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get(f"{base_url}/health")
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent video requests")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    parser.add_argument("--inline", action="store_true", help="run inference on the event loop")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.inline)
+        return 0
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "-m", "benchmarks.bench_event_loop", "--video", args.video, "--serve", str(port)]
+    server = subprocess.Popen(cmd + (["--inline"] if args.inline else []), env=os.environ.copy())
+    try:
+        wait_ready(base_url)
+        with open(args.video, "rb") as f:
+            video = f.read()
+
+        stop = threading.Event()
+        completed, latencies = [], []
+        threads = [threading.Thread(target=load_worker, args=(base_url, video, stop, completed))
+                   for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        time.sleep(2.0)  # let the load ramp up before probing
+
+        prober = threading.Thread(target=probe_health, args=(base_url, stop, args.probe_interval, latencies))
+        prober.start()
+        time.sleep(args.seconds)
+        stop.set()
+        prober.join()
+        for thread in threads:
+            thread.join()
+
+        lat = np.array(latencies)
+        print(f"mode: {'inline' if args.inline else 'executor'}  concurrency: {args.concurrency}  "
+              f"videos completed: {len(completed)}")
+        print(f"/health over {len(lat)} probes: p50 {np.percentile(lat, 50):.1f} ms  "
+              f"p99 {np.percentile(lat, 99):.1f} ms  max {lat.max():.1f} ms")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
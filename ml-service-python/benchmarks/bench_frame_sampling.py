@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Compare frame sampling strategies on generated videos of different lengths and GOP sizes.
+
+    python -m benchmarks.bench_frame_sampling --durations 10 60 300 --gops 12 60 250
+
+Needs an ffmpeg binary with libx264 on PATH (or --ffmpeg).
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+from app.utils.frame_sampler import FRAME_SAMPLERS, get_frame_sampler
+
+
+def generate_video(ffmpeg: str, path: str, duration: float, gop: int, size: str, fps: int) -> None:
+    """Encode a synthetic H.264 clip with a fixed keyframe interval"""
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        path,
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def run_strategy(name: str, path: str, max_frames: int, seek_gap: int):
+    kwargs = {"seek_gap": seek_gap} if name == "sequential" else {}
+    if name == "keyframe":
+        kwargs["ffmpeg_binary"] = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+    sampler = get_frame_sampler(name, **kwargs)
+
+    # Frames are consumed one at a time, as the detector does
+    start = time.perf_counter()
+    frames = sum(1 for _ in sampler.sample(path, max_frames))
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durations", type=float, nargs="+", default=[10, 60, 300])
+    parser.add_argument("--gops", type=int, nargs="+", default=[12, 60, 250])
+    parser.add_argument("--size", default="640x360")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--max-frames", type=int, default=30)
+    parser.add_argument("--seek-gap", type=int, default=250,
+                        help="seek_gap used for the 'sequential+seek' row")
+    parser.add_argument("--strategies", nargs="+", default=list(FRAME_SAMPLERS))
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    args = parser.parse_args()
+    os.environ["FFMPEG_BINARY"] = args.ffmpeg
+
+    rows = []
+    for name in args.strategies:
+        rows.append((name, name, 0))
+        if name == "sequential" and args.seek_gap:
+            rows.append((f"sequential+seek{args.seek_gap}", name, args.seek_gap))
+
+    print(f"{'duration':>8} {'gop':>5} {'strategy':<22} {'frames':>6} {'time_s':>8}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for duration in args.durations:
+            for gop in args.gops:
+                path = os.path.join(temp_dir, f"clip_{duration:g}s_g{gop}.mp4")
+                generate_video(args.ffmpeg, path, duration, gop, args.size, args.fps)
+                for label, name, seek_gap in rows:
+                    frames, elapsed = run_strategy(name, path, args.max_frames, seek_gap)
+                    print(f"{duration:>8g} {gop:>5} {label:<22} {frames:>6} {elapsed:>8.3f}")
+                os.unlink(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
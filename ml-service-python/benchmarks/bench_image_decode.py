@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Compare per-request allocations of the bytes -> BytesIO -> processor image path with the spool decode path.
+
+    python -m benchmarks.bench_image_decode --width 4032 --height 3024 --requests 20
+
+Each request starts from an upload spooled the way Starlette spools it. The old path
+reads it into bytes, decodes a full-size RGB copy and runs the model's image processor;
+the new path opens the spool lazily and decodes, resizes and normalizes into a reused
+float32 buffer. Python/numpy allocations are traced with tracemalloc; Pillow's own C
+allocations are counted with Image.core.get_stats(). Pass --model to use a checkpoint's
+processor instead of the default 224x224 SigLIP one.
+"""
+
+import io
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import torch
+from PIL import Image
+
+from app.utils.image_decode import PixelBufferPool, PixelSpec, open_image
+
+
+def load_processor(model_path):
+    if model_path:
+        from transformers import AutoImageProcessor
+        return AutoImageProcessor.from_pretrained(model_path, local_files_only=True)
+    from transformers import SiglipImageProcessor
+    return SiglipImageProcessor()
+
+
+def synthetic_upload(width: int, height: int, image_format: str, seed: int) -> tempfile.SpooledTemporaryFile:
+    """A smooth gradient with noise, encoded and spooled like a multipart file part"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    pixels = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape)
+    encoded = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(encoded, format=image_format, quality=90)
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(encoded.getvalue())
+    spool.seek(0)
+    return spool
+
+
+def old_path(spool, processor) -> torch.Tensor:
+    spool.seek(0)
+    contents = spool.read()
+    image = Image.open(io.BytesIO(contents))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return processor(images=[image], return_tensors="pt")["pixel_values"]
+
+
+def new_path(spool, pool: PixelBufferPool, draft: bool) -> torch.Tensor:
+    return torch.from_numpy(pool.fill([open_image(spool)], draft=draft))
+
+
+def measure(fn, requests: int) -> dict:
+    fn()  # warm up caches and the reusable buffer
+    tracemalloc.start()
+    pil_before = Image.core.get_stats()
+    traced_total = 0
+    peak = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        current, request_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, request_peak - baseline)
+        traced_total += request_peak - baseline
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    pil_after = Image.core.get_stats()
+    return {
+        "ms": elapsed * 1000 / requests,
+        "peak_mb": peak / 1e6,
+        "mean_peak_mb": traced_total / requests / 1e6,
+        "pil_images": (pil_after["new_count"] - pil_before["new_count"]) / requests,
+        "pil_blocks": (pil_after["allocated_blocks"] - pil_before["allocated_blocks"]) / requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--format", default="JPEG", help="JPEG, PNG or WEBP")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--model", default=None, help="checkpoint directory whose image processor to use")
+    parser.add_argument("--atol", type=float, default=1e-4, help="max pixel difference allowed without draft decoding")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    processor = load_processor(args.model)
+    spec = PixelSpec.from_processor(processor)
+    if spec is None:
+        print("processor settings are not supported by the fast path")
+        return 1
+    pool = PixelBufferPool(spec, capacity=1)
+    spool = synthetic_upload(args.width, args.height, args.format, args.seed)
+
+    reference = old_path(spool, processor)
+    exact = new_path(spool, pool, draft=False).clone()
+    drafted = new_path(spool, pool, draft=True).clone()
+    exact_error = float((reference - exact).abs().max())
+    draft_error = float((reference - drafted).abs().max())
+    print(f"{args.width}x{args.height} {args.format} -> {spec.width}x{spec.height} float32")
+    print(f"max |pixel diff| vs processor: {exact_error:.2e} (draft off), {draft_error:.2e} (draft on)")
+    if exact_error > args.atol:
+        print("parity check failed")
+        return 1
+
+    rows = (
+        ("bytes + processor", lambda: old_path(spool, processor)),
+        ("spool -> buffer", lambda: new_path(spool, pool, draft=False)),
+        ("spool -> buffer, draft", lambda: new_path(spool, pool, draft=True)),
+    )
+    print(f"\n{args.requests} requests, per request")
+    print(f"{'path':<24} {'ms':>8} {'py_peak_MB':>11} {'py_mean_MB':>11} {'pil_images':>11} {'pil_blocks':>11}")
+    for label, fn in rows:
+        stats = measure(fn, args.requests)
+        print(f"{label:<24} {stats['ms']:>8.1f} {stats['peak_mb']:>11.2f} {stats['mean_peak_mb']:>11.2f} "
+              f"{stats['pil_images']:>11.1f} {stats['pil_blocks']:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Measure cold import time of the service and per-modality load time, each in a fresh interpreter.
+
+    python -m benchmarks.bench_import_time --repeats 3 --max-import-seconds 2
+
+Fails (exit 1) if importing app.main pulls in any heavy library (torch, transformers,
+librosa, cv2, huggingface_hub) or takes longer than --max-import-seconds, so it can
+run as a start-up regression check in CI.
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+
+HEAVY_MODULES = ("torch", "transformers", "librosa", "cv2", "huggingface_hub", "scipy")
+
+# Each probe runs in its own interpreter so nothing is already imported
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+TARGETS = (
+    ("import app.main", "import app.main"),
+    ("import detection_service", "import app.services.detection_service"),
+    ("load audio", "from app.services.model_registry import ModelRegistry; ModelRegistry().get('audio')"),
+    ("load image", "from app.services.model_registry import ModelRegistry; ModelRegistry().get('image')"),
+    ("load video", "from app.services.model_registry import ModelRegistry; ModelRegistry().get('video')"),
+)
+
+
+def probe(statement: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3, help="fresh interpreters per target; best is reported")
+    parser.add_argument("--max-import-seconds", type=float, default=2.0)
+    parser.add_argument("--skip-loads", action="store_true", help="only time the imports")
+    args = parser.parse_args()
+
+    targets = TARGETS[:2] if args.skip_loads else TARGETS
+    print(f"{'target':<26} {'best_s':>8} {'worst_s':>8}  heavy modules imported")
+    results = {}
+    for label, statement in targets:
+        runs = [probe(statement) for _ in range(args.repeats)]
+        seconds = [run["seconds"] for run in runs]
+        results[label] = {"best": min(seconds), "heavy": runs[0]["heavy"]}
+        print(f"{label:<26} {min(seconds):>8.2f} {max(seconds):>8.2f}  {', '.join(runs[0]['heavy']) or '-'}")
+
+    main_import = results["import app.main"]
+    failures = []
+    if main_import["heavy"]:
+        failures.append(f"app.main imports {', '.join(main_import['heavy'])}")
+    if main_import["best"] > args.max_import_seconds:
+        failures.append(f"app.main import took {main_import['best']:.2f}s (max {args.max_import_seconds:g}s)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
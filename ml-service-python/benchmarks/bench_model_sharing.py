@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Compare memory and cold start of N image-model workers with private, memory-mapped and preloaded weights.
+
+    python -m benchmarks.bench_model_sharing --workers 4 --model /app/models/prithivMLmods/deepfake-detector-model-v1
+
+independent: each worker is a fresh interpreter calling from_pretrained (uvicorn --workers)
+mmap:        the same, with weights mapped from model.safetensors (MODEL_WEIGHTS_MMAP=true)
+preload:     the parent loads once and forks the workers (python -m app.serve)
+
+Each worker runs one forward pass before it reports ready, then its unique, shared and
+proportional (PSS) memory is read from /proc. Summed PSS is what the workers really
+cost together. Exits non-zero if preload needs more than --max-slowdown longer than
+independent workers to have every worker ready.
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+from app.utils.cpu_topology import apply_thread_limits
+from app.utils.process_memory import process_memory
+
+DEFAULT_MODEL_PATH = "/app/models/prithivMLmods/deepfake-detector-model-v1"
+MODES = ("independent", "mmap", "preload")
+
+_preloaded = None  # the parent's model, inherited by forked workers
+
+
+def load_model(path: str, mapped: bool):
+    from transformers import SiglipForImageClassification
+    from app.utils.shared_weights import share_weights_from_file
+    model = SiglipForImageClassification.from_pretrained(path, local_files_only=True).eval()
+    if mapped:
+        share_weights_from_file(model, os.path.join(path, "model.safetensors"))
+    return model
+
+
+def forward(model) -> None:
+    import torch
+    size = model.config.vision_config.image_size
+    with torch.no_grad():
+        model(pixel_values=torch.randn(1, 3, size, size))
+
+
+def spawned_worker(path: str, mapped: bool, ready, release) -> None:
+    apply_thread_limits(1)
+    forward(load_model(path, mapped))
+    ready.put(time.time())
+    release.wait()
+
+
+def forked_worker(ready, release) -> None:
+    forward(_preloaded)
+    ready.put(time.time())
+    release.wait()
+
+
+def run_mode(mode: str, workers: int, path: str) -> dict:
+    global _preloaded
+    launched = time.time()
+    if mode == "preload":
+        context = multiprocessing.get_context("fork")
+        apply_thread_limits(1)
+        _preloaded = load_model(path, mapped=False)
+        target, args = forked_worker, ()
+    else:
+        context = multiprocessing.get_context("spawn")
+        target, args = spawned_worker, (path, mode == "mmap")
+
+    ready, release = context.Queue(), context.Event()
+    processes = [context.Process(target=target, args=args + (ready, release)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    all_ready = max(ready.get() for _ in processes) - launched
+
+    memory = [process_memory(process.pid) for process in processes]
+    # The preloading parent stays resident (it forks replacements), so it is part of the cost
+    parent_pss = process_memory()["pss_mb"] if mode == "preload" else 0.0
+    release.set()
+    for process in processes:
+        process.join()
+    _preloaded = None
+
+    def mean(key):
+        return sum(m[key] for m in memory) / len(memory)
+
+    return {
+        "all_ready_s": all_ready,
+        "rss_mb": mean("rss_mb"),
+        "unique_mb": mean("unique_mb"),
+        "shared_mb": mean("shared_mb"),
+        "total_pss_mb": parent_pss + sum(m["pss_mb"] for m in memory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="local SigLIP classifier directory")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of " + ", ".join(MODES))
+    parser.add_argument("--max-slowdown", type=float, default=0.2,
+                        help="allowed fraction by which preload may be slower to all-ready than independent")
+    args = parser.parse_args()
+
+    modes = [mode for mode in MODES if mode in args.modes.split(",")]  # preload last: it loads torch here
+    print(f"{args.workers} workers, model {args.model}")
+    print(f"{'mode':<12} {'ready_s':>8} {'rss_MB':>8} {'unique_MB':>10} {'shared_MB':>10} {'total_pss_MB':>13} {'vs_indep':>9}")
+
+    results = {}
+    for mode in modes:
+        row = results[mode] = run_mode(mode, args.workers, args.model)
+        baseline = results.get("independent", row)["total_pss_mb"]
+        print(f"{mode:<12} {row['all_ready_s']:>8.2f} {row['rss_mb']:>8.0f} {row['unique_mb']:>10.0f} "
+              f"{row['shared_mb']:>10.0f} {row['total_pss_mb']:>13.0f} {row['total_pss_mb'] / baseline:>8.2f}x")
+
+    if "independent" in results and "preload" in results:
+        limit = results["independent"]["all_ready_s"] * (1 + args.max_slowdown)
+        if results["preload"]["all_ready_s"] > limit:
+            print(f"FAIL: preload took {results['preload']['all_ready_s']:.2f}s to all-ready "
+                  f"(limit {limit:.2f}s)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
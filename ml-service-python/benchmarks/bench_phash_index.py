@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Insert and query latency of the perceptual hash index.
+
+    python -m benchmarks.bench_phash_index --entries 1000000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from app.utils.phash_index import HammingIndex
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def flip_bits(value: int, count: int, bits: int = 64) -> int:
+    for position in random.sample(range(bits), count):
+        value ^= 1 << position
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--radius", type=int, nargs="+", default=[0, 3, 6, 8])
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--baseline-queries", type=int, default=20,
+                        help="queries timed against a linear scan for comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    hashes = [random.getrandbits(64) for _ in range(args.entries)]
+    index = HammingIndex(num_chunks=args.chunks)
+
+    start = time.perf_counter()
+    for i, hash_value in enumerate(hashes):
+        index.add(hash_value, f"{i:032x}")
+    insert_time = time.perf_counter() - start
+    print(f"insert: {args.entries} entries in {insert_time:.2f}s "
+          f"({1e6 * insert_time / args.entries:.2f} us/insert)")
+
+    for radius in args.radius:
+        # Half the queries are perturbed copies of indexed hashes, half are random misses
+        queries, expected = [], []
+        for _ in range(args.queries // 2):
+            target = random.randrange(args.entries)
+            queries.append(flip_bits(hashes[target], random.randint(0, radius)))
+            expected.append(target)
+            queries.append(random.getrandbits(64))
+            expected.append(None)
+
+        latencies, found = [], 0
+        for query, target in zip(queries, expected):
+            start = time.perf_counter()
+            matches = index.query(query, radius)
+            latencies.append(time.perf_counter() - start)
+            if target is not None and any(value == f"{target:032x}" for _, value, _ in matches):
+                found += 1
+
+        print(f"query r={radius}: p50 {1e6 * percentile(latencies, 0.5):.1f} us, "
+              f"p99 {1e6 * percentile(latencies, 0.99):.1f} us, "
+              f"recall {found / (len(queries) // 2):.3f}")
+
+    if args.baseline_queries:
+        start = time.perf_counter()
+        for _ in range(args.baseline_queries):
+            query = random.getrandbits(64)
+            [h for h in hashes if bin(h ^ query).count('1') <= max(args.radius)]
+        scan_time = (time.perf_counter() - start) / args.baseline_queries
+        print(f"linear scan baseline: {1e3 * scan_time:.1f} ms/query")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "index.bin")
+        start = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+        start = time.perf_counter()
+        restored = HammingIndex.load(path)
+        load_time = time.perf_counter() - start
+    print(f"snapshot: save {save_time:.2f}s, load {load_time:.2f}s, {size_mb:.1f}MB, "
+          f"{len(restored)} entries restored")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
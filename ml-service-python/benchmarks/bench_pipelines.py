@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""Benchmark the image, audio and video detectors and the HTTP layer on synthetic media, offline.
+
+    python -m benchmarks.bench_pipelines --output baseline.json
+    python -m benchmarks.bench_pipelines --output current.json --compare baseline.json
+    python -m benchmarks.bench_pipelines --load current.json --compare baseline.json --tolerance 0.1
+    python -m benchmarks.bench_pipelines --cases image http --model-size small --concurrency 1 8
+
+Images, WAVs and MP4s are generated from fixed seeds (benchmarks.synthetic_media) and
+the image model is a randomly initialised SigLIP classifier, so no weights or network
+are needed; --model benchmarks real weights instead. Each case reports throughput,
+latency percentiles and the peak RSS sampled while it ran:
+
+    image/<WxH>/c<N>            ImageDetector.predict on JPEG uploads
+    audio/<mode>/<secs>s/c<N>   AudioDeepfakeDetector.predict on WAV files
+    video/<secs>s/c<N>          VideoDeepfakeDetector.predict on MP4 files (with audio if ffmpeg is on PATH)
+    http/<media>/c<N>           the service's app (app.main:app) over ASGI (no sockets), cache off
+
+--compare flags a case whose p50 or p95 latency grew, or throughput fell, by more
+than --tolerance, or whose peak RSS grew by more than --memory-tolerance, and exits
+non-zero. Settings come from the environment as usual (IMAGE_BACKEND, ...).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+import numpy as np
+
+from benchmarks.synthetic_media import MODEL_SIZES, build_siglip, image_bytes, parse_size, write_mp4, write_wav
+
+CASES = ("image", "audio", "video", "http")
+SCHEMA_VERSION = 1
+
+# Lower is better for the first three; higher for throughput
+COMPARED = (
+    ("p50_ms", lambda r: r["latency_ms"]["p50"], 1),
+    ("p95_ms", lambda r: r["latency_ms"]["p95"], 1),
+    ("peak_rss_mb", lambda r: r["peak_rss_mb"], 1),
+    ("throughput", lambda r: r["throughput_per_s"], -1),
+)
+
+
+# --- measurement ----------------------------------------------------------------
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3  # peak so far, in KB on Linux
+
+
+class PeakRss:
+    """Highest RSS seen by a 5 ms polling thread while the block runs"""
+
+    def __enter__(self):
+        self.start = self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, rss_mb())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def summarize(latencies: List[float], wall: float, errors: int, concurrency: int, memory: PeakRss) -> dict:
+    values = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / wall, 3) if wall > 0 else None,
+        "latency_ms": {
+            "mean": round(float(values.mean()), 3),
+            "p50": round(float(np.percentile(values, 50)), 3),
+            "p95": round(float(np.percentile(values, 95)), 3),
+            "p99": round(float(np.percentile(values, 99)), 3),
+            "max": round(float(values.max()), 3),
+        },
+        "peak_rss_mb": round(memory.peak, 1),
+        "rss_growth_mb": round(memory.peak - memory.start, 1),
+    }
+
+
+def measure(call: Callable[[Any], Any], inputs: List[Any], requests: int, concurrency: int, warmup: int) -> dict:
+    """Run ``requests`` calls over ``concurrency`` threads, cycling through ``inputs``"""
+    for index in range(warmup):
+        call(inputs[index % len(inputs)])
+    latencies, errors, lock = [], 0, threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                call(inputs[index % len(inputs)])
+                failed = False
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += failed
+
+    with PeakRss() as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        wall = time.perf_counter() - started
+    return summarize(latencies, wall, errors, concurrency, memory)
+
+
+async def measure_http(client, path: str, upload: tuple, requests: int, concurrency: int, warmup: int) -> dict:
+    """POST ``upload`` to ``path`` ``requests`` times from ``concurrency`` concurrent clients"""
+    for _ in range(warmup):
+        (await client.post(path, files={"file": upload})).raise_for_status()
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in counter:
+            started = time.perf_counter()
+            response = await client.post(path, files={"file": upload})
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+
+    with PeakRss() as memory:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return summarize(latencies, wall, errors, concurrency, memory)
+
+
+# --- cases ----------------------------------------------------------------------
+
+def build_registry(model_path: str):
+    from app.services.model_registry import DEFAULT_LOADERS, ModelRegistry
+
+    def load_image(registry):
+        from app.models.image_detector import ImageDetector
+        detector = ImageDetector(model_path)
+        if not detector.load_model():
+            raise RuntimeError(f"Could not load the image model from {model_path}")
+        return detector
+
+    return ModelRegistry({**DEFAULT_LOADERS, "image": load_image})
+
+
+def run_image(registry, media: dict, args, results: dict) -> None:
+    detector = registry.get("image")
+    for size, uploads in media["images"].items():
+        for concurrency in args.concurrency:
+            results[f"image/{size}/c{concurrency}"] = measure(
+                lambda data: detector.predict(io.BytesIO(data)), uploads, args.image_requests, concurrency, args.warmup
+            )
+
+
+def run_audio(registry, media: dict, args, results: dict) -> None:
+    detector = registry.get("audio")
+    for duration, path in media["audio"].items():
+        for mode in args.audio_modes:
+            for concurrency in args.concurrency:
+                results[f"audio/{mode}/{duration:g}s/c{concurrency}"] = measure(
+                    lambda p: detector.predict(p, mode=mode), [path], args.audio_requests, concurrency, args.warmup
+                )
+
+
+def run_video(registry, media: dict, args, results: dict) -> None:
+    detector = registry.get("video")
+    for duration, path in media["video"].items():
+        for concurrency in args.concurrency:
+            results[f"video/{duration:g}s/c{concurrency}"] = measure(
+                detector.predict, [path], args.video_requests, concurrency, min(args.warmup, 1)
+            )
+
+
+def build_http_app(registry):
+    """The service's own app (app.main:app: middleware and routes) serving the benchmark's detectors.
+
+    Its verdict cache and near-duplicate index are switched off, so every upload is analyzed.
+    """
+    import app.main as service_main
+    from app.services.detection_service import DetectionService
+
+    service = DetectionService(registry=registry)
+    service_main.detection_service = service
+    service_main.verdict_cache = None
+    service_main.phash_index = None
+    return service_main.app, service
+
+
+def run_http(registry, media: dict, args, results: dict) -> None:
+    import httpx
+    app, service = build_http_app(registry)
+    image_size, images = next(iter(media["images"].items()))
+    audio_path = next(iter(media["audio"].values()))
+    video_path = next(iter(media["video"].values()))
+    with open(audio_path, "rb") as f:
+        audio = f.read()
+    with open(video_path, "rb") as f:
+        video = f.read()
+    targets = [
+        ("image", "/api/detect/image", ("bench.jpg", images[0], "image/jpeg"), args.image_requests),
+        ("audio", "/api/detect/audio", ("bench.wav", audio, "audio/wav"), args.audio_requests),
+        ("video", "/api/detect/video", ("bench.mp4", video, "video/mp4"), args.video_requests),
+    ]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name, path, upload, requests in targets:
+                for concurrency in args.concurrency:
+                    results[f"http/{name}/c{concurrency}"] = await measure_http(
+                        client, path, upload, requests, concurrency, min(args.warmup, 2)
+                    )
+
+    try:
+        asyncio.run(run())
+    finally:
+        service.shutdown()
+
+
+RUNNERS = {"image": run_image, "audio": run_audio, "video": run_video, "http": run_http}
+
+
+def generate_media(workdir: str, args) -> dict:
+    media = {"images": {}, "audio": {}, "video": {}}
+    for size in args.image_sizes:
+        width, height = parse_size(size)
+        media["images"][size] = [image_bytes(width, height, seed=seed) for seed in range(args.distinct_images)]
+    for duration in args.audio_durations:
+        media["audio"][duration] = write_wav(os.path.join(workdir, f"audio_{duration:g}s.wav"), duration)
+    if "video" in args.cases or "http" in args.cases:
+        width, height = parse_size(args.video_size)
+        for duration in args.video_durations:
+            path = os.path.join(workdir, f"video_{duration:g}s.mp4")
+            media["video"][duration] = write_mp4(path, duration, width, height, audio=not args.no_video_audio)
+    return media
+
+
+def environment(args, model: str) -> dict:
+    import torch
+    import transformers
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "transformers": transformers.__version__,
+        "numpy": np.__version__,
+        "git_commit": commit,
+        "model": model,
+        "image_backend": os.environ.get("IMAGE_BACKEND", "torch"),
+        "ffmpeg": shutil.which("ffmpeg") is not None,
+    }
+
+
+# --- comparison -----------------------------------------------------------------
+
+def compare(current: dict, baseline: dict, tolerance: float, memory_tolerance: float) -> int:
+    """Print every shared case against the baseline; return the number of regressions"""
+    for key in ("model", "cpu_count", "image_backend"):
+        before, after = baseline["environment"].get(key), current["environment"].get(key)
+        if before != after:
+            print(f"⚠️ {key} differs from the baseline: {before} -> {after}")
+
+    regressions = 0
+    print(f"{'case':<28} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for case in sorted(set(current["results"]) & set(baseline["results"])):
+        for metric, value, direction in COMPARED:
+            before, after = value(baseline["results"][case]), value(current["results"][case])
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            limit = memory_tolerance if metric == "peak_rss_mb" else tolerance
+            regressed = change * direction > limit
+            regressions += regressed
+            print(f"{case:<28} {metric:<12} {before:>10.2f} {after:>10.2f} {change:>+7.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    for case in sorted(set(baseline["results"]) - set(current["results"])):
+        print(f"{case:<28} missing from the current results")
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    print(f"{'case':<28} {'req':>5} {'err':>4} {'per_s':>9} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} "
+          f"{'peak_MB':>8} {'grow_MB':>8}")
+    for case, row in results.items():
+        latency = row["latency_ms"]
+        print(f"{case:<28} {row['requests']:>5} {row['errors']:>4} {row['throughput_per_s']:>9.2f} "
+              f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} "
+              f"{row['peak_rss_mb']:>8.0f} {row['rss_growth_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--model", help="local SigLIP classifier directory (default: a random one)")
+    parser.add_argument("--model-size", default="tiny", choices=sorted(MODEL_SIZES),
+                        help="size of the random model when --model is not given")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--image-sizes", nargs="+", default=["512x512", "1920x1080"])
+    parser.add_argument("--distinct-images", type=int, default=8)
+    parser.add_argument("--image-requests", type=int, default=200)
+    parser.add_argument("--audio-durations", type=float, nargs="+", default=[4, 30])
+    parser.add_argument("--audio-modes", nargs="+", default=["first", "stream"])
+    parser.add_argument("--audio-requests", type=int, default=20)
+    parser.add_argument("--video-durations", type=float, nargs="+", default=[5, 20])
+    parser.add_argument("--video-size", default="640x360")
+    parser.add_argument("--video-requests", type=int, default=5)
+    parser.add_argument("--no-video-audio", action="store_true", help="generate videos without an audio track")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each case")
+    parser.add_argument("--workdir", help="keep the generated model and media here (default: a temp dir)")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--load", help="read results from this JSON instead of running the suite")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed latency/throughput change")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="allowed peak RSS growth")
+    parser.add_argument("--verbose", action="store_true", help="keep the service's INFO logs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    if args.load:
+        with open(args.load) as f:
+            report = json.load(f)
+    else:
+        workdir = args.workdir or tempfile.mkdtemp(prefix="bench-pipelines-")
+        os.makedirs(workdir, exist_ok=True)
+        try:
+            model = args.model or build_siglip(os.path.join(workdir, f"siglip-{args.model_size}"), args.model_size)
+            media = generate_media(workdir, args)
+            registry = build_registry(model)
+            results = {}
+            started = time.perf_counter()
+            for name in CASES:
+                if name in args.cases:
+                    RUNNERS[name](registry, media, args, results)
+            report = {
+                "schema": SCHEMA_VERSION,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "duration_s": round(time.perf_counter() - started, 1),
+                "environment": environment(args, args.model or f"random-siglip-{args.model_size}"),
+                "parameters": {key: value for key, value in vars(args).items()
+                               if key not in ("output", "load", "compare", "workdir", "verbose")},
+                "model_load_seconds": {name: state["load_seconds"] for name, state in registry.status().items()},
+                "results": results,
+            }
+        finally:
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(report["results"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.memory_tolerance)
+        if regressions:
+            print(f"FAIL: {regressions} regression(s) against {args.compare}")
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
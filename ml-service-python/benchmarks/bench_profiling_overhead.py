@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Measure the request-latency cost of the profiling hooks: off, installed but not asked, per-request, always-on.
+
+    python -m benchmarks.bench_profiling_overhead --requests 300 --work-ms 5
+    python -m benchmarks.bench_profiling_overhead --hz 5 --max-always-on-overhead 2
+
+A small FastAPI app stands in for the service: each request hands --work-ms of
+CPU work to a thread pool the way the inference executor does (copied context,
+``profile_thread()``). Modes run in interleaved, rotated rounds so drift hits all alike:
+
+    baseline    no ProfilingMiddleware (the default: an empty allow-list never installs it)
+    off         middleware installed, request does not ask to be profiled
+    profiled    every request sends X-Profile: 1
+    always-on   no middleware, BackgroundProfiler sampling at --hz
+
+End-to-end differences of a few microseconds drown in scheduling noise, so the
+"off" cost is also timed directly: the middleware passing a request through to a
+no-op app plus one no-op ``profile_thread()``. Exits non-zero if that costs more
+than --max-off-overhead percent of the baseline median, or if "always-on" adds more
+than --max-always-on-overhead percent end to end.
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import contextvars
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.utils.profiler import BackgroundProfiler, profile_thread
+from app.utils.profiling_middleware import ProfilingMiddleware, parse_allow_list
+
+MODES = ("baseline", "off", "profiled", "always-on")
+
+
+def build_app(work_ms: float, pool: ThreadPoolExecutor, profiling_dir: str, middleware: bool) -> FastAPI:
+    app = FastAPI()
+    matrix = np.random.default_rng(0).random((64, 64))
+
+    def work():
+        with profile_thread():
+            deadline = time.perf_counter() + work_ms / 1000.0
+            while time.perf_counter() < deadline:
+                matrix @ matrix
+        return {"ok": True}
+
+    @app.post("/work")
+    async def endpoint():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, contextvars.copy_context().run, work)
+
+    if middleware:
+        app.add_middleware(ProfilingMiddleware, networks=parse_allow_list("127.0.0.1"),
+                           directory=profiling_dir, max_files=20)
+    return app
+
+
+async def run_round(app: FastAPI, requests: int, headers: dict) -> list:
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.post("/work", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+    return latencies
+
+
+def off_path_seconds(calls: int = 100000) -> float:
+    """Per-request cost of the disabled hooks: middleware pass-through plus one no-op profile_thread()"""
+    async def app(scope, receive, send):
+        with profile_thread():
+            pass
+
+    async def bare(scope, receive, send):
+        pass
+
+    middleware = ProfilingMiddleware(app, parse_allow_list("127.0.0.1"), tempfile.gettempdir())
+    scope = {"type": "http", "method": "POST", "path": "/work", "query_string": b"", "client": ("127.0.0.1", 1),
+             "headers": [(b"host", b"bench"), (b"content-type", b"application/json"), (b"user-agent", b"bench")]}
+
+    async def timed(target):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await target(scope, None, None)
+        return (time.perf_counter() - started) / calls
+
+    async def run():
+        return await timed(middleware) - await timed(bare)
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per mode per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--work-ms", type=float, default=5.0, help="CPU work per request")
+    parser.add_argument("--hz", type=float, default=2.0, help="always-on sampling rate")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of " + ", ".join(MODES))
+    parser.add_argument("--max-off-overhead", type=float, default=0.5,
+                        help="fail if the disabled hooks cost more than this percent of the baseline median")
+    parser.add_argument("--max-always-on-overhead", type=float, default=5.0,
+                        help="fail if 'always-on' adds more than this percent to the baseline median")
+    args = parser.parse_args()
+    modes = [mode for mode in args.modes.split(",") if mode]
+
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="inference")
+    profiling_dir = tempfile.mkdtemp(prefix="profiles-")
+    plain = build_app(args.work_ms, pool, profiling_dir, middleware=False)
+    hooked = build_app(args.work_ms, pool, profiling_dir, middleware=True)
+
+    async def run_all():
+        latencies = {mode: [] for mode in modes}
+        await run_round(plain, 20, {})  # warm up
+        for round_index in range(args.rounds):
+            # Rotate the order too, so no mode always runs first
+            for mode in modes[round_index % len(modes):] + modes[:round_index % len(modes)]:
+                if mode == "always-on":
+                    profiler = BackgroundProfiler(args.hz, profiling_dir, flush_seconds=3600).start()
+                    try:
+                        latencies[mode] += await run_round(plain, args.requests, {})
+                    finally:
+                        profiler.stop()
+                else:
+                    app = plain if mode == "baseline" else hooked
+                    headers = {"X-Profile": "1"} if mode == "profiled" else {}
+                    latencies[mode] += await run_round(app, args.requests, headers)
+        return latencies
+
+    latencies = asyncio.run(run_all())
+    pool.shutdown()
+
+    off_cost = off_path_seconds()
+    print(f"{args.rounds} rounds x {args.requests} requests, {args.work_ms:g} ms work, always-on {args.hz:g} Hz")
+    print(f"{'mode':<10} {'p50_ms':>8} {'p99_ms':>8} {'mean_ms':>8} {'vs_base_us':>11} {'vs_base_%':>10}")
+    medians = {mode: statistics.median(values) for mode, values in latencies.items()}
+    base = medians.get("baseline")
+    overheads = {}
+    for mode, values in latencies.items():
+        values = sorted(values)
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        delta = f"{(medians[mode] - base) * 1e6:>11.1f}" if base else f"{'-':>11}"
+        if base:
+            overheads[mode] = (medians[mode] - base) / base * 100
+        pct = f"{overheads[mode]:>9.2f}%" if base else f"{'-':>10}"
+        print(f"{mode:<10} {medians[mode] * 1000:>8.3f} {p99 * 1000:>8.3f} {statistics.mean(values) * 1000:>8.3f} "
+              f"{delta} {pct}")
+
+    failed = False
+    if base:
+        off_pct = off_cost / base * 100
+        print(f"disabled hooks, timed directly: {off_cost * 1e6:.2f} us per request ({off_pct:.3f}% of baseline)")
+        if off_pct > args.max_off_overhead:
+            print(f"FAIL: disabled hooks add {off_pct:.3f}% to the median request (limit {args.max_off_overhead:g}%)")
+            failed = True
+    if overheads.get("always-on", 0) > args.max_always_on_overhead:
+        print(f"FAIL: always-on profiling adds {overheads['always-on']:.2f}% to the median request "
+              f"(limit {args.max_always_on_overhead:g}%)")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
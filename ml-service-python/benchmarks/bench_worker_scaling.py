@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Measure image-inference throughput and tail latency from 1 to N worker processes, with and without core partitioning.
+
+    python -m benchmarks.bench_worker_scaling --max-workers 8 --seconds 10
+    python -m benchmarks.bench_worker_scaling --max-workers 8 --pin --model /app/models/prithivMLmods/deepfake-detector-model-v1
+
+Each worker is a separate process, like a uvicorn worker. "default" leaves torch to
+start one intra-op thread per core in every process (the oversubscribed layout);
+"partitioned" applies the service's topology (app.utils.cpu_topology) before torch is
+imported. Without --model, a ViT-S-sized transformer encoder stands in for SigLIP.
+"""
+
+import sys
+import time
+import argparse
+import multiprocessing
+import numpy as np
+
+from app.utils.cpu_topology import apply_thread_limits, available_cores, plan_topology
+
+
+def build_workload(model_path, batch_size: int):
+    import torch
+    if model_path:
+        from transformers import SiglipForImageClassification
+        model = SiglipForImageClassification.from_pretrained(model_path, local_files_only=True).eval()
+        size = model.config.vision_config.image_size
+        inputs = torch.randn(batch_size, 3, size, size)
+        return lambda: model(pixel_values=inputs)
+    layer = torch.nn.TransformerEncoderLayer(d_model=384, nhead=6, dim_feedforward=1536, batch_first=True)
+    model = torch.nn.TransformerEncoder(layer, num_layers=6).eval()
+    inputs = torch.randn(batch_size, 197, 384)
+    return lambda: model(inputs)
+
+
+def worker(index: int, workers: int, mode: str, pin: bool, args, start_barrier, results) -> None:
+    if mode == "partitioned":
+        # Only the image pipeline runs here, so the worker's whole block goes to it
+        topology = plan_topology(workers, index, {"image": 1}, pin=pin)
+        apply_thread_limits(topology.threads("image"), topology.cores if pin else None)
+
+    import torch
+    run = build_workload(args.model, args.batch_size)
+    with torch.no_grad():
+        run()  # warm-up
+        start_barrier.wait()
+        latencies = []
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            run()
+            latencies.append(time.perf_counter() - start)
+    results.put((torch.get_num_threads(), latencies))
+
+
+def run_layout(workers: int, mode: str, pin: bool, args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(i, workers, mode, pin, args, barrier, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = np.concatenate([np.asarray(lat) for _, lat in collected]) * 1000
+    return {
+        "threads": collected[0][0],
+        "throughput": len(latencies) * args.batch_size / args.seconds,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=None, help="default: number of available cores")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measurement time per layout")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--model", default=None, help="local SigLIP classifier directory")
+    parser.add_argument("--pin", action="store_true", help="also pin each partitioned worker to its cores")
+    args = parser.parse_args()
+
+    cores = available_cores()
+    max_workers = args.max_workers or len(cores)
+    counts = sorted({1, *[n for n in (2, 4, 8, 16, 32, 64) if n < max_workers], max_workers})
+    print(f"{len(cores)} cores, batch {args.batch_size}, {args.seconds:g}s per layout")
+    print(f"{'workers':>7} {'layout':<12} {'threads':>7} {'images/s':>9} {'scaling':>8} {'p50_ms':>8} {'p99_ms':>8}")
+
+    baseline = {}
+    for workers in counts:
+        for mode in ("default", "partitioned"):
+            row = run_layout(workers, mode, args.pin, args)
+            baseline.setdefault(mode, row["throughput"])
+            label = mode + (" +pin" if mode == "partitioned" and args.pin else "")
+            print(f"{workers:>7} {label:<12} {row['threads']:>7} {row['throughput']:>9.1f} "
+                  f"{row['throughput'] / baseline[mode]:>7.2f}x {row['p50']:>8.1f} {row['p99']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""Summarise a recorded request trace, or replay its arrival pattern against a local instance.
+
+    python -m benchmarks.replay_trace temp/traces --summary
+    python -m benchmarks.replay_trace temp/traces --url http://127.0.0.1:8000 --output before.json
+    python -m benchmarks.replay_trace temp/traces --url http://127.0.0.1:8000 --output after.json --compare before.json
+    python -m benchmarks.replay_trace trace.jsonl --url http://127.0.0.1:8000 --speed 4 --start 3600 --duration 600
+
+Traces are written by the service with TRACE_ENABLED=true (see app/utils/request_trace.py):
+one line per upload with its arrival time, endpoint, status, latency, stage timings and,
+per file, media type, bytes, dimensions or duration and a keyed content hash. Directories
+are expanded to every worker's file, rotated ones included.
+
+No media is kept in a trace, so each distinct content hash gets a generated stand-in
+(benchmarks.synthetic_media) of the same shape: images of the recorded dimensions and
+format, padded to the recorded byte size; WAVs and MP4s of the recorded duration.
+Uploads that repeated in the trace repeat with identical bytes, so the verdict cache
+sees the same hit pattern. Stand-ins are the same on every run with the same --seed,
+so replay each side of an A/B against a fresh instance (or change --seed).
+
+Requests are sent open-loop at the recorded times (divided by --speed), whatever the
+server's response times; arrivals beyond --max-in-flight outstanding requests are
+dropped and counted. Latency is measured from the scheduled arrival.
+
+--compare flags an endpoint whose p50 or p95 latency grew by more than --tolerance, or
+whose error rate grew, and exits non-zero.
+"""
+
+import io
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import logging
+import argparse
+import shutil
+import tempfile
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.request_trace import read_trace
+from benchmarks.synthetic_media import image_array, parse_size, write_mp4, write_wav
+
+SCHEMA_VERSION = 1
+WAV_BYTES_PER_SECOND = 32000  # 16 kHz mono 16-bit, for traces without a probed audio duration
+IMAGE_FORMATS = {"image/png": ("PNG", "image/png"), "image/webp": ("WEBP", "image/webp")}
+
+
+def trace_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "requests-*.jsonl*"))))
+        else:
+            files.append(path)
+    return files
+
+
+def select(records: List[dict], args) -> List[dict]:
+    if not records:
+        return []
+    origin = records[0]["ts"] + args.start
+    end = origin + args.duration if args.duration else float("inf")
+    chosen = [r for r in records if origin <= r["ts"] < end
+              and (not args.endpoints or r["endpoint"] in args.endpoints)]
+    return chosen[:args.limit] if args.limit else chosen
+
+
+def distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    array = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(array, 50)), 3),
+        "p95": round(float(np.percentile(array, 95)), 3),
+        "p99": round(float(np.percentile(array, 99)), 3),
+        "max": round(float(array.max()), 3),
+    }
+
+
+# --- trace summary --------------------------------------------------------------
+
+def summarize_trace(records: List[dict]) -> dict:
+    """Arrival pattern, endpoint mix, media shapes and duplicate rate of a trace"""
+    span = records[-1]["ts"] - records[0]["ts"] if len(records) > 1 else 0.0
+    gaps = np.diff([r["ts"] for r in records]) if len(records) > 2 else np.asarray([])
+    per_second = Counter(int(r["ts"]) for r in records)
+
+    endpoints = {}
+    for endpoint in sorted({r["endpoint"] for r in records}):
+        rows = [r for r in records if r["endpoint"] == endpoint]
+        stages = defaultdict(list)
+        for row in rows:
+            for name, seconds in (row.get("timings") or {}).items():
+                stages[name].append(seconds * 1000)
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "share": round(len(rows) / len(records), 4),
+            "status": dict(Counter(str(r["status"]) for r in rows)),
+            "latency_ms": distribution([r["latency_s"] * 1000 for r in rows]),
+            "stage_mean_ms": {name: round(float(np.mean(values)), 3) for name, values in stages.items()},
+        }
+
+    media = {}
+    seen = set()
+    for kind in ("image", "audio", "video"):
+        files = [f for r in records for f in r.get("files", ()) if f.get("media") == kind]
+        if not files:
+            continue
+        repeats = 0
+        for entry in files:
+            if entry.get("hash") in seen:
+                repeats += 1
+            seen.add(entry.get("hash"))
+        dimensions = Counter(f"{f['width']}x{f['height']}" for f in files if "width" in f)
+        media[kind] = {
+            "files": len(files),
+            "repeat_share": round(repeats / len(files), 4),
+            "bytes": distribution([f["bytes"] for f in files]),
+            "duration_s": distribution([f["duration_s"] for f in files if "duration_s" in f]),
+            "top_dimensions": dimensions.most_common(5),
+        }
+
+    return {
+        "requests": len(records),
+        "span_s": round(span, 3),
+        "mean_rate_per_s": round(len(records) / span, 3) if span > 0 else None,
+        "peak_rate_per_s": max(per_second.values()) if per_second else 0,
+        # 1 for Poisson arrivals; larger means burstier
+        "interarrival_cv": round(float(gaps.std() / gaps.mean()), 3) if gaps.size and gaps.mean() > 0 else None,
+        "endpoints": endpoints,
+        "media": media,
+    }
+
+
+def print_summary(summary: dict) -> None:
+    rate = summary["mean_rate_per_s"]
+    print(f"{summary['requests']} requests over {summary['span_s']:.0f}s: mean {rate or 0:.2f}/s, "
+          f"peak {summary['peak_rate_per_s']}/s, inter-arrival CV {summary['interarrival_cv']}")
+    print(f"\n{'endpoint':<28} {'req':>7} {'share':>6} {'p50_ms':>9} {'p95_ms':>9}  status / stage means (ms)")
+    for endpoint, row in summary["endpoints"].items():
+        latency = row["latency_ms"]
+        stages = ", ".join(f"{name} {value:.1f}" for name, value in row["stage_mean_ms"].items() if name != "total")
+        print(f"{endpoint:<28} {row['requests']:>7} {row['share']:>6.1%} {latency['p50']:>9.1f} "
+              f"{latency['p95']:>9.1f}  {row['status']} / {stages}")
+    print(f"\n{'media':<6} {'files':>7} {'repeat':>7} {'p50_kB':>9} {'p95_kB':>9} {'p50_s':>7} {'p95_s':>7}  top sizes")
+    for kind, row in summary["media"].items():
+        duration = row["duration_s"]
+        print(f"{kind:<6} {row['files']:>7} {row['repeat_share']:>7.1%} {row['bytes']['p50'] / 1000:>9.1f} "
+              f"{row['bytes']['p95'] / 1000:>9.1f} {duration['p50'] or 0:>7.1f} {duration['p95'] or 0:>7.1f}  "
+              f"{', '.join(f'{size} ({count})' for size, count in row['top_dimensions'])}")
+
+
+# --- stand-in media -------------------------------------------------------------
+
+def content_shapes(records: List[dict]) -> Dict[str, dict]:
+    """Everything known about each distinct upload, merged across its occurrences.
+
+    Cache hits skip decoding, so their entries lack dimensions; an earlier (or
+    later) occurrence of the same hash usually has them. Entries without a hash
+    are treated as unique.
+    """
+    shapes: Dict[str, dict] = {}
+    for index, record in enumerate(records):
+        files = record.get("files") or []
+        if not files and record.get("request_bytes"):
+            # Refused before a handler ran (e.g. 413): resend an opaque body of the same size
+            files = record["files"] = [{"media": "opaque", "bytes": record["request_bytes"]}]
+        for position, entry in enumerate(files):
+            key = entry.get("hash") or f"unique-{index}-{position}"
+            entry["key"] = key
+            merged = shapes.setdefault(key, {})
+            merged.update({name: value for name, value in entry.items() if value is not None})
+    return shapes
+
+
+def standin_image(shape: dict, default_size: tuple, seed: int) -> tuple:
+    """Stand-in of the recorded dimensions and format, at the JPEG quality (plus padding) nearest its size"""
+    from PIL import Image
+    width, height = shape.get("width") or default_size[0], shape.get("height") or default_size[1]
+    image_format, content_type = IMAGE_FORMATS.get(shape.get("content_type"), ("JPEG", "image/jpeg"))
+    image = Image.fromarray(image_array(width, height, seed))
+    target = shape.get("bytes", 0)
+    best = None
+    for quality in ((95, 85, 70, 50, 30) if image_format == "JPEG" else (None,)):
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **({"quality": quality} if quality else {}))
+        data = buffer.getvalue()
+        if best is None or abs(len(data) - target) < abs(len(best) - target):
+            best = data
+        if len(data) <= target:
+            break
+    # Decoders stop at the end-of-image marker, so trailing padding only adds wire bytes
+    if len(best) < target:
+        best += np.random.default_rng(seed).integers(0, 256, target - len(best), dtype=np.uint8).tobytes()
+    return best, content_type
+
+
+def build_standins(shapes: Dict[str, dict], workdir: str, args) -> Dict[str, tuple]:
+    """Generate one (bytes, content type, filename) per distinct upload; files in ``workdir`` are reused"""
+    default_image = parse_size(args.default_image_size)
+    video_size = parse_size(args.default_video_size)
+    standins = {}
+    started = time.perf_counter()
+    for index, (key, shape) in enumerate(sorted(shapes.items())):
+        seed = args.seed * 1_000_003 + index
+        kind = shape.get("media")
+        if kind == "image":
+            data, content_type = standin_image(shape, default_image, seed)
+            standins[key] = (data, content_type, f"{seed}{'.png' if content_type == 'image/png' else '.jpg'}")
+        elif kind == "audio":
+            duration = shape.get("duration_s") or min(600.0, shape.get("bytes", 0) / WAV_BYTES_PER_SECOND)
+            path = os.path.join(workdir, f"audio-{key}-{seed}-{duration:g}s.wav")
+            if not os.path.exists(path):
+                write_wav(path, max(0.1, duration), seed=seed)
+            with open(path, "rb") as f:
+                standins[key] = (f.read(), "audio/wav", f"{seed}.wav")
+        elif kind == "video":
+            duration = shape.get("duration_s") or args.default_video_seconds
+            width, height = shape.get("width") or video_size[0], shape.get("height") or video_size[1]
+            path = os.path.join(workdir, f"video-{key}-{seed}-{width}x{height}-{duration:g}s.mp4")
+            if not os.path.exists(path):
+                write_mp4(path, max(0.2, duration), width, height, seed=seed)
+            with open(path, "rb") as f:
+                standins[key] = (f.read(), "video/mp4", f"{seed}.mp4")
+        else:
+            data = np.random.default_rng(seed).integers(0, 256, shape.get("bytes", 0), dtype=np.uint8).tobytes()
+            standins[key] = (data, "application/octet-stream", f"{seed}.bin")
+    total = sum(len(data) for data, _, _ in standins.values())
+    print(f"Generated {len(standins)} stand-in uploads ({total / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+    return standins
+
+
+# --- replay ---------------------------------------------------------------------
+
+async def replay(records: List[dict], standins: Dict[str, tuple], args) -> dict:
+    import httpx
+    results = defaultdict(lambda: {"latencies": [], "recorded": [], "errors": 0, "status_changed": 0, "dropped": 0})
+    in_flight = set()
+    lag = []
+
+    async def send(client, record, scheduled):
+        row = results[record["endpoint"]]
+        field = "files" if record["endpoint"].endswith("/batch") else "file"
+        files = [(field, (standins[f["key"]][2], standins[f["key"]][0], standins[f["key"]][1]))
+                 for f in record["files"]]
+        url = record["endpoint"] + (f"?{record['query']}" if record.get("query") else "")
+        try:
+            response = await client.post(url, files=files)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = None
+        # Measured from the scheduled arrival, so client-side queueing counts against the server
+        row["latencies"].append((time.perf_counter() - scheduled) * 1000)
+        row["recorded"].append(record["latency_s"] * 1000)
+        row["errors"] += status is None or status >= 500
+        row["status_changed"] += status != record["status"]
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        origin_ts = records[0]["ts"]
+        origin = time.perf_counter()
+        for record in records:
+            scheduled = origin + (record["ts"] - origin_ts) / args.speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lag.append(max(0.0, time.perf_counter() - scheduled) * 1000)
+            if len(in_flight) >= args.max_in_flight:
+                results[record["endpoint"]]["dropped"] += 1
+                continue
+            task = asyncio.ensure_future(send(client, record, scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        wall = time.perf_counter() - origin
+
+    report = {}
+    for endpoint, row in sorted(results.items()):
+        sent = len(row["latencies"])
+        report[endpoint] = {
+            "requests": sent,
+            "dropped": row["dropped"],
+            "errors": row["errors"],
+            "error_rate": round(row["errors"] / sent, 4) if sent else 0.0,
+            "status_changed": row["status_changed"],
+            "throughput_per_s": round(sent / wall, 3) if wall > 0 else None,
+            "latency_ms": distribution(row["latencies"]),
+            "recorded_latency_ms": distribution(row["recorded"]),
+        }
+    report["_schedule"] = {"wall_s": round(wall, 3), "max_lag_ms": round(max(lag, default=0.0), 3)}
+    return report
+
+
+def print_results(results: dict) -> None:
+    print(f"{'endpoint':<28} {'req':>6} {'drop':>5} {'err':>5} {'chg':>5} {'per_s':>8} {'p50_ms':>9} {'p95_ms':>9} "
+          f"{'p99_ms':>9} {'rec_p50':>9} {'rec_p95':>9}")
+    for endpoint, row in results.items():
+        if endpoint.startswith("_"):
+            continue
+        latency, recorded = row["latency_ms"], row["recorded_latency_ms"]
+        print(f"{endpoint:<28} {row['requests']:>6} {row['dropped']:>5} {row['errors']:>5} "
+              f"{row['status_changed']:>5} {row['throughput_per_s'] or 0:>8.2f} {latency['p50'] or 0:>9.1f} "
+              f"{latency['p95'] or 0:>9.1f} {latency['p99'] or 0:>9.1f} {recorded['p50'] or 0:>9.1f} "
+              f"{recorded['p95'] or 0:>9.1f}")
+    schedule = results.get("_schedule", {})
+    print(f"Replay took {schedule.get('wall_s', 0):.1f}s; worst arrival lag {schedule.get('max_lag_ms', 0):.1f} ms")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> int:
+    """Print every shared endpoint against the baseline replay; return the number of regressions"""
+    regressions = 0
+    print(f"{'endpoint':<28} {'metric':<10} {'baseline':>10} {'current':>10} {'change':>8}")
+    for endpoint in sorted(set(current["results"]) & set(baseline["results"])):
+        if endpoint.startswith("_"):
+            continue
+        before, after = baseline["results"][endpoint], current["results"][endpoint]
+        for metric in ("p50", "p95"):
+            old, new = before["latency_ms"][metric], after["latency_ms"][metric]
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > tolerance
+            regressions += regressed
+            print(f"{endpoint:<28} {metric + '_ms':<10} {old:>10.1f} {new:>10.1f} {change:>+7.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+        regressed = after["error_rate"] > before["error_rate"]
+        regressions += regressed
+        print(f"{endpoint:<28} {'errors':<10} {before['error_rate']:>10.2%} {after['error_rate']:>10.2%}"
+              f"{'':>8}{'  REGRESSION' if regressed else ''}")
+    if current["trace"]["requests"] != baseline["trace"]["requests"]:
+        print(f"⚠️ Replayed {current['trace']['requests']} requests, the baseline {baseline['trace']['requests']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", nargs="+", help="trace files or directories of them")
+    parser.add_argument("--summary", action="store_true", help="describe the trace and exit without replaying")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="instance to replay against")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression: 2 replays twice as fast")
+    parser.add_argument("--start", type=float, default=0.0, help="skip this many seconds of the trace")
+    parser.add_argument("--duration", type=float, help="replay only this many seconds of the trace")
+    parser.add_argument("--limit", type=int, help="replay at most this many requests")
+    parser.add_argument("--endpoints", nargs="+", help="replay only these endpoints")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="outstanding requests before arrivals drop")
+    parser.add_argument("--timeout", type=float, default=600.0, help="per-request timeout in seconds")
+    parser.add_argument("--default-image-size", default="1024x768", help="for images never decoded in the trace")
+    parser.add_argument("--default-video-size", default="640x360", help="for videos without probed dimensions")
+    parser.add_argument("--default-video-seconds", type=float, default=10.0,
+                        help="for videos without a probed duration")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="stand-in generation seed; change it to replay against a warm verdict cache cold")
+    parser.add_argument("--workdir", help="keep generated audio/video stand-ins here for the next run")
+    parser.add_argument("--output", help="write the trace summary and replay results as JSON")
+    parser.add_argument("--compare", help="replay JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p50/p95 latency growth")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    files = trace_files(args.traces)
+    records = select(read_trace(files), args)
+    if not records:
+        print(f"No trace records in {', '.join(args.traces)}")
+        return 1
+    summary = summarize_trace(records)
+    print_summary(summary)
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "trace": {"files": files, **summary},
+        "parameters": {key: value for key, value in vars(args).items()
+                       if key not in ("traces", "output", "compare", "workdir", "summary")},
+    }
+
+    if not args.summary:
+        workdir = args.workdir or tempfile.mkdtemp(prefix="replay-trace-")
+        os.makedirs(workdir, exist_ok=True)
+        try:
+            standins = build_standins(content_shapes(records), workdir, args)
+        finally:
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        print(f"\nReplaying {len(records)} requests against {args.url} at {args.speed:g}x")
+        report["results"] = asyncio.run(replay(records, standins, args))
+        print_results(report["results"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare and "results" in report:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"FAIL: {regressions} regression(s) against {args.compare}")
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
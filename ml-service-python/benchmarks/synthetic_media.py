@@ -0,0 +1,145 @@
+"""Synthetic media and a randomly initialised SigLIP classifier for benchmarks that must run offline.
+
+Everything is generated from a seed, so two runs (or two machines) benchmark the
+same bytes. Images are smooth colour fields with texture and edges, so JPEG sizes
+and decode costs resemble photos rather than pure noise; audio is a voiced-like
+harmonic signal with vibrato and noise; videos are moving versions of the images,
+with the audio muxed in when an ffmpeg binary is available.
+"""
+
+import io
+import os
+import json
+import wave
+import shutil
+import subprocess
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Vision tower sizes: "tiny" is for fast smoke runs, "small" is ViT-Tiny-sized
+MODEL_SIZES = {
+    "tiny": {"hidden_size": 32, "intermediate_size": 64, "num_hidden_layers": 2, "num_attention_heads": 2,
+             "image_size": 32, "patch_size": 8},
+    "small": {"hidden_size": 192, "intermediate_size": 768, "num_hidden_layers": 12, "num_attention_heads": 3,
+              "image_size": 224, "patch_size": 16},
+}
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """``"640x360"`` -> (640, 360)"""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def image_array(width: int, height: int, seed: int = 0, shift: int = 0) -> np.ndarray:
+    """RGB uint8 frame: upsampled colour field, a few hard-edged shapes and fine grain"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.random((max(2, height // 64), max(2, width // 64), 3)).astype(np.float32)
+    ys = np.linspace(0, coarse.shape[0] - 1, height)
+    xs = (np.linspace(0, coarse.shape[1] - 1, width) + shift / 64.0) % (coarse.shape[1] - 1)
+    y0, x0 = ys.astype(int), xs.astype(int)
+    y1, x1 = np.minimum(y0 + 1, coarse.shape[0] - 1), np.minimum(x0 + 1, coarse.shape[1] - 1)
+    wy, wx = (ys - y0)[:, None, None], (xs - x0)[None, :, None]
+    field = (coarse[y0][:, x0] * (1 - wy) * (1 - wx) + coarse[y1][:, x0] * wy * (1 - wx)
+             + coarse[y0][:, x1] * (1 - wy) * wx + coarse[y1][:, x1] * wy * wx)
+    for _ in range(6):
+        cx, cy = rng.integers(0, width), rng.integers(0, height)
+        radius = rng.integers(max(2, min(width, height) // 16), max(3, min(width, height) // 4))
+        yy, xx = np.ogrid[:height, :width]
+        field[(xx - (cx + shift) % width) ** 2 + (yy - cy) ** 2 < radius ** 2] = rng.random(3)
+    field += rng.normal(0, 0.03, field.shape).astype(np.float32)
+    return (np.clip(field, 0, 1) * 255).astype(np.uint8)
+
+
+def image_bytes(width: int, height: int, image_format: str = "JPEG", seed: int = 0, quality: int = 90) -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    kwargs = {"quality": quality} if image_format.upper() == "JPEG" else {}
+    Image.fromarray(image_array(width, height, seed)).save(buffer, image_format, **kwargs)
+    return buffer.getvalue()
+
+
+def waveform(duration: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """float32 mono signal in [-1, 1]: harmonics of a slowly gliding pitch, syllable-like envelope, noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate), dtype=np.float64) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t) + 5 * np.sin(2 * np.pi * 5.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t + rng.random() * 2 * np.pi) ** 2
+    signal = voice * envelope + rng.normal(0, 0.05, t.shape)
+    return (0.8 * signal / max(1e-6, np.abs(signal).max())).astype(np.float32)
+
+
+def write_wav(path: str, duration: float, sample_rate: int = 16000, seed: int = 0) -> str:
+    """16-bit PCM mono WAV"""
+    pcm = (waveform(duration, sample_rate, seed) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def write_mp4(path: str, duration: float, width: int = 640, height: int = 360, fps: int = 25, seed: int = 0,
+              audio: bool = True, ffmpeg: Optional[str] = None) -> str:
+    """MPEG-4 clip of a scene panning sideways; with ``audio`` and ffmpeg on PATH, an AAC track is muxed in"""
+    import cv2
+    base = image_array(width, height, seed)[:, :, ::-1]  # OpenCV writes BGR
+    silent = path + ".video.mp4"
+    writer = cv2.VideoWriter(silent, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError("OpenCV cannot write MPEG-4 video here")
+    try:
+        for index in range(max(1, int(duration * fps))):
+            writer.write(np.ascontiguousarray(np.roll(base, index * 4, axis=1)))
+    finally:
+        writer.release()
+
+    ffmpeg = ffmpeg or shutil.which("ffmpeg")
+    if not audio or ffmpeg is None:
+        os.replace(silent, path)
+        return path
+    track = write_wav(path + ".audio.wav", duration, seed=seed)
+    try:
+        subprocess.run(
+            [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", silent, "-i", track,
+             "-c:v", "copy", "-c:a", "aac", "-shortest", path],
+            check=True
+        )
+    finally:
+        os.unlink(silent)
+        os.unlink(track)
+    return path
+
+
+def build_siglip(directory: str, size: str = "tiny", seed: int = 0) -> str:
+    """Save a randomly initialised SigLIP image classifier ("fake"/"real") with its image processor"""
+    import torch
+    from transformers import SiglipConfig, SiglipForImageClassification, SiglipImageProcessor
+    vision = MODEL_SIZES[size]
+    marker = os.path.join(directory, "synthetic.json")
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == {"size": size, "seed": seed}:
+                return directory
+
+    torch.manual_seed(seed)
+    config = SiglipConfig(
+        vision_config=vision,
+        text_config={"hidden_size": 32, "intermediate_size": 64, "num_hidden_layers": 1,
+                     "num_attention_heads": 2, "vocab_size": 1000, "max_position_embeddings": 64,
+                     "pad_token_id": 0, "bos_token_id": 1, "eos_token_id": 2},
+        id2label={0: "fake", 1: "real"},
+        label2id={"fake": 0, "real": 1},
+    )
+    model = SiglipForImageClassification(config).eval()
+    os.makedirs(directory, exist_ok=True)
+    model.save_pretrained(directory)
+    side = vision["image_size"]
+    SiglipImageProcessor(size={"height": side, "width": side}).save_pretrained(directory)
+    with open(marker, "w") as f:
+        json.dump({"size": size, "seed": seed}, f)
+    return directory
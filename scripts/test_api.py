@@ -1,9 +1,30 @@
 #!/usr/bin/env python3
+"""API smoke tests, and a concurrent load generator for the backend or the ML service.
+
+    python3 scripts/test_api.py                     # functional smoke tests against the running stack
+    python3 scripts/test_api.py load --target ml --concurrency 1 10 50 100 500 --duration 30
+    python3 scripts/test_api.py load --target backend --rate 5 10 20 40 --duration 60 \\
+        --mix image=0.8,audio=0.15,video=0.05 --image-sizes 1920x1080 --output load.json
+
+Load mode needs httpx (pip install httpx); videos are generated with ffmpeg unless
+--video-files are given.
+"""
 
 import requests
 import json
 import time
 import sys
+import os
+import io
+import math
+import wave
+import array
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
 from pathlib import Path
 import logging
 
@@ -155,12 +176,374 @@ def wait_for_services(timeout=60):
     logger.error("❌ Services did not become ready in time")
     return False
 
-def main():
+def run_smoke_tests():
     if not wait_for_services():
         sys.exit(1)
     tester = APITester()
     success = tester.run_all_tests()
     sys.exit(0 if success else 1)
 
+# --- load testing ----------------------------------------------------------------
+
+# Base URL and health path of each service; both serve POST /api/detect/{image,audio,video}
+TARGETS = {
+    "ml": ("http://localhost:8000", "/health"),
+    "backend": ("http://localhost:8080", "/api/detect/health"),
+}
+CONTENT_TYPES = {"image": ("jpg", "image/jpeg"), "audio": ("wav", "audio/wav"), "video": ("mp4", "video/mp4")}
+PERCENTILES = (50, 90, 95, 99)
+
+def parse_mix(value):
+    """"image=0.7,audio=0.2,video=0.1" -> normalised weights"""
+    weights = {}
+    for part in value.split(","):
+        media, _, weight = part.partition("=")
+        media = media.strip()
+        if media not in CONTENT_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown media type '{media}' in --mix")
+        weights[media] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("--mix weights must add up to more than 0")
+    return {media: weight / total for media, weight in weights.items() if weight > 0}
+
+def generate_image(width, height, seed):
+    """JPEG with photo-like detail (fractal + grain), so sizes and decode costs are realistic"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    detail = Image.effect_mandelbrot((width, height), (-2.0 + seed * 0.01, -1.2, 0.8, 1.2), 64).convert("RGB")
+    grain = Image.effect_noise((width, height), 48).convert("RGB")
+    buffer = io.BytesIO()
+    Image.blend(detail, grain, 0.35).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def generate_wav(seconds, sample_rate=16000, seed=0):
+    """16-bit mono WAV: a gliding tone with noise"""
+    rng = random.Random(seed)
+    samples = array.array("h", (
+        int(9000 * math.sin(2 * math.pi * (220 + 40 * math.sin(i / sample_rate)) * i / sample_rate)
+            + rng.gauss(0, 1500))
+        for i in range(int(seconds * sample_rate))
+    ))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+def generate_video(seconds, size, ffmpeg, workdir):
+    """MPEG-4 test pattern with a tone track, encoded by ffmpeg"""
+    path = os.path.join(workdir, f"video_{seconds:g}s_{size}.mp4")
+    subprocess.run([
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=25:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "mpeg4", "-q:v", "4", "-c:a", "aac", "-shortest", path,
+    ], check=True)
+    with open(path, "rb") as f:
+        return f.read()
+
+def build_payloads(args, mix):
+    """media -> [(label, filename, bytes)] from the given files or generated at the requested sizes"""
+    payloads = {}
+    files = {"image": args.image_files, "audio": args.audio_files, "video": args.video_files}
+    for media in mix:
+        extension, _ = CONTENT_TYPES[media]
+        if files[media]:
+            payloads[media] = [(Path(path).name, Path(path).name, Path(path).read_bytes()) for path in files[media]]
+            continue
+        variants = []
+        if media == "image":
+            for seed, size in enumerate(args.image_sizes):
+                width, height = (int(v) for v in size.lower().split("x"))
+                data = generate_image(width, height, seed)
+                if data is None:
+                    raise SystemExit("Generating images needs Pillow; pass --image-files instead")
+                variants.append((size, f"load_{size}.{extension}", data))
+        elif media == "audio":
+            for seed, seconds in enumerate(args.audio_seconds):
+                variants.append((f"{seconds:g}s", f"load_{seconds:g}s.{extension}", generate_wav(seconds, seed=seed)))
+        else:
+            ffmpeg = shutil.which(args.ffmpeg)
+            if ffmpeg is None:
+                raise SystemExit("Generating videos needs ffmpeg on PATH; pass --video-files instead")
+            with tempfile.TemporaryDirectory() as workdir:
+                for seconds in args.video_seconds:
+                    data = generate_video(seconds, args.video_size, ffmpeg, workdir)
+                    variants.append((f"{seconds:g}s", f"load_{seconds:g}s.{extension}", data))
+        payloads[media] = variants
+    return payloads
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class StageStats:
+    """Outcomes of one load level"""
+
+    def __init__(self, mode, level):
+        self.mode = mode
+        self.level = level
+        self.latencies = {}  # media -> [seconds] of successful requests
+        self.errors = {}  # media -> {cause: count}
+        self.sent = 0
+        self.dropped = 0  # open loop: arrivals skipped because --max-in-flight requests were outstanding
+        self.bytes_sent = 0
+        self.elapsed = 0.0
+
+    def record(self, media, latency, cause=None):
+        if cause is None:
+            self.latencies.setdefault(media, []).append(latency)
+        else:
+            causes = self.errors.setdefault(media, {})
+            causes[cause] = causes.get(cause, 0) + 1
+
+    def summary(self):
+        def describe(latencies, errors):
+            latencies = sorted(latencies)
+            failed = sum(errors.values())
+            completed = len(latencies) + failed
+            return {
+                "completed": completed,
+                "ok": len(latencies),
+                "errors": failed,
+                "error_rate": round(failed / completed, 4) if completed else 0.0,
+                "error_causes": errors,
+                "throughput_per_s": round(len(latencies) / self.elapsed, 3) if self.elapsed else 0.0,
+                "latency_ms": {
+                    **{f"p{q}": round(percentile(latencies, q) * 1000, 1) if latencies else None for q in PERCENTILES},
+                    "mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                    "max": round(latencies[-1] * 1000, 1) if latencies else None,
+                },
+            }
+
+        media_types = sorted(set(self.latencies) | set(self.errors))
+        all_errors = {}
+        for causes in self.errors.values():
+            for cause, count in causes.items():
+                all_errors[cause] = all_errors.get(cause, 0) + count
+        return {
+            "mode": self.mode,
+            "level": self.level,
+            "duration_s": round(self.elapsed, 2),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "offered_rate_per_s": round(self.sent / self.elapsed, 3) if self.elapsed else 0.0,
+            "upload_mb_per_s": round(self.bytes_sent / self.elapsed / 1e6, 3) if self.elapsed else 0.0,
+            **describe([v for values in self.latencies.values() for v in values], all_errors),
+            "by_media": {media: describe(self.latencies.get(media, []), self.errors.get(media, {}))
+                         for media in media_types},
+        }
+
+async def send_one(client, media, payload, stats, started=None):
+    """POST one upload; ``started`` is the scheduled arrival time in open-loop mode, so queueing
+    behind a slow server counts towards latency instead of silently lowering the send rate"""
+    import httpx
+    _, filename, data = payload
+    started = started or time.perf_counter()
+    stats.sent += 1
+    stats.bytes_sent += len(data)
+    cause = None
+    try:
+        response = await client.post(f"/api/detect/{media}",
+                                     files={"file": (filename, data, CONTENT_TYPES[media][1])})
+        if response.status_code != 200:
+            cause = f"http_{response.status_code}"
+        else:
+            # The backend reports failures as 200 with prediction "error"
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            if not isinstance(body, dict) or body.get("prediction") == "error":
+                cause = "error_result"
+    except httpx.TimeoutException:
+        cause = "timeout"
+    except httpx.HTTPError as e:
+        cause = type(e).__name__
+    stats.record(media, time.perf_counter() - started, cause)
+
+def choose(payloads, mix, rng):
+    media = rng.choices(list(mix), weights=list(mix.values()))[0]
+    return media, rng.choice(payloads[media])
+
+async def closed_loop(client, payloads, mix, concurrency, duration, rng):
+    """``concurrency`` clients, each sending its next upload as soon as the previous one returns"""
+    stats = StageStats("closed", concurrency)
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            media, payload = choose(payloads, mix, rng)
+            await send_one(client, media, payload, stats)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+async def open_loop(client, payloads, mix, rate, duration, max_in_flight, rng):
+    """Poisson arrivals at ``rate`` per second regardless of how fast responses come back"""
+    stats = StageStats("open", rate)
+    in_flight = set()
+    started = time.perf_counter()
+    next_arrival = started
+    while next_arrival < started + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            stats.dropped += 1
+        else:
+            media, payload = choose(payloads, mix, rng)
+            task = asyncio.ensure_future(send_one(client, media, payload, stats, started=next_arrival))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+def find_saturation(stages, slo_ms, max_error_rate, min_gain=0.05):
+    """First level past which the service stops keeping up: p99 over the SLO, error rate over the limit,
+    open loop serving under 95% of the offered rate, or closed loop gaining under ``min_gain`` throughput"""
+    best = 0.0
+    for index, stage in enumerate(stages):
+        p99 = stage["latency_ms"]["p99"]
+        reason = None
+        if stage["error_rate"] > max_error_rate:
+            reason = f"error rate {stage['error_rate']:.1%} > {max_error_rate:.1%}"
+        elif slo_ms and p99 is not None and p99 > slo_ms:
+            reason = f"p99 {p99:.0f} ms > SLO {slo_ms:g} ms"
+        elif stage["mode"] == "open" and stage["throughput_per_s"] < 0.95 * stage["level"]:
+            reason = f"served {stage['throughput_per_s']:.2f}/s of {stage['level']:g}/s offered"
+        elif stage["mode"] == "closed" and index > 0 and stage["throughput_per_s"] < best * (1 + min_gain):
+            reason = f"throughput {stage['throughput_per_s']:.2f}/s did not grow past {best:.2f}/s"
+        if reason:
+            return {"level": stage["level"], "last_good_level": stages[index - 1]["level"] if index else None,
+                    "reason": reason}
+        best = max(best, stage["throughput_per_s"])
+    return None
+
+def print_stage(stage):
+    latency = stage["latency_ms"]
+    fmt = lambda v: f"{v:>8.0f}" if v is not None else f"{'-':>8}"
+    print(f"{stage['level']:>7g} {stage['sent']:>7} {stage['ok']:>7} {stage['error_rate']:>6.1%} {stage['dropped']:>7} "
+          f"{stage['throughput_per_s']:>8.2f} {fmt(latency['p50'])} {fmt(latency['p90'])} {fmt(latency['p95'])} "
+          f"{fmt(latency['p99'])} {fmt(latency['max'])}")
+    for media, row in stage["by_media"].items():
+        causes = ", ".join(f"{cause}={count}" for cause, count in row["error_causes"].items())
+        print(f"{'':>7} {media:>7} {row['ok']:>7} {row['error_rate']:>6.1%} {'':>7} {row['throughput_per_s']:>8.2f} "
+              f"{fmt(row['latency_ms']['p50'])} {fmt(row['latency_ms']['p90'])} {fmt(row['latency_ms']['p95'])} "
+              f"{fmt(row['latency_ms']['p99'])} {fmt(row['latency_ms']['max'])}  {causes}".rstrip())
+
+async def run_load(args, payloads, mix):
+    import httpx
+    base_url, health_path = TARGETS[args.target]
+    base_url = args.base_url or base_url
+    levels = args.rate or args.concurrency
+    pool_size = args.max_in_flight if args.rate else max(args.concurrency)
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    rng = random.Random(args.seed)
+    stages = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        health = await client.get(health_path)
+        logger.info(f"🎯 {base_url} health: {health.status_code}")
+        print(f"{'level':>7} {'sent':>7} {'ok':>7} {'err':>6} {'dropped':>7} {'ok/s':>8} {'p50_ms':>8} "
+              f"{'p90_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+        for index, level in enumerate(levels):
+            if index:
+                await asyncio.sleep(args.cooldown)
+            if args.rate:
+                stats = await open_loop(client, payloads, mix, level, args.duration, args.max_in_flight, rng)
+            else:
+                stats = await closed_loop(client, payloads, mix, int(level), args.duration, rng)
+            stage = stats.summary()
+            stages.append(stage)
+            print_stage(stage)
+            if args.stop_at_saturation and find_saturation(stages, args.slo_ms, args.max_error_rate):
+                break
+    return stages
+
+def run_load_test(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per request otherwise
+    mix = args.mix
+    payloads = build_payloads(args, mix)
+    for media, variants in payloads.items():
+        sizes = ", ".join(f"{label} ({len(data) / 1e6:.2f} MB)" for label, _, data in variants)
+        logger.info(f"📦 {media} ({mix[media]:.0%} of requests): {sizes}")
+    mode = f"open loop at {args.rate} req/s" if args.rate else f"closed loop with {args.concurrency} clients"
+    logger.info(f"🚀 Load test against {args.target}: {mode}, {args.duration:g}s per level")
+
+    stages = asyncio.run(run_load(args, payloads, mix))
+    saturation = find_saturation(stages, args.slo_ms, args.max_error_rate)
+    if saturation:
+        logger.info(f"📈 Saturation at level {saturation['level']:g} ({saturation['reason']}); "
+                    f"last good level: {saturation['last_good_level']}")
+    else:
+        logger.info("📈 No saturation within the tested levels")
+
+    if args.output:
+        report = {
+            "target": args.target,
+            "base_url": args.base_url or TARGETS[args.target][0],
+            "mix": mix,
+            "payloads": {media: [{"label": label, "bytes": len(data)} for label, _, data in variants]
+                         for media, variants in payloads.items()},
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("mix", "command")},
+            "stages": stages,
+            "saturation": saturation,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"📝 Report written to {args.output}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("smoke", help="functional checks against the running stack (the default)")
+    load = commands.add_parser("load", help="concurrent load test")
+    load.add_argument("--target", choices=sorted(TARGETS), default="ml",
+                      help="Java backend on :8080 or the ML service on :8000")
+    load.add_argument("--base-url", help="override the target's URL, e.g. http://ml-host:8000")
+    levels = load.add_mutually_exclusive_group()
+    levels.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50],
+                        help="closed loop: concurrent clients per level")
+    levels.add_argument("--rate", type=float, nargs="+", help="open loop: arrivals per second per level")
+    load.add_argument("--duration", type=float, default=30, help="seconds per level")
+    load.add_argument("--cooldown", type=float, default=2, help="pause between levels")
+    load.add_argument("--max-in-flight", type=int, default=500, help="open loop: outstanding request cap")
+    load.add_argument("--mix", type=parse_mix, default=parse_mix("image=1"),
+                      help="media ratios, e.g. image=0.7,audio=0.2,video=0.1")
+    load.add_argument("--image-sizes", nargs="+", default=["512x512", "1920x1080"])
+    load.add_argument("--audio-seconds", type=float, nargs="+", default=[5, 30])
+    load.add_argument("--video-seconds", type=float, nargs="+", default=[5, 20])
+    load.add_argument("--video-size", default="640x360")
+    load.add_argument("--image-files", nargs="+", help="upload these instead of generated images")
+    load.add_argument("--audio-files", nargs="+")
+    load.add_argument("--video-files", nargs="+")
+    load.add_argument("--ffmpeg", default="ffmpeg")
+    load.add_argument("--timeout", type=float, default=120)
+    load.add_argument("--slo-ms", type=float, help="p99 latency beyond which a level counts as saturated")
+    load.add_argument("--max-error-rate", type=float, default=0.01)
+    load.add_argument("--stop-at-saturation", action="store_true", help="skip the levels past saturation")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--output", help="write the report as JSON")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    if args.command == "load":
+        run_load_test(args)
+    else:
+        run_smoke_tests()
+
 if __name__ == "__main__":
     main()